@@ -7,7 +7,7 @@ from langchain_groq import ChatGroq
 # from langchain_ollama import ChatOllama
 
 from config.app_config import get_config
-from core.tools import all_tools
+from core.tools import get_all_tools
 from core.graph_builder import build_graph, pretty_print_stream_chunk
 
 def main():
@@ -17,7 +17,7 @@ def main():
         print(f"Using model: {model_name}")
         
         model = ChatGroq(model=model_name)
-        model_with_tools = model.bind_tools(all_tools)
+        model_with_tools = model.bind_tools(get_all_tools())
         graph = build_graph(model_with_tools)
         
         user_id = input("Enter user ID (press Enter for auto-generated ID): ").strip()
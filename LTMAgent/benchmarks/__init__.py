@@ -0,0 +1,5 @@
+"""
+Benchmarks for the LTM application.
+
+Run from the LTMAgent directory, e.g. ``python -m benchmarks.startup_bench``.
+"""
@@ -0,0 +1,283 @@
+"""
+Offline benchmark of full graph turns.
+
+Builds the real conversation graph (memory prefetch, summary, agent and
+concurrent tools) with a scripted model, a canned search tool, an in-memory
+store and an in-memory checkpointer, then replays multi-turn conversations
+and reports per-node and per-turn latency, throughput and memory.
+
+Usage:
+    python -m benchmarks.bench_graph --repeat 5 --output results.json
+    python -m benchmarks.bench_graph --conversations memory search --async
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.store.memory import InMemoryStore
+
+from benchmarks.fakes import CONVERSATIONS, ScriptedChatModel, make_embeddings, make_search_tool
+from core.graph_builder import build_graph
+from core.memory_manager import EMBEDDING_DIMS, configure_memory_store
+from core.tools import memory_tools
+
+GRAPH_NODES = ("load_memories", "summarize_conversation", "agent", "tools")
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Callback handler recording the wall time of each graph node run."""
+
+    def __init__(self):
+        self.starts: Dict[Any, tuple] = {}
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.prefix = PrefixTracker()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run, not the same-named runnable it wraps
+        if node in GRAPH_NODES and kwargs.get("name") == node \
+                and self.starts.get(parent_run_id, (None,))[0] != node:
+            self.starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self.starts.pop(run_id, None)
+        if started is not None:
+            node, start = started
+            self.samples[node].append((time.perf_counter() - start) * 1000)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.starts.pop(run_id, None)
+
+
+class PrefixTracker(BaseCallbackHandler):
+    """Callback handler measuring how much of each agent prompt repeats the previous one.
+
+    A provider with prefix (KV) caching only reuses the part of a prompt that
+    is identical to the start of an earlier prompt, so for every agent model
+    call after the first in a thread this records the share of prompt
+    characters shared with the previous call's prompt.
+    """
+
+    def __init__(self):
+        self.previous: Dict[str, str] = {}
+        self.ratios: List[float] = []
+        self.prefix_chars: List[int] = []
+
+    @staticmethod
+    def _render(messages) -> str:
+        return "".join(f"<{m.type}>{m.content if isinstance(m.content, str) else json.dumps(m.content)}"
+                       for m in messages)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        if metadata.get("langgraph_node") != "agent":
+            return
+        thread_id = metadata.get("thread_id")
+        prompt = self._render(messages[0])
+        previous = self.previous.get(thread_id)
+        self.previous[thread_id] = prompt
+        if previous is None or not prompt:
+            return
+        shared = len(os.path.commonprefix([previous, prompt]))
+        self.prefix_chars.append(shared)
+        self.ratios.append(shared / len(prompt))
+
+    def summary(self) -> Dict[str, Any]:
+        """Mean share of prompt characters reusable from the previous call, and mean shared length."""
+        if not self.ratios:
+            return {"calls": 0, "mean_reuse": None, "mean_prefix_chars": None}
+        return {
+            "calls": len(self.ratios),
+            "mean_reuse": round(statistics.fmean(self.ratios), 3),
+            "mean_prefix_chars": round(statistics.fmean(self.prefix_chars), 1),
+        }
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples in milliseconds.
+
+    Args:
+        samples: Latencies in milliseconds
+
+    Returns:
+        Dict[str, float]: count, mean, p50, p95, p99 and max
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def _rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, where available."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_bench_graph(model_latency_ms: float = 0.0, tool_latency_ms: float = 0.0):
+    """Build the real graph wired to offline fakes.
+
+    Args:
+        model_latency_ms: Simulated latency of each model call
+        tool_latency_ms: Simulated latency of each search call
+
+    Returns:
+        tuple: (compiled graph, scripted model)
+    """
+    configure_memory_store(InMemoryStore(index={
+        "dims": EMBEDDING_DIMS,
+        "embed": make_embeddings(EMBEDDING_DIMS),
+        "fields": ["content"],
+    }))
+    model = ScriptedChatModel.from_conversations(CONVERSATIONS, latency_ms=model_latency_ms)
+    graph = build_graph(
+        model,
+        checkpointer=InMemorySaver(),
+        summary_model=model,
+        tools=[make_search_tool(tool_latency_ms), *memory_tools],
+    )
+    return graph, model
+
+
+def _turn_config(user_id: str, thread_id: str, timer: NodeTimer) -> dict:
+    return {"configurable": {"user_id": user_id, "thread_id": thread_id}, "callbacks": [timer, timer.prefix]}
+
+
+def run_sync(graph, names: List[str], repeat: int, timer: NodeTimer) -> List[float]:
+    """Replay each conversation repeat times with graph.invoke; return turn latencies in ms."""
+    turn_ms = []
+    for _ in range(repeat):
+        for name in names:
+            user_id, thread_id = f"bench-{uuid.uuid4().hex[:8]}", str(uuid.uuid4())
+            for turn in CONVERSATIONS[name]:
+                start = time.perf_counter()
+                graph.invoke({"messages": [HumanMessage(content=turn["user"])]},
+                             config=_turn_config(user_id, thread_id, timer))
+                turn_ms.append((time.perf_counter() - start) * 1000)
+    return turn_ms
+
+
+async def run_async(graph, names: List[str], repeat: int, timer: NodeTimer) -> List[float]:
+    """Replay the conversations concurrently with graph.ainvoke; return turn latencies in ms."""
+    turn_ms = []
+
+    async def conversation(name: str):
+        user_id, thread_id = f"bench-{uuid.uuid4().hex[:8]}", str(uuid.uuid4())
+        for turn in CONVERSATIONS[name]:
+            start = time.perf_counter()
+            await graph.ainvoke({"messages": [HumanMessage(content=turn["user"])]},
+                                config=_turn_config(user_id, thread_id, timer))
+            turn_ms.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(conversation(name) for _ in range(repeat) for name in names))
+    return turn_ms
+
+
+def main():
+    """Run the graph benchmark, print a summary and optionally write JSON results."""
+    parser = argparse.ArgumentParser(description="Benchmark full graph turns offline")
+    parser.add_argument("--conversations", nargs="+", choices=sorted(CONVERSATIONS),
+                        default=sorted(CONVERSATIONS), help="Conversations to replay")
+    parser.add_argument("--repeat", type=int, default=5, help="Times each conversation is replayed")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed replays before measuring")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Simulated model latency")
+    parser.add_argument("--tool-latency-ms", type=float, default=0.0, help="Simulated search latency")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Replay conversations concurrently with ainvoke")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    graph, model = build_bench_graph(args.model_latency_ms, args.tool_latency_ms)
+    run = (lambda repeat, timer: asyncio.run(run_async(graph, args.conversations, repeat, timer))) \
+        if args.use_async else (lambda repeat, timer: run_sync(graph, args.conversations, repeat, timer))
+
+    if args.warmup:
+        run(args.warmup, NodeTimer())
+
+    timer = NodeTimer()
+    model.calls = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    turn_ms = run(args.repeat, timer)
+    elapsed = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "mode": "async" if args.use_async else "sync",
+        "conversations": args.conversations,
+        "repeat": args.repeat,
+        "model_latency_ms": args.model_latency_ms,
+        "tool_latency_ms": args.tool_latency_ms,
+        "turns": len(turn_ms),
+        "model_calls": model.calls,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(len(turn_ms) / elapsed, 2) if elapsed else None,
+        "turn_ms": percentiles(turn_ms),
+        "node_ms": {node: percentiles(timer.samples[node]) for node in GRAPH_NODES},
+        "prompt_prefix": timer.prefix.summary(),
+        "memory": {"tracemalloc_peak_mb": round(peak_bytes / (1024 * 1024), 2), "peak_rss_mb": _rss_mb()},
+    }
+
+    print(f"{results['turns']} turns in {results['elapsed_s']} s ({results['turns_per_s']} turns/s, {results['mode']})")
+    print(f"{'turn':<24} p50 {results['turn_ms']['p50']:>8} ms  p95 {results['turn_ms']['p95']:>8} ms  "
+          f"p99 {results['turn_ms']['p99']:>8} ms")
+    for node, stats in results["node_ms"].items():
+        if stats["count"]:
+            print(f"{node:<24} p50 {stats['p50']:>8} ms  p95 {stats['p95']:>8} ms  "
+                  f"p99 {stats['p99']:>8} ms  (n={stats['count']})")
+    prefix = results["prompt_prefix"]
+    if prefix["calls"]:
+        print(f"prompt prefix: {prefix['mean_reuse']:.1%} of each agent prompt repeats the previous one "
+              f"(mean {prefix['mean_prefix_chars']} chars, n={prefix['calls']})")
+    print(f"memory: tracemalloc peak {results['memory']['tracemalloc_peak_mb']} MB, "
+          f"peak RSS {results['memory']['peak_rss_mb']} MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Offline stand-ins for the external services used by the LTM graph.
+
+A scripted chat model replaces Groq/Ollama, a canned search tool replaces
+Searx and a deterministic embedder replaces MiniLM, so the real graph can be
+driven without network access.
+"""
+
+import itertools
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import StructuredTool
+from pydantic import Field
+
+from utils import get_message_text
+
+# Conversations replayed by the benchmarks. Each turn is a user prompt, the
+# tool calls the model makes for it (in one message) and the final reply.
+CONVERSATIONS: Dict[str, List[Dict[str, Any]]] = {
+    "chitchat": [
+        {"user": "Good morning!", "tool_calls": [], "reply": "Good morning, sir. How may I help?"},
+        {"user": "How are you today?", "tool_calls": [], "reply": "Operating at full capacity, sir."},
+        {"user": "Tell me a short joke.", "tool_calls": [], "reply": "I would, sir, but my timing is strictly scheduled."},
+        {"user": "Thanks, that is all.", "tool_calls": [], "reply": "Always a pleasure, sir."},
+    ],
+    "memory": [
+        {
+            "user": "I prefer green tea over coffee.",
+            "tool_calls": [{"name": "manage_semantic_memory", "args": {"content": {
+                "subject": "User", "predicate": "prefers", "object": "green tea over coffee",
+            }}}],
+            "reply": "Noted, sir. Green tea it is.",
+        },
+        {
+            "user": "What do I like to drink?",
+            "tool_calls": [
+                {"name": "lookup_facts", "args": {"subject": "user", "predicate": "prefers"}},
+                {"name": "search_episodic_memory", "args": {"query": "drinks"}},
+            ],
+            "reply": "You prefer green tea, sir.",
+        },
+        {
+            "user": "Remember that I am learning Rust.",
+            "tool_calls": [{"name": "manage_general_memory", "args": {"content": "User is learning Rust"}}],
+            "reply": "I shall remember, sir.",
+        },
+        {
+            "user": "What am I learning?",
+            "tool_calls": [{"name": "search_general_memory", "args": {"query": "learning"}}],
+            "reply": "Rust, sir.",
+        },
+    ],
+    "search": [
+        {
+            "user": "What is the weather in Paris?",
+            "tool_calls": [
+                {"name": "searx_search_results", "args": {"query": "weather Paris"}},
+                {"name": "search_semantic_memory", "args": {"query": "Paris"}},
+            ],
+            "reply": "Mild and sunny in Paris, sir.",
+        },
+        {
+            "user": "And in Tokyo?",
+            "tool_calls": [
+                {"name": "searx_search_results", "args": {"query": "weather Tokyo"}},
+                {"name": "searx_search_results", "args": {"query": "weather Tokyo"}},
+            ],
+            "reply": "Light rain in Tokyo, sir.",
+        },
+    ],
+}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers from a script instead of calling a provider.
+
+    When the last message is from the user and the script has tool calls for
+    that prompt, it returns them; otherwise it returns the scripted reply.
+    Prompts not in the script get an echo reply. Summarization prompts get a
+    fixed summary.
+    """
+
+    script: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    latency_ms: float = 0.0
+    calls: int = 0
+
+    @classmethod
+    def from_conversations(cls, conversations: Dict[str, List[Dict[str, Any]]],
+                           latency_ms: float = 0.0) -> "ScriptedChatModel":
+        script = {turn["user"]: turn for turns in conversations.values() for turn in turns}
+        return cls(script=script, latency_ms=latency_ms)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        # The recall block is a system message after the conversation
+        last = next((m for m in reversed(messages) if m.type != "system"), messages[-1])
+        text = get_message_text(last)
+        if "running summary" in text:
+            return AIMessage(content="The user chatted about preferences and the weather.")
+
+        prompt = next((get_message_text(m) for m in reversed(messages) if m.type == "human"), "")
+        turn = self.script.get(prompt, {"tool_calls": [], "reply": f"You said: {prompt}"})
+        if last.type == "human" and turn["tool_calls"]:
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": call["name"], "args": call["args"], "id": f"call_{self.calls}_{i}"}
+                    for i, call in enumerate(turn["tool_calls"])
+                ],
+            )
+        return AIMessage(content=turn["reply"])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        self.calls += 1
+        message = self._respond(messages)
+        prompt_chars = sum(len(get_message_text(m)) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": len(get_message_text(message)) // 4,
+            "total_tokens": prompt_chars // 4 + len(get_message_text(message)) // 4,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def make_search_tool(latency_ms: float = 0.0) -> StructuredTool:
+    """Create a stand-in for the Searx tool with the same name and canned results."""
+    counter = itertools.count()
+
+    def searx_search_results(query: str) -> str:
+        """A meta search engine. Input should be a search query."""
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+        return json.dumps([
+            {"title": f"Result {next(counter)} for {query}", "link": "http://example.invalid",
+             "snippet": f"Canned snippet about {query}."}
+        ])
+
+    return StructuredTool.from_function(searx_search_results, name="searx_search_results")
+
+
+def make_embeddings(dims: int = 384) -> DeterministicFakeEmbedding:
+    """Create a deterministic embedder with the MiniLM dimensionality."""
+    return DeterministicFakeEmbedding(size=dims)
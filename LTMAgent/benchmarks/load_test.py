@@ -0,0 +1,121 @@
+"""
+Load test for the HTTP server.
+
+Runs many simulated users against ``server.py``, each replaying scripted
+conversations on its own thread, and reports time to first event, turn
+latency, throughput and how many turns were rejected by backpressure.
+
+Usage:
+    python server.py --fake-model --model-latency-ms 200 &
+    python -m benchmarks.load_test --users 50 --repeat 2 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.bench_graph import percentiles
+from benchmarks.fakes import CONVERSATIONS
+
+
+async def run_turn(client: httpx.AsyncClient, url: str, message: str) -> Dict[str, Any]:
+    """Send one turn and read its event stream.
+
+    Returns:
+        Dict[str, Any]: status, time to first event and total time in ms
+    """
+    start = time.perf_counter()
+    first_event_ms = None
+    async with client.stream("POST", url, json={"message": message}) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return {"status": response.status_code, "total_ms": (time.perf_counter() - start) * 1000}
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            if first_event_ms is None:
+                first_event_ms = (time.perf_counter() - start) * 1000
+            if json.loads(line).get("type") == "error":
+                return {"status": "error", "total_ms": (time.perf_counter() - start) * 1000}
+    return {
+        "status": 200,
+        "first_event_ms": first_event_ms,
+        "total_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+async def run_user(client: httpx.AsyncClient, base_url: str, names: List[str],
+                   repeat: int, results: List[Dict[str, Any]]) -> None:
+    """Replay the conversations as one user, each repetition on a new thread."""
+    user_id = f"load-{uuid.uuid4().hex[:8]}"
+    for _ in range(repeat):
+        for name in names:
+            thread_id = uuid.uuid4().hex[:8]
+            url = f"{base_url}/users/{user_id}/threads/{thread_id}/messages"
+            for turn in CONVERSATIONS[name]:
+                results.append(await run_turn(client, url, turn["user"]))
+
+
+async def run_load(base_url: str, users: int, names: List[str], repeat: int,
+                   timeout: float) -> Dict[str, Any]:
+    """Run all simulated users concurrently and summarize the results."""
+    results: List[Dict[str, Any]] = []
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_user(client, base_url, names, repeat, results) for _ in range(users)))
+        elapsed = time.perf_counter() - start
+        server_stats = (await client.get(f"{base_url}/stats")).json()
+
+    ok = [r for r in results if r["status"] == 200]
+    return {
+        "url": base_url,
+        "users": users,
+        "conversations": names,
+        "repeat": repeat,
+        "turns": len(results),
+        "statuses": {str(status): count for status, count in Counter(r["status"] for r in results).items()},
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(len(ok) / elapsed, 2) if elapsed else None,
+        "first_event_ms": percentiles([r["first_event_ms"] for r in ok if r.get("first_event_ms") is not None]),
+        "turn_ms": percentiles([r["total_ms"] for r in ok]),
+        "server": server_stats.get("scheduler"),
+    }
+
+
+def main():
+    """Run the load test, print a summary and optionally write JSON results."""
+    parser = argparse.ArgumentParser(description="Load test the LTM HTTP server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--conversations", nargs="+", choices=sorted(CONVERSATIONS),
+                        default=sorted(CONVERSATIONS), help="Conversations each user replays")
+    parser.add_argument("--repeat", type=int, default=1, help="Times each user replays the conversations")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load(args.url.rstrip("/"), args.users, args.conversations,
+                                   args.repeat, args.timeout))
+
+    print(f"{results['turns']} turns from {results['users']} users in {results['elapsed_s']} s "
+          f"({results['turns_per_s']} turns/s), statuses {results['statuses']}")
+    for label in ("first_event_ms", "turn_ms"):
+        stats = results[label]
+        if stats["count"]:
+            print(f"{label:<16} p50 {stats['p50']:>9} ms  p95 {stats['p95']:>9} ms  p99 {stats['p99']:>9} ms")
+    print(f"server: {results['server']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Replay recorded conversation traces against the LTM graph.
+
+Reads a trace written with ``LTM_RECORD_PATH`` (see ``core/replay.py``) and
+drives the real graph through ``LTMService.aprocess_message`` with the chat
+model and the tools answered from the trace, so checkpointer, memory store
+and graph overhead can be load-tested with production-shaped traffic and no
+live model. Turns keep their order within a conversation; conversations are
+replayed under fresh user and thread IDs.
+
+Turns arrive at their recorded times (scaled by ``--time-scale``) or as a
+Poisson process at ``--rate`` turns per second. ``--latency-scale 1`` also
+replays the recorded model and tool latencies.
+
+Usage:
+    LTM_RECORD_PATH=turns.jsonl python cli_app.py
+    python -m benchmarks.replay_trace turns.jsonl --rate 20 --repeat 5 --output replay.json
+    python -m benchmarks.replay_trace turns.jsonl --backend configured --live-memory-tools
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Annotated, Any, Dict, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool, InjectedToolCallId, StructuredTool
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from benchmarks.bench_graph import percentiles
+from core.instrumentation import GRAPH_NODES
+from core.replay import load_trace
+from utils import get_message_text
+
+NO_RECORDED_OUTPUT = "(no recorded output)"
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model answering each call with the model output recorded for it.
+
+    The first call of a turn takes the next recorded turn with the same
+    prompt (round robin over repeats of that prompt); later calls of the
+    turn are found through the recorded tool call IDs the previous output
+    carried.
+    """
+
+    turns_by_prompt: Dict[str, List[Dict[str, Any]]] = Field(default_factory=dict)
+    turns_by_call: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    latency_scale: float = 0.0
+    _next_turn: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    misses: int = 0
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], latency_scale: float = 0.0) -> "ReplayChatModel":
+        turns_by_prompt: Dict[str, List[Dict[str, Any]]] = {}
+        turns_by_call: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            turns_by_prompt.setdefault(record["prompt"], []).append(record)
+            for step in record["steps"]:
+                for call in step.get("tool_calls", []):
+                    turns_by_call[call["id"]] = record
+        return cls(turns_by_prompt=turns_by_prompt, turns_by_call=turns_by_call, latency_scale=latency_scale)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _step(self, messages: List[BaseMessage]) -> Optional[Dict[str, Any]]:
+        """Find the recorded model step for this call."""
+        human = max((i for i, m in enumerate(messages) if m.type == "human"), default=None)
+        if human is None:
+            return None
+        turn_messages = [m for m in messages[human + 1:] if m.type != "system"]
+        outputs = [m for m in turn_messages if m.type == "ai"]
+        if not outputs:
+            prompt = get_message_text(messages[human])
+            candidates = self.turns_by_prompt.get(prompt)
+            if not candidates:
+                return None
+            with self._lock:
+                index = self._next_turn.get(prompt, 0)
+                self._next_turn[prompt] = index + 1
+            record = candidates[index % len(candidates)]
+        else:
+            calls = [call["id"] for m in outputs for call in m.tool_calls]
+            record = self.turns_by_call.get(calls[-1]) if calls else None
+            if record is None:
+                return None
+        model_steps = [step for step in record["steps"] if step["type"] == "model"]
+        return model_steps[len(outputs)] if len(outputs) < len(model_steps) else None
+
+    def _respond(self, messages: List[BaseMessage]) -> Tuple[AIMessage, float]:
+        last = next((m for m in reversed(messages) if m.type != "system"), messages[-1])
+        if "running summary" in get_message_text(last):
+            return AIMessage(content="The user and the assistant talked about recorded topics."), 0.0
+        step = self._step(messages)
+        if step is None:
+            with self._lock:
+                self.misses += 1
+            return AIMessage(content=NO_RECORDED_OUTPUT), 0.0
+        message = AIMessage(content=step["content"], tool_calls=[
+            {"name": call["name"], "args": call["args"], "id": call["id"]} for call in step["tool_calls"]
+        ])
+        prompt_chars = sum(len(get_message_text(m)) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": len(step["content"]) // 4,
+            "total_tokens": prompt_chars // 4 + len(step["content"]) // 4,
+        }
+        return message, (step.get("ms") or 0.0) * self.latency_scale / 1000.0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        message, delay = self._respond(messages)
+        if delay:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        message, delay = self._respond(messages)
+        if delay:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class _RecordedArgs(BaseModel):
+    """Any arguments; the result is looked up by the tool call ID."""
+
+    model_config = ConfigDict(extra="allow")
+    tool_call_id: Annotated[str, InjectedToolCallId]
+
+
+def make_replay_tools(records: List[Dict[str, Any]], latency_scale: float = 0.0,
+                      live_tools: Optional[List[BaseTool]] = None) -> List[BaseTool]:
+    """Create a stand-in for every tool in the trace, answering with the recorded results.
+
+    Args:
+        records: Turn records from load_trace
+        latency_scale: Share of the recorded tool latency to replay
+        live_tools: Tools to run for real instead (e.g. the memory tools, to
+            load the memory store)
+
+    Returns:
+        List[BaseTool]: The live tools and a replay tool for every other tool name
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        for step in record["steps"]:
+            if step["type"] == "tool":
+                results[step["tool_call_id"]] = step
+    live = {tool.name: tool for tool in live_tools or []}
+    names = {step["name"] for step in results.values()} - set(live)
+
+    def make_tool(name: str) -> BaseTool:
+        def replay(tool_call_id: str, **kwargs) -> str:
+            step = results.get(tool_call_id)
+            if step is None:
+                return NO_RECORDED_OUTPUT
+            if step.get("ms") and latency_scale:
+                time.sleep(step["ms"] * latency_scale / 1000.0)
+            return step["content"]
+
+        async def areplay(tool_call_id: str, **kwargs) -> str:
+            step = results.get(tool_call_id)
+            if step is None:
+                return NO_RECORDED_OUTPUT
+            if step.get("ms") and latency_scale:
+                await asyncio.sleep(step["ms"] * latency_scale / 1000.0)
+            return step["content"]
+
+        return StructuredTool.from_function(func=replay, coroutine=areplay, name=name,
+                                            description=f"Replays recorded {name} results.",
+                                            args_schema=_RecordedArgs)
+
+    return [*live.values(), *(make_tool(name) for name in sorted(names))]
+
+
+def arrival_schedule(records: List[Dict[str, Any]], repeat: int, rate: Optional[float],
+                     time_scale: float, seed: int) -> List[Tuple[float, int, Dict[str, Any]]]:
+    """Get (seconds from start, repeat, record) for every turn to replay.
+
+    Args:
+        records: Turn records in arrival order
+        repeat: How many times the trace is replayed, back to back
+        rate: Poisson arrival rate in turns per second; None keeps recorded times
+        time_scale: Speed-up of recorded inter-arrival times
+        seed: Seed of the Poisson arrivals
+    """
+    schedule = []
+    rng = random.Random(seed)
+    clock = 0.0
+    first = (records[0].get("started_at") or 0.0) if records else 0.0
+    last = (records[-1].get("started_at") or 0.0) if records else 0.0
+    span = (last - first) / time_scale if time_scale else 0.0
+    for r in range(repeat):
+        for record in records:
+            if rate:
+                clock += rng.expovariate(rate)
+                at = clock
+            else:
+                offset = ((record.get("started_at") or first) - first) / time_scale if time_scale else 0.0
+                at = r * span + offset
+            schedule.append((at, r, record))
+    return schedule
+
+
+async def replay(service, schedule: List[Tuple[float, int, Dict[str, Any]]], run_id: str) -> Dict[str, Any]:
+    """Drive the service through the schedule and summarize the turns.
+
+    Args:
+        service: LTMService on the replay model and tools
+        schedule: From arrival_schedule
+        run_id: Prefix of the replayed user and thread IDs
+
+    Returns:
+        Dict[str, Any]: Turn, queueing and node latencies, throughput, errors
+        and model/embedding/MongoDB totals
+    """
+    locks: Dict[Tuple[int, str, str], asyncio.Lock] = {}
+    turn_ms: List[float] = []
+    lag_ms: List[float] = []
+    node_ms: Dict[str, List[float]] = {node: [] for node in GRAPH_NODES}
+    totals = {"llm_calls": 0, "embedding_calls": 0, "mongo_commands": 0, "mongo_ms": 0.0}
+    errors: List[str] = []
+    start = time.perf_counter()
+
+    async def run_turn(at: float, r: int, record: Dict[str, Any]) -> None:
+        key = (r, record["user_id"], record["thread_id"])
+        lock = locks.setdefault(key, asyncio.Lock())
+        await asyncio.sleep(max(0.0, at - (time.perf_counter() - start)))
+        async with lock:
+            began = time.perf_counter()
+            lag_ms.append((began - start - at) * 1000)
+            user_id = f"{run_id}-{r}-{record['user_id']}"
+            thread_id = f"{run_id}-{r}-{record['thread_id']}"
+            try:
+                async for chunk in service.aprocess_message(record["prompt"], user_id, thread_id):
+                    trace = chunk.get("trace")
+                    if trace is not None:
+                        for entry in trace["nodes"]:
+                            node_ms[entry["node"]].append(entry["ms"])
+                        totals["llm_calls"] += trace["llm"]["calls"]
+                        totals["embedding_calls"] += trace["embeddings"]["calls"]
+                        totals["mongo_commands"] += trace["mongo"]["commands"]
+                        totals["mongo_ms"] += trace["mongo"]["ms"]
+            except Exception as e:
+                errors.append(repr(e))
+            turn_ms.append((time.perf_counter() - began) * 1000)
+
+    await asyncio.gather(*(run_turn(at, r, record) for at, r, record in schedule))
+    elapsed = time.perf_counter() - start
+    return {
+        "turns": len(schedule),
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(turn_ms) / elapsed, 2) if elapsed else 0.0,
+        "turn_ms": percentiles(turn_ms),
+        "queue_lag_ms": percentiles(lag_ms),
+        "node_ms": {node: percentiles(samples) for node, samples in node_ms.items() if samples},
+        **{name: round(value, 2) for name, value in totals.items()},
+    }
+
+
+def create_replay_service(records: List[Dict[str, Any]], backend: str, latency_scale: float,
+                          live_memory_tools: bool):
+    """Create an LTMService on the replay model and tools.
+
+    Args:
+        records: Turn records from load_trace
+        backend: "memory" for in-memory store and checkpointer with a fake
+            embedder, "configured" for the configured MongoDB backends
+        latency_scale: Share of recorded model and tool latencies to replay
+        live_memory_tools: Run the memory tools against the store instead of
+            replaying their results
+
+    Returns:
+        tuple: (service, model)
+    """
+    from core.service import LTMService
+    from core.tools import memory_tools
+
+    checkpointer = None
+    if backend == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        from langgraph.store.memory import InMemoryStore
+
+        from benchmarks.fakes import make_embeddings
+        from core.memory_manager import EMBEDDING_DIMS, configure_memory_store
+
+        configure_memory_store(InMemoryStore(index={
+            "dims": EMBEDDING_DIMS,
+            "embed": make_embeddings(EMBEDDING_DIMS),
+            "fields": ["content"],
+        }))
+        checkpointer = InMemorySaver()
+
+    model = ReplayChatModel.from_records(records, latency_scale=latency_scale)
+    tools = make_replay_tools(records, latency_scale, live_tools=memory_tools if live_memory_tools else None)
+    service = LTMService(model=model, tools=tools, checkpointer=checkpointer)
+    # Replayed turns must not be recorded again
+    service.recorder = None
+    return service, model
+
+
+def main():
+    """Replay a trace and print (or write) the summary."""
+    parser = argparse.ArgumentParser(description="Replay recorded turns against the LTM graph")
+    parser.add_argument("trace", help="JSONL trace written with LTM_RECORD_PATH")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Poisson arrivals in turns per second (default: recorded arrival times)")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Speed-up of recorded arrival times, e.g. 10 replays ten times faster")
+    parser.add_argument("--repeat", type=int, default=1, help="Replays of the whole trace")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="Share of recorded model and tool latency to replay (0: none, 1: as recorded)")
+    parser.add_argument("--backend", choices=["memory", "configured"], default="memory",
+                        help="In-memory store and checkpointer, or the configured MongoDB ones")
+    parser.add_argument("--live-memory-tools", action="store_true",
+                        help="Run memory tools against the store instead of replaying their results")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the Poisson arrivals")
+    parser.add_argument("--output", help="Write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    records = load_trace(args.trace)
+    if not records:
+        parser.error(f"No turns in {args.trace}")
+    service, model = create_replay_service(records, args.backend, args.latency_scale, args.live_memory_tools)
+    schedule = arrival_schedule(records, args.repeat, args.rate, args.time_scale, args.seed)
+
+    summary = asyncio.run(replay(service, schedule, run_id=f"replay-{uuid.uuid4().hex[:6]}"))
+    summary["unmatched_model_calls"] = model.misses
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Startup benchmark for the CLI.
+
+Launches ``cli_app.py`` in a subprocess, answers the user and thread prompts
+and measures the time until the conversation prompt (``User>>>``) appears.
+
+With ``--check-mongo`` one more launch points MONGODB_URI at a local listener
+(warm-up off) and fails if anything connects to it before the prompt: the
+store, checkpointer and client must all be created on first use.
+
+Usage:
+    python -m benchmarks.startup_bench --runs 5
+    python -m benchmarks.startup_bench --runs 5 --check-mongo
+"""
+
+import argparse
+import os
+import selectors
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+PROMPT_MARKER = b"User>>> "
+
+
+class ConnectionCounter:
+    """Local TCP listener standing in for MongoDB that only counts connections."""
+
+    def __init__(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(16)
+        self.connections = 0
+        threading.Thread(target=self._accept, daemon=True, name="mongo-connection-counter").start()
+
+    @property
+    def uri(self) -> str:
+        return f"mongodb://127.0.0.1:{self._socket.getsockname()[1]}/?directConnection=true"
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            self.connections += 1
+            conn.close()
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+def time_to_first_prompt(timeout: float = 120.0, env: Optional[Dict[str, str]] = None) -> float:
+    """Run the CLI once and return seconds until the first conversation prompt.
+
+    Args:
+        timeout: Give up (and kill the CLI) after this many seconds
+        env: Extra environment variables for the CLI
+
+    Returns:
+        float: Seconds from process start to the ``User>>>`` prompt
+
+    Raises:
+        RuntimeError: If the CLI exits or times out before prompting
+    """
+    env = dict(os.environ, PYTHONUNBUFFERED="1", **(env or {}))
+    start = time.perf_counter()
+    deadline = start + timeout
+    proc = subprocess.Popen(
+        [sys.executable, "cli_app.py"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        env=env,
+    )
+    # Auto-generated user ID, new thread
+    proc.stdin.write(b"\nn\n")
+    proc.stdin.flush()
+
+    output = b""
+    selector = selectors.DefaultSelector()
+    selector.register(proc.stdout, selectors.EVENT_READ)
+    try:
+        while PROMPT_MARKER not in output:
+            remaining = deadline - time.perf_counter()
+            # Wait for output only until the deadline, so a hung CLI cannot hang the benchmark
+            if remaining <= 0 or not selector.select(remaining):
+                raise RuntimeError(f"Timed out waiting for prompt. Output:\n{output.decode(errors='replace')}")
+            chunk = os.read(proc.stdout.fileno(), 4096)
+            if not chunk:
+                raise RuntimeError(f"CLI exited before prompting. Output:\n{output.decode(errors='replace')}")
+            output += chunk
+        return time.perf_counter() - start
+    finally:
+        selector.close()
+        proc.kill()
+        proc.wait()
+
+
+def mongo_connections_before_prompt(timeout: float = 120.0) -> int:
+    """Run the CLI once against a counting listener and return the connections made before the prompt.
+
+    Args:
+        timeout: Give up (and kill the CLI) after this many seconds
+
+    Returns:
+        int: TCP connections to the MongoDB URI before ``User>>>`` appeared
+    """
+    counter = ConnectionCounter()
+    try:
+        time_to_first_prompt(timeout, env={"MONGODB_URI": counter.uri, "LTM_WARM_UP": "false"})
+        return counter.connections
+    finally:
+        counter.close()
+
+
+def main():
+    """Run the startup benchmark and print a summary."""
+    parser = argparse.ArgumentParser(description="Measure CLI time-to-first-prompt")
+    parser.add_argument("--runs", type=int, default=5, help="Number of CLI launches")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-run timeout in seconds")
+    parser.add_argument("--check-mongo", action="store_true",
+                        help="Also fail if the CLI connects to MongoDB before its first prompt")
+    args = parser.parse_args()
+
+    timings = []
+    for i in range(args.runs):
+        seconds = time_to_first_prompt(args.timeout)
+        timings.append(seconds)
+        print(f"run {i + 1}: {seconds * 1000:.0f} ms")
+
+    print(
+        f"time-to-first-prompt: min {min(timings) * 1000:.0f} ms, "
+        f"median {statistics.median(timings) * 1000:.0f} ms, "
+        f"max {max(timings) * 1000:.0f} ms over {len(timings)} runs"
+    )
+
+    if args.check_mongo:
+        connections = mongo_connections_before_prompt(args.timeout)
+        print(f"MongoDB connections before the prompt: {connections}")
+        if connections:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Local stand-in for a Searx instance.
+
+Answers ``GET /?q=...&format=json`` (and ``/search``) with canned results after a
+configurable delay and counts requests and TCP connections, so the search
+tool's pooling, timeout and cache can be exercised without network access.
+
+Usage:
+    python -m benchmarks.stub_searx --port 8080 --latency-ms 50
+    python -m benchmarks.stub_searx --bench 50 --latency-ms 50
+
+With ``--bench`` a stub is started on a free port and the search tool runs
+the given number of queries against it (sequential, concurrent and repeated).
+Point the application at a running stub with ``LTM_SEARX_HOST``.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubSearxServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering Searx JSON searches."""
+
+    daemon_threads = True
+    # The default backlog of 5 drops connection attempts from a concurrent
+    # pool, which then retry after a second
+    request_queue_size = 128
+
+    def __init__(self, port: int = 0, latency_ms: float = 0.0, num_results: int = 8):
+        """Start listening on 127.0.0.1.
+
+        Args:
+            port: Port to listen on; 0 picks a free one
+            latency_ms: Delay before each answer
+            num_results: Results per answer
+        """
+        super().__init__(("127.0.0.1", port), _SearxRequestHandler)
+        self.latency_ms = latency_ms
+        self.num_results = num_results
+        self.requests = 0
+        self.connections = 0
+        self._counter_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, requests: int = 0, connections: int = 0) -> None:
+        with self._counter_lock:
+            self.requests += requests
+            self.connections += connections
+
+    def start(self) -> "StubSearxServer":
+        """Serve in a daemon thread."""
+        threading.Thread(target=self.serve_forever, daemon=True, name="stub-searx").start()
+        return self
+
+
+class _SearxRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so pooled clients reuse connections; headers and body are
+    # written separately, which Nagle's algorithm would delay on a reused one
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count(connections=1)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path not in ("/", "/search"):
+            self.send_error(404)
+            return
+        query = parse_qs(url.query).get("q", [""])[0]
+        self.server.count(requests=1)
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000.0)
+        body = json.dumps({
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i} for {query}",
+                    "url": f"http://example.invalid/{i}",
+                    "content": f"Canned snippet {i} about {query}.",
+                    "engines": ["stub"],
+                    "category": "general",
+                }
+                for i in range(self.server.num_results)
+            ],
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_bench(queries: int, latency_ms: float) -> None:
+    """Run the search tool against a fresh stub and print requests, connections and timings."""
+    from core.search import SearxSearch
+
+    server = StubSearxServer(latency_ms=latency_ms).start()
+    search = SearxSearch(server.url, cache_ttl_s=300)
+    texts = [f"query {i}" for i in range(queries)]
+
+    def report(label: str, seconds: float, requests_before: int, connections_before: int) -> None:
+        print(f"{label:<22} {seconds * 1000:>8.0f} ms  "
+              f"{server.requests - requests_before:>4} requests  "
+              f"{server.connections - connections_before:>3} connections")
+
+    start, requests, connections = time.perf_counter(), server.requests, server.connections
+    for text in texts:
+        search.search(text)
+    report("sequential (sync)", time.perf_counter() - start, requests, connections)
+
+    async def concurrent():
+        await asyncio.gather(*(search.asearch(f"other {text}") for text in texts))
+        await search.aclose()
+
+    start, requests, connections = time.perf_counter(), server.requests, server.connections
+    asyncio.run(concurrent())
+    report("concurrent (async)", time.perf_counter() - start, requests, connections)
+
+    start, requests, connections = time.perf_counter(), server.requests, server.connections
+    for text in texts:
+        search.search(text.upper())
+    report("repeated (cached)", time.perf_counter() - start, requests, connections)
+    print(search.stats())
+    search.close()
+    server.shutdown()
+
+
+def main():
+    """Serve a stub Searx, or benchmark the search tool against one."""
+    parser = argparse.ArgumentParser(description="Serve a local stub Searx instance")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before each answer")
+    parser.add_argument("--bench", type=int, default=0, metavar="QUERIES",
+                        help="Benchmark the search tool with this many queries instead of serving")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_bench(args.bench, args.latency_ms)
+        return
+    server = StubSearxServer(args.port, args.latency_ms)
+    print(f"Stub Searx listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
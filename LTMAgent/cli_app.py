@@ -5,7 +5,7 @@ Uses the LTMService to provide a clean interface to the core functionality.
 
 from core.service import LTMService
 from core.graph_builder import pretty_print_stream_chunk
-from config.app_config import validate_config
+from config.app_config import get_config, validate_config
 
 def main():
     """Main entry point for the CLI application."""
@@ -15,6 +15,9 @@ def main():
 
         print("Initializing LTM Service...")
         service = LTMService()
+        if get_config("warm_up", True):
+            # Connect and load the embedding model while the user is typing
+            service.warm_up(background=True)
         
         # Display model information
         model_info = service.get_model_info()
@@ -32,8 +35,9 @@ def main():
         use_existing = input("Use existing thread? (y/n, default: n): ").strip().lower()
 
         if use_existing == 'y':
-            # In a real implementation, we would show existing threads here
-            # For now, just ask for the thread ID
+            # Show the user's most recently active threads
+            for thread in service.get_threads_for_user(user_id, limit=10):
+                print(f"  {thread['id']}  {thread['title']}  (last active {thread['last_active'][:16].replace('T', ' ')})")
             thread_id = input("Enter thread ID: ").strip()
             if not thread_id:
                 thread_id = service.create_thread_id()
@@ -52,8 +56,13 @@ def main():
                 if not user_prompt.strip():
                     continue
 
-                # Process the user input using the service
-                for chunk in service.process_message(user_prompt, user_id, thread_id):
+                # Process the user input using the service; token streaming
+                # prints the answer as it is generated
+                if get_config("stream_tokens", True):
+                    chunks = service.stream_response(user_prompt, user_id, thread_id)
+                else:
+                    chunks = service.process_message(user_prompt, user_id, thread_id)
+                for chunk in chunks:
                     pretty_print_stream_chunk(chunk)
             except KeyboardInterrupt:
                 print("\nExiting LTM Agent. Goodbye!")
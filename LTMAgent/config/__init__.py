@@ -1,4 +1,4 @@
 from config.app_config import CONFIG, get_config
-from config.prompt_templates import prompt, AGENT_SYSTEM_PROMPT
+from config.prompt_templates import prompt, AGENT_SYSTEM_PROMPT, RECALL_PROMPT, CONVERSATION_SUMMARY_TEMPLATE, SUMMARY_PROMPT
 
-__all__ = ["CONFIG", "get_config", "prompt", "AGENT_SYSTEM_PROMPT"]
\ No newline at end of file
+__all__ = ["CONFIG", "get_config", "prompt", "AGENT_SYSTEM_PROMPT", "RECALL_PROMPT", "CONVERSATION_SUMMARY_TEMPLATE", "SUMMARY_PROMPT"]
\ No newline at end of file
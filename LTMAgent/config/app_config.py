@@ -15,15 +15,193 @@ CONFIG = {
     "ollama_host": os.getenv("OLLAMA_HOST", "http://localhost:11434"),
     "ollama_model": "mistral:latest",
     "vector_k_results": 3,
+    # Route turns between Groq and Ollama (see core/model_router.py): the
+    # model_provider is tried first, a provider is demoted while its error
+    # rate over the last `window` calls reaches max_error_rate, its median
+    # first-response latency exceeds max_latency_s (0: no limit) or it failed
+    # max_consecutive_failures times within failure_cooldown_s. A call that
+    # has not answered after hedge_after_s (0: never) also starts the next
+    # provider, and the first to answer wins; a provider that loses the race
+    # counts as slower than max_latency_s.
+    "model_routing": {
+        "enabled": os.getenv("LTM_MODEL_ROUTING", "false").lower() == "true",
+        "hedge_after_s": float(os.getenv("LTM_HEDGE_AFTER_S", "0")),
+        "max_latency_s": float(os.getenv("LTM_ROUTE_MAX_LATENCY_S", "0")),
+        "window": 20,
+        "max_error_rate": 0.5,
+        "max_consecutive_failures": 3,
+        "failure_cooldown_s": 30,
+    },
+    # Content-addressed embedding cache: in-memory LRU plus optional SQLite file
+    "embedding_cache": {
+        "max_entries": int(os.getenv("LTM_EMBED_CACHE_SIZE", "10000")),
+        "path": os.getenv("LTM_EMBED_CACHE_PATH") or None,
+    },
+    # Micro-batching of concurrent embed calls (flush at max_batch_size texts
+    # or after max_wait_ms, whichever comes first)
+    "embedding_batch": {
+        "max_batch_size": int(os.getenv("LTM_EMBED_BATCH_SIZE", "32")),
+        "max_wait_ms": float(os.getenv("LTM_EMBED_BATCH_WAIT_MS", "5")),
+    },
+    # Create the memory store and load the embedding model in the background
+    # as soon as a UI starts, instead of on the first memory operation
+    "warm_up": os.getenv("LTM_WARM_UP", "true").lower() == "true",
+    # Stream the answer token by token in the CLI instead of per graph node
+    "stream_tokens": os.getenv("LTM_STREAM_TOKENS", "true").lower() == "true",
+    # How much of the thread is sent to the model on each call (see core/context.py):
+    # "full", "window" (last max_messages), "tokens" (max_tokens budget) or
+    # "summary" (rolling summary once more than summary_trigger messages are
+    # unsummarized, keeping the last max_messages verbatim)
+    "context_policy": {
+        "mode": os.getenv("LTM_CONTEXT_MODE", "summary"),
+        "max_messages": int(os.getenv("LTM_CONTEXT_MAX_MESSAGES", "20")),
+        "max_tokens": int(os.getenv("LTM_CONTEXT_MAX_TOKENS", "4000")),
+        "summary_trigger": int(os.getenv("LTM_CONTEXT_SUMMARY_TRIGGER", "40")),
+    },
+    # Tool calls from one agent message run concurrently, at most max_workers
+    # at a time, on a pool shared by all turns with pool_workers threads
+    # (0 sizes it for every server turn: max_workers * max_concurrent_turns)
+    "tool_execution": {
+        "max_workers": int(os.getenv("LTM_TOOL_MAX_WORKERS", "4")),
+        "pool_workers": int(os.getenv("LTM_TOOL_POOL_WORKERS", "0")),
+    },
+    # Thread/user listing: default page size and number of cached pages
+    "thread_catalog": {
+        "page_size": int(os.getenv("LTM_THREAD_PAGE_SIZE", "20")),
+        "cache_entries": int(os.getenv("LTM_THREAD_CACHE_SIZE", "256")),
+    },
+    # Conversation history: messages per page when resuming a thread
+    "history": {
+        "page_size": int(os.getenv("LTM_HISTORY_PAGE_SIZE", "50")),
+    },
+    # HTTP/WebSocket server (server.py): at most max_concurrent_turns turns run
+    # at once, up to max_queued_turns wait (each for at most queue_timeout_s)
+    # and further requests are rejected; shutdown waits drain_timeout_s for
+    # running turns
+    "server": {
+        "host": os.getenv("LTM_SERVER_HOST", "127.0.0.1"),
+        "port": int(os.getenv("LTM_SERVER_PORT", "8000")),
+        "max_concurrent_turns": int(os.getenv("LTM_SERVER_MAX_CONCURRENT_TURNS", "16")),
+        "max_queued_turns": int(os.getenv("LTM_SERVER_MAX_QUEUED_TURNS", "64")),
+        "queue_timeout_s": float(os.getenv("LTM_SERVER_QUEUE_TIMEOUT_S", "30")),
+        "drain_timeout_s": float(os.getenv("LTM_SERVER_DRAIN_TIMEOUT_S", "30")),
+    },
+    # Append every turn (prompt, model outputs, tool results, timings) to this
+    # JSONL file for benchmarks/replay_trace.py (see core/replay.py); off when unset
+    "replay": {
+        "record_path": os.getenv("LTM_RECORD_PATH") or None,
+    },
+    # LTMService.process_batch: turns running at once across conversations
+    "batch": {
+        "max_concurrency": int(os.getenv("LTM_BATCH_MAX_CONCURRENCY", "8")),
+    },
+    # Per-node, per-tool, model, embedding and MongoDB timings; a trace of each
+    # turn is added to LTMService output and metrics are served for Prometheus
+    # on metrics_host:metrics_port when a port is set (loopback only by default)
+    "instrumentation": {
+        "enabled": os.getenv("LTM_INSTRUMENTATION", "true").lower() == "true",
+        "metrics_port": int(os.getenv("LTM_METRICS_PORT")) if os.getenv("LTM_METRICS_PORT") else None,
+        "metrics_host": os.getenv("LTM_METRICS_HOST", "127.0.0.1"),
+    },
+    # Memory search results cached per (namespace, query, filter, limit, offset);
+    # any write to a namespace drops the cached searches covering it
+    "memory_search_cache": {
+        "enabled": os.getenv("LTM_MEMORY_SEARCH_CACHE", "true").lower() == "true",
+        "max_entries": int(os.getenv("LTM_MEMORY_SEARCH_CACHE_SIZE", "1024")),
+        "ttl_seconds": float(os.getenv("LTM_MEMORY_SEARCH_CACHE_TTL", "60")),
+    },
+    # Background merging of near-duplicate memories (see core/consolidation.py):
+    # every interval_s, memories with cosine similarity >= similarity_threshold
+    # are merged or superseded, at most max_ops_per_second store operations
+    # and only while no turn is running; at most max_items memories are
+    # read per namespace and pass
+    "memory_consolidation": {
+        "enabled": os.getenv("LTM_CONSOLIDATION", "false").lower() == "true",
+        "interval_s": float(os.getenv("LTM_CONSOLIDATION_INTERVAL_S", "3600")),
+        "similarity_threshold": float(os.getenv("LTM_CONSOLIDATION_THRESHOLD", "0.92")),
+        "max_ops_per_second": float(os.getenv("LTM_CONSOLIDATION_MAX_OPS", "20")),
+        "max_items": int(os.getenv("LTM_CONSOLIDATION_MAX_ITEMS", "10000")),
+    },
+    # lookup_facts: maximum number of facts returned per lookup
+    "triple_index": {
+        "max_results": int(os.getenv("LTM_TRIPLE_LOOKUP_MAX_RESULTS", "50")),
+    },
+    # Recall block packing (see core/recall.py): prefetched memories ranked by
+    # (1 - recency_weight) * score + recency_weight * recency (halving every
+    # half_life_days), de-duplicated, each cut to max_item_tokens and packed
+    # into max_tokens tokens counted with the tiktoken encoding. The encoding
+    # is read from the tiktoken cache (TIKTOKEN_CACHE_DIR) and only downloaded
+    # when encoding_download is set; otherwise tokens are approximated
+    "recall": {
+        "max_tokens": int(os.getenv("LTM_RECALL_MAX_TOKENS", "800")),
+        "max_item_tokens": int(os.getenv("LTM_RECALL_MAX_ITEM_TOKENS", "200")),
+        "recency_weight": float(os.getenv("LTM_RECALL_RECENCY_WEIGHT", "0.2")),
+        "half_life_days": float(os.getenv("LTM_RECALL_HALF_LIFE_DAYS", "30")),
+        "encoding": os.getenv("LTM_RECALL_ENCODING", "cl100k_base"),
+        "encoding_download": os.getenv("LTM_RECALL_ENCODING_DOWNLOAD", "false").lower() == "true",
+    },
+    # Opt-in cache of direct answers (see core/response_cache.py), keyed by
+    # user, normalized prompt, recall context and the previous answer and
+    # summary of the thread; the semantic tier also
+    # serves prompts whose embedding has at least similarity_threshold cosine
+    # similarity. A user's answers are dropped when their memories change.
+    "response_cache": {
+        "enabled": os.getenv("LTM_RESPONSE_CACHE", "false").lower() == "true",
+        "semantic": os.getenv("LTM_RESPONSE_CACHE_SEMANTIC", "true").lower() == "true",
+        "similarity_threshold": float(os.getenv("LTM_RESPONSE_CACHE_SIMILARITY", "0.95")),
+        "max_entries": int(os.getenv("LTM_RESPONSE_CACHE_MAX_ENTRIES", "1000")),
+        "ttl_seconds": int(os.getenv("LTM_RESPONSE_CACHE_TTL_SECONDS", "86400")),
+        "min_prompt_words": 3,
+    },
+    # Memory search run in load_memories before the first agent call
+    # (vector_k_results hits per namespace, at most max_results kept)
+    "memory_prefetch": {
+        "enabled": os.getenv("LTM_MEMORY_PREFETCH", "true").lower() == "true",
+        "max_results": 8,
+    },
     "allow_external_requests": os.getenv("LTM_ALLOW_EXTERNAL", "").lower() == "true",
     "use_https": os.getenv("LTM_USE_HTTPS", "").lower() == "true",
-    "request_timeout": 10,
+    # Seconds before a Searx request (connect, read or write) times out
+    "request_timeout": float(os.getenv("LTM_REQUEST_TIMEOUT", "10")),
+    # Internet search (see core/search.py): results per query, pooled
+    # connections to Searx and how long results are reused per normalized query
+    "search": {
+        "num_results": 5,
+        "max_connections": int(os.getenv("LTM_SEARCH_MAX_CONNECTIONS", "10")),
+        "cache_ttl_s": float(os.getenv("LTM_SEARCH_CACHE_TTL_S", "300")),
+        "cache_entries": int(os.getenv("LTM_SEARCH_CACHE_SIZE", "512")),
+    },
     # Mongo configuration for persistent memory (used by MemoryManager)
     # Prefer a standard MONGODB_URI environment variable (e.g. from Atlas). Fall back to LTM_MONGODB_URI.
     "mongodb_uri": os.getenv("MONGODB_URI", os.getenv("LTM_MONGODB_URI", "mongodb://localhost:27017")),
-    "mongodb_db": os.getenv("LTM_MONGODB_DB", "agent-memory"),
+    # Database of the checkpointer and the store; ltm_agent is where both lived
+    # when the name was hard-coded, so existing data stays reachable
+    "mongodb_db": os.getenv("LTM_MONGODB_DB", "ltm_agent"),
     # Default collection name used by MemoryManager when creating stores
     "mongodb_collection": os.getenv("LTM_MONGODB_COLLECTION", "memories"),
+    # Collections used by the conversation checkpointer
+    "mongodb_checkpoint_collection": os.getenv("LTM_MONGODB_CHECKPOINT_COLLECTION", "checkpoints"),
+    "mongodb_writes_collection": os.getenv("LTM_MONGODB_WRITES_COLLECTION", "checkpoint_writes"),
+    # Thread and user catalog kept up to date on every turn (see core/threads.py)
+    "mongodb_threads_collection": os.getenv("LTM_MONGODB_THREADS_COLLECTION", "threads"),
+    "mongodb_users_collection": os.getenv("LTM_MONGODB_USERS_COLLECTION", "users"),
+    # Exact-match index of semantic triples (see core/triple_index.py)
+    "mongodb_triples_collection": os.getenv("LTM_MONGODB_TRIPLES_COLLECTION", "triple_index"),
+    # Per-message conversation log read by the paginated history API (see core/history.py)
+    "mongodb_messages_collection": os.getenv("LTM_MONGODB_MESSAGES_COLLECTION", "messages"),
+    # Connection pool of the single MongoClient shared by checkpointer and store
+    "mongodb_pool": {
+        "max_pool_size": int(os.getenv("LTM_MONGODB_MAX_POOL_SIZE", "50")),
+        "min_pool_size": int(os.getenv("LTM_MONGODB_MIN_POOL_SIZE", "0")),
+        "max_idle_time_ms": int(os.getenv("LTM_MONGODB_MAX_IDLE_TIME_MS", "60000")),
+        "connect_timeout_ms": int(os.getenv("LTM_MONGODB_CONNECT_TIMEOUT_MS", "5000")),
+        "server_selection_timeout_ms": int(os.getenv("LTM_MONGODB_SERVER_SELECTION_TIMEOUT_MS", "10000")),
+        "wait_queue_timeout_ms": int(os.getenv("LTM_MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    },
+    # Memory store backend: "mongodb" (Atlas vector search) or "local"
+    # (embedded memory-mapped store under local_store_path, no cluster needed)
+    "memory_backend": os.getenv("LTM_MEMORY_BACKEND", "mongodb"),
+    "local_store_path": os.getenv("LTM_LOCAL_STORE_PATH", "./local_memory"),
     # Embedding/index configuration for the store (example defaults)
     "memory_index": {
         "dims": os.getenv("LTM_EMBED_DIMS", "384"),
@@ -51,6 +229,9 @@ def validate_config():
     if provider == "groq" and not CONFIG.get("model_name"):
         print("[WARNING] model_provider is 'groq' but 'model_name' is not set.")
 
+    if CONFIG.get("memory_backend") not in ("mongodb", "local"):
+        print(f"[WARNING] Unexpected memory_backend '{CONFIG.get('memory_backend')}'. Expected 'mongodb' or 'local'.")
+
     if provider == "ollama" and not CONFIG.get("ollama_model"):
         print("[WARNING] model_provider is 'ollama' but 'ollama_model' is not set.")
 
@@ -73,5 +254,12 @@ def get_mongodb_store_config():
         "uri": CONFIG.get("mongodb_uri"),
         "db": CONFIG.get("mongodb_db"),
         "collection": CONFIG.get("mongodb_collection"),
+        "checkpoint_collection": CONFIG.get("mongodb_checkpoint_collection"),
+        "writes_collection": CONFIG.get("mongodb_writes_collection"),
+        "threads_collection": CONFIG.get("mongodb_threads_collection"),
+        "users_collection": CONFIG.get("mongodb_users_collection"),
+        "messages_collection": CONFIG.get("mongodb_messages_collection"),
+        "triples_collection": CONFIG.get("mongodb_triples_collection"),
+        "pool": CONFIG.get("mongodb_pool"),
         "index": CONFIG.get("memory_index"),
     }
\ No newline at end of file
@@ -35,13 +35,17 @@ Memory Tool Usage:
 
 ## Recall Memories
 Recall memories are contextually retrieved based on the current
-conversation:{recall_memories}
+conversation and given after it. They were already searched for the latest
+message, so only call a search tool when you need something they do not cover.
 
 ## Memory Tools Available:
 - manage_episodic_memory: Create/update episodic memories (learning experiences)
 - search_episodic_memory: Search for relevant past experiences
-- manage_semantic_memory: Create/update semantic memories (facts/relationships)
+- manage_semantic_memory: Create/update semantic memories as subject/predicate/object triples
 - search_semantic_memory: Search for relevant facts and relationships
+- lookup_facts: Exact lookup of stored facts by subject, predicate or object (prefer it when you know the entity)
+- manage_procedural_memory: Create/update procedural memories (how-to knowledge and rules)
+- search_procedural_memory: Search for relevant procedures
 - manage_general_memory: General memory management
 - search_general_memory: General memory search
 
@@ -59,7 +63,32 @@ message. Respond AFTER calling the tool, once you have
 confirmation that the tool completed successfully.
 """
 
+# Changes every turn, so it goes right before the latest user message: the
+# system prompt (and the bound tool schemas) and the earlier conversation
+# stay a byte-identical prefix that providers with prefix/KV caching can
+# reuse across calls
+RECALL_PROMPT = """{summary}## Recall Memories
+{recall_memories}"""
+
+CONVERSATION_SUMMARY_TEMPLATE = """## Summary of the Earlier Conversation
+{summary}
+
+"""
+
 prompt = ChatPromptTemplate.from_messages([
     ("system", AGENT_SYSTEM_PROMPT),
-    ("placeholder", "{messages}")
-])
\ No newline at end of file
+    ("placeholder", "{history}"),
+    ("system", RECALL_PROMPT),
+    ("placeholder", "{messages}"),
+])
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and
+an assistant. Keep names, facts, preferences, decisions and open questions;
+drop greetings and small talk. Answer with the updated summary only.
+
+Current summary:
+{summary}
+
+New conversation turns:
+{conversation}
+"""
\ No newline at end of file
@@ -3,16 +3,31 @@ Core functionality for the LTM application.
 """
 
 from core.state import State
-from core.agent import agent, load_memories, route_tools
-from core.memory_manager import memory_store
-from core.graph_builder import build_graph, pretty_print_stream_chunk
+from core.agent import agent, aagent, build_agent_chain, load_memories, aload_memories, route_tools
+from core.memory_manager import memory_store, get_memory_store, get_embeddings, get_cache_stats, warm_up_memory
+from core.graph_builder import build_graph, create_checkpointer, pretty_print_stream_chunk
+from core.database import get_mongo_client, get_database, get_pool_stats
+from core.instrumentation import render_metrics, format_trace
 
 __all__ = [
     "State",
     "agent",
+    "aagent",
+    "build_agent_chain",
     "load_memories",
+    "aload_memories",
     "route_tools",
     "memory_store",
+    "get_memory_store",
+    "get_embeddings",
+    "get_cache_stats",
+    "warm_up_memory",
     "build_graph",
-    "pretty_print_stream_chunk"
+    "create_checkpointer",
+    "get_mongo_client",
+    "get_database",
+    "get_pool_stats",
+    "pretty_print_stream_chunk",
+    "render_metrics",
+    "format_trace"
 ]
\ No newline at end of file
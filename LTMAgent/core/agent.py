@@ -2,35 +2,113 @@
 Agent processing logic for the LTM application.
 """
 
-from langchain_core.messages import get_buffer_string
+import asyncio
+import time
+
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END
 
 from core.state import State
-from config.prompt_templates import prompt
+from core.context import context_summary, select_context, split_turn
+from core.memory_manager import search_all_memories, asearch_all_memories, format_memory_hit
+from core.recall import pack_recall_from_config
+from core.response_cache import cacheable_turn, cached_message, conversation_context, get_response_cache
+from config.app_config import get_config
+from config.prompt_templates import CONVERSATION_SUMMARY_TEMPLATE, prompt
+from utils import get_user_id, get_message_text
+
+def build_agent_chain(model_with_tools):
+    """Compose the agent prompt with the model once, for every turn to reuse.
+
+    Args:
+        model_with_tools: The model with bound tools.
+
+    Returns:
+        Runnable: prompt | model_with_tools
+    """
+    return prompt | model_with_tools
 
-def agent(state: State, config: RunnableConfig, model_with_tools) -> dict:
+def agent(state: State, config: RunnableConfig, agent_chain) -> dict:
     """Process the current state and generate a response using the LLM.
 
     Args:
         state (State): The current state of the conversation.
-        model_with_tools: The model with bound tools.
+        agent_chain: The prompt and model chain from build_agent_chain.
+
+    Returns:
+        dict: The updated state with the agent's response.
+    """
+    cache = get_response_cache()
+    prompt_text = cacheable_turn(state["messages"]) if cache is not None else None
+    if prompt_text:
+        hit = cache.get(get_user_id(config), prompt_text, state["recall_memories"], _cache_context(state))
+        if hit is not None:
+            return {"messages": [cached_message(*hit)]}
+
+    start = time.perf_counter()
+    prediction = agent_chain.invoke(_prompt_inputs(state))
+    if prompt_text:
+        _cache_response(cache, state, config, prompt_text, prediction, time.perf_counter() - start)
+    return {
+        "messages": [prediction],
+    }
+
+async def aagent(state: State, config: RunnableConfig, agent_chain) -> dict:
+    """Async version of agent, used when the graph runs under astream/ainvoke.
+
+    Args:
+        state (State): The current state of the conversation.
+        agent_chain: The prompt and model chain from build_agent_chain.
 
     Returns:
         dict: The updated state with the agent's response.
     """
-    bound = prompt | model_with_tools
+    cache = get_response_cache()
+    prompt_text = cacheable_turn(state["messages"]) if cache is not None else None
+    if prompt_text:
+        # The semantic tier embeds the prompt, which is CPU-bound
+        hit = await asyncio.to_thread(cache.get, get_user_id(config), prompt_text, state["recall_memories"],
+                                      _cache_context(state))
+        if hit is not None:
+            return {"messages": [cached_message(*hit)]}
+
+    start = time.perf_counter()
+    prediction = await agent_chain.ainvoke(_prompt_inputs(state))
+    if prompt_text:
+        await asyncio.to_thread(
+            _cache_response, cache, state, config, prompt_text, prediction, time.perf_counter() - start
+        )
+    return {
+        "messages": [prediction],
+    }
+
+def _cache_response(cache, state: State, config: RunnableConfig, prompt_text: str,
+                    prediction, generation_s: float) -> None:
+    """Cache a direct answer; answers that call tools depend on their results and are not cached."""
+    if not prediction.tool_calls:
+        cache.put(get_user_id(config), prompt_text, state["recall_memories"],
+                  get_message_text(prediction), generation_s, context=_cache_context(state))
+
+def _cache_context(state: State) -> str:
+    """Get the conversation context that response cache entries are keyed on."""
+    return conversation_context(state["messages"], state.get("summary"))
+
+def _prompt_inputs(state: State) -> dict:
+    """Build the prompt template inputs from the conversation state.
+
+    The summary and recall block go between the earlier conversation and the
+    current turn, so everything before them repeats from call to call.
+    """
     recall_str = (
         "<recall_memory>\n" + "\n".join(state["recall_memories"]) + "\n</recall_memory>"
     )
-    prediction = bound.invoke(
-        {
-            "messages": state["messages"],
-            "recall_memories": recall_str,
-        }
-    )
+    summary = context_summary(state)
+    history, turn = split_turn(select_context(state))
     return {
-        "messages": [prediction],
+        "history": history,
+        "messages": turn,
+        "summary": CONVERSATION_SUMMARY_TEMPLATE.format(summary=summary) if summary else "",
+        "recall_memories": recall_str,
     }
 
 def load_memories(state: State, config: RunnableConfig) -> dict:
@@ -43,12 +121,52 @@ def load_memories(state: State, config: RunnableConfig) -> dict:
     Returns:
         dict: The updated state with loaded memories.
     """
-    # LangMem tools will handle memory retrieval when the agent needs it
-    # No automatic memory loading - agent uses tools on-demand for all memory operations
+    prefetch = get_config("memory_prefetch", {})
+    query = _latest_user_text(state["messages"])
+    if not prefetch.get("enabled", True) or not query:
+        return {"recall_memories": []}
+
+    # Search all memory types up front so the first agent call already has
+    # context instead of spending a round trip deciding to call a search tool
+    hits = search_all_memories(
+        get_user_id(config), query, limit=int(get_config("vector_k_results", 3))
+    )
+    return _recall_update(hits)
+
+async def aload_memories(state: State, config: RunnableConfig) -> dict:
+    """Async version of load_memories.
+
+    Args:
+        state (State): The current state of the conversation.
+        config (RunnableConfig): The runtime configuration for the agent.
+
+    Returns:
+        dict: The updated state with loaded memories.
+    """
+    prefetch = get_config("memory_prefetch", {})
+    query = _latest_user_text(state["messages"])
+    if not prefetch.get("enabled", True) or not query:
+        return {"recall_memories": []}
+
+    hits = await asearch_all_memories(
+        get_user_id(config), query, limit=int(get_config("vector_k_results", 3))
+    )
+    return _recall_update(hits)
+
+def _recall_update(hits) -> dict:
+    """Pack memory hits into the recall_memories state update under the recall token budget."""
+    lines, _ = pack_recall_from_config(hits, format_memory_hit)
     return {
-        "recall_memories": [],
+        "recall_memories": lines,
     }
 
+def _latest_user_text(messages) -> str:
+    """Return the text of the most recent user message, or an empty string."""
+    for message in reversed(messages):
+        if message.type == "human":
+            return get_message_text(message).strip()
+    return ""
+
 def route_tools(state: State):
     """Determine whether to use tools or end the conversation based on the last message.
 
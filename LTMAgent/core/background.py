@@ -0,0 +1,47 @@
+"""
+Background writes for the LTM application.
+
+Catalog, history, triple index and turn recording writes do not need to
+finish before a turn answers. Each of those stores hands its writes to a
+BackgroundWriter, which runs them one at a time in submission order on its
+own thread, so the turn does not wait and writes to the same document never
+race.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+
+class BackgroundWriter:
+    """Single-threaded, in-order executor for writes off a turn's critical path."""
+
+    def __init__(self, name: str):
+        """Initialize the writer.
+
+        Args:
+            name: Thread name prefix, e.g. "thread-catalog"
+        """
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+
+    def submit(self, write: Callable[[], None], failure: str) -> Future:
+        """Queue a write; a failing write prints a warning instead of raising.
+
+        Args:
+            write: The write to run
+            failure: What could not be done, for the warning, e.g. "update thread catalog"
+
+        Returns:
+            Future: Resolves when the write has run
+        """
+        def run() -> None:
+            try:
+                write()
+            except Exception as e:
+                print(f"[WARNING] Could not {failure}: {e}")
+
+        return self._executor.submit(run)
+
+    def flush(self) -> None:
+        """Wait for every write queued so far."""
+        self._executor.submit(lambda: None).result()
@@ -0,0 +1,401 @@
+"""
+Background memory consolidation for the LTM application.
+
+The agent writes memories freely, so over time a user's namespaces collect
+near-identical triples and episodes. The consolidator walks each user's
+namespaces, clusters memories by embedding similarity and keeps one memory
+per cluster: duplicate triples are merged (their contexts combined), a
+triple whose object changed supersedes the older ones, and a repeated
+episode or note is replaced by its newest version. Every store operation
+goes through a rate limiter, and the job waits while turns are running, so
+it never competes with live traffic.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langgraph.store.base import BaseStore, SearchItem
+from langgraph.store.base.embed import get_text_at_path
+from pydantic import ValidationError
+
+from config.app_config import get_config
+from core.instrumentation import metrics
+from core.memory_manager import EMBEDDING_DIMS, Episode, Triple, get_embeddings, memory_store
+
+MEMORY_ROOT = "memories"
+# Last namespace segment -> schema of the structured memories stored there
+SCHEMA_NAMESPACES = {"triples": "Triple", "episodes": "Episode"}
+
+metrics.describe("ltm_consolidation_runs_total", "counter", "Memory consolidation passes over a user")
+metrics.describe("ltm_consolidation_removed_total", "counter", "Memories removed by consolidation")
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(str(text).casefold().split())
+
+
+class RateLimiter:
+    """Token bucket allowing ops_per_second operations on average."""
+
+    def __init__(self, ops_per_second: float, burst: int = 1):
+        """Initialize the bucket.
+
+        Args:
+            ops_per_second: Sustained rate; 0 or less disables the limit
+            burst: Operations allowed back to back
+        """
+        self.ops_per_second = ops_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, ops: int = 1) -> None:
+        """Block until ops operations are allowed."""
+        if self.ops_per_second <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.ops_per_second)
+            self._updated = now
+            self._tokens -= ops
+            wait = -self._tokens / self.ops_per_second if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class MemoryConsolidator:
+    """Merges and supersedes near-duplicate memories, one user at a time."""
+
+    def __init__(self, store: BaseStore, embeddings: Embeddings,
+                 similarity_threshold: float = 0.92, ops_per_second: float = 20.0,
+                 is_busy: Optional[Callable[[], bool]] = None, busy_wait_s: float = 1.0,
+                 probe_queries: int = 3, max_items: int = 10000):
+        """Initialize the consolidator.
+
+        Args:
+            store: The memory store; writes should go through the caching store
+                so cached searches are invalidated
+            embeddings: Embedder used for clustering (the store's own embedder,
+                so stored texts are served from its cache)
+            similarity_threshold: Cosine similarity at which two memories are
+                considered duplicates
+            ops_per_second: Rate limit for store operations and embedding batches
+            is_busy: Returns True while live turns are running; the job waits
+            busy_wait_s: How long to wait before checking is_busy again
+            probe_queries: Searches timed before and after consolidating a
+                namespace to report the latency change; 0 to skip
+            max_items: Most memories (and namespaces) read per listing; the
+                MongoDB store supports no offset, so listings are one page
+        """
+        self.store = store
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.limiter = RateLimiter(ops_per_second)
+        self.is_busy = is_busy
+        self.busy_wait_s = busy_wait_s
+        self.probe_queries = probe_queries
+        self.max_items = max_items
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Pacing
+    # ------------------------------------------------------------------
+
+    def stop(self) -> None:
+        """Ask a running pass to stop after its current namespace."""
+        self._stop.set()
+
+    def _pace(self, ops: int = 1) -> None:
+        while self.is_busy is not None and self.is_busy() and not self._stop.is_set():
+            self._stop.wait(self.busy_wait_s)
+        self.limiter.acquire(ops)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def list_users(self) -> List[str]:
+        """Get every user with memories."""
+        self._pace()
+        namespaces = self.store.list_namespaces(prefix=(MEMORY_ROOT,), max_depth=2, limit=self.max_items)
+        return sorted({namespace[1] for namespace in namespaces if len(namespace) > 1})
+
+    def _list_namespaces(self, user_id: str) -> List[Tuple[str, ...]]:
+        self._pace()
+        return [tuple(namespace) for namespace in
+                self.store.list_namespaces(prefix=(MEMORY_ROOT, user_id), limit=self.max_items)]
+
+    def _list_items(self, namespace: Tuple[str, ...]) -> List[SearchItem]:
+        """Get the memories stored directly in namespace (search covers sub-namespaces too)."""
+        self._pace()
+        return [item for item in self.store.search(namespace, limit=self.max_items)
+                if tuple(item.namespace) == namespace]
+
+    @staticmethod
+    def _text(item: SearchItem) -> str:
+        # Same text the store embeds (index fields=["content"])
+        return "\n".join(get_text_at_path(item.value, "content")) or json.dumps(item.value, default=str)
+
+    def _probe(self, namespace: Tuple[str, ...], queries: List[str]) -> Optional[float]:
+        """Median wall time (ms) of semantic searches, bypassing the result cache."""
+        if not queries:
+            return None
+        store = getattr(self.store, "store", self.store)
+        timings = []
+        for query in queries:
+            self._pace()
+            start = time.perf_counter()
+            store.search(namespace, query=query, limit=get_config("vector_k_results", 3))
+            timings.append((time.perf_counter() - start) * 1000)
+        return round(float(np.median(timings)), 3)
+
+    # ------------------------------------------------------------------
+    # Clustering and merging
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse(item: SearchItem) -> Tuple[str, Any]:
+        """Get a memory's kind ("Triple", "Episode" or "text") and parsed content.
+
+        LangMem stores schema memories as {"content": {...fields}}, so the
+        schema is the one of the namespace the memory lives in.
+        """
+        content = item.value.get("content")
+        kind = item.value.get("kind") or SCHEMA_NAMESPACES.get(item.namespace[-1])
+        schema = {"Triple": Triple, "Episode": Episode}.get(kind)
+        if schema is not None and isinstance(content, dict):
+            try:
+                return kind, schema.model_validate(content)
+            except ValidationError:
+                pass
+        return "text", content
+
+    def _clusters(self, items: List[SearchItem]) -> List[List[int]]:
+        """Group items whose embeddings are within the similarity threshold, newest first.
+
+        Greedy: the newest unassigned item seeds a cluster and takes every
+        unassigned item similar enough to it, so each cluster is led by the
+        item that is kept.
+        """
+        self._pace(1)
+        vectors = np.asarray(self.embeddings.embed_documents([self._text(item) for item in items]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+
+        order = sorted(range(len(items)), key=lambda i: items[i].updated_at, reverse=True)
+        unassigned = np.array(order)
+        clusters = []
+        while len(unassigned):
+            seed = unassigned[0]
+            similar = vectors[unassigned] @ vectors[seed] >= self.similarity_threshold
+            similar[0] = True
+            clusters.append(unassigned[similar].tolist())
+            unassigned = unassigned[~similar]
+        return [cluster for cluster in clusters if len(cluster) > 1]
+
+    @staticmethod
+    def _merge_triples(members: List[Tuple[SearchItem, Triple]]) -> List[Tuple[SearchItem, Dict[str, Any], List[SearchItem], List[SearchItem]]]:
+        """Merge triples about the same subject and predicate.
+
+        Returns:
+            List of (kept item, its new value, merged items, superseded items);
+            triples about different subjects or predicates are left alone
+        """
+        groups: Dict[Tuple[str, str], List[Tuple[SearchItem, Triple]]] = {}
+        for item, triple in members:
+            groups.setdefault((_normalize_text(triple.subject), _normalize_text(triple.predicate)), []).append((item, triple))
+
+        plans = []
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            (kept, newest), older = group[0], group[1:]
+            duplicates = [(item, triple) for item, triple in older
+                          if _normalize_text(triple.object) == _normalize_text(newest.object)]
+            superseded = [item for item, triple in older
+                          if _normalize_text(triple.object) != _normalize_text(newest.object)]
+            if not duplicates:
+                plans.append((kept, kept.value, [], superseded))
+                continue
+            contexts = []
+            for triple in [newest, *(triple for _, triple in duplicates)]:
+                if triple.context and _normalize_text(triple.context) not in map(_normalize_text, contexts):
+                    contexts.append(triple.context)
+            merged = newest.model_copy(update={"context": "; ".join(contexts) or None})
+            value = {**kept.value, "content": merged.model_dump(mode="json")}
+            plans.append((kept, value, [item for item, _ in duplicates], superseded))
+        return plans
+
+    def _plan(self, items: List[SearchItem]) -> List[Tuple[SearchItem, Dict[str, Any], List[SearchItem], List[SearchItem]]]:
+        """Decide which memory of each cluster is kept and what it absorbs."""
+        parsed = [self._parse(item) for item in items]
+        plans = []
+        for cluster in self._clusters(items):
+            by_kind: Dict[str, List[int]] = {}
+            for i in cluster:
+                by_kind.setdefault(parsed[i][0], []).append(i)
+            for kind, indices in by_kind.items():
+                if len(indices) < 2:
+                    continue
+                if kind == "Triple":
+                    plans.extend(self._merge_triples([(items[i], parsed[i][1]) for i in indices]))
+                else:
+                    # Episodes and free-text notes: the newest version supersedes the rest
+                    kept = items[indices[0]]
+                    plans.append((kept, kept.value, [], [items[i] for i in indices[1:]]))
+        return plans
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def consolidate_namespace(self, namespace: Tuple[str, ...], dry_run: bool = False) -> Dict[str, Any]:
+        """Consolidate the memories stored directly in one namespace.
+
+        Args:
+            namespace: The namespace, e.g. ("memories", user_id, "triples")
+            dry_run: Only report what would change
+
+        Returns:
+            Dict[str, Any]: Items before and after, merged and superseded counts,
+            bytes saved (values plus vectors) and probe search latency before
+            and after in ms
+        """
+        items = self._list_items(namespace)
+        report = {
+            "namespace": list(namespace),
+            "items_before": len(items),
+            "items_after": len(items),
+            "merged": 0,
+            "superseded": 0,
+            "bytes_saved": 0,
+            "search_ms_before": None,
+            "search_ms_after": None,
+        }
+        if len(items) < 2:
+            return report
+
+        plans = self._plan(items)
+        removed = [item for _, _, merged, superseded in plans for item in (*merged, *superseded)]
+        report["merged"] = sum(len(merged) for _, _, merged, _ in plans)
+        report["superseded"] = sum(len(superseded) for _, _, _, superseded in plans)
+        report["items_after"] = len(items) - len(removed)
+        report["bytes_saved"] = sum(len(json.dumps(item.value, default=str).encode("utf-8")) + EMBEDDING_DIMS * 4
+                                    for item in removed)
+        if dry_run or not removed:
+            return report
+
+        queries = [self._text(item) for item in items[:self.probe_queries]]
+        report["search_ms_before"] = self._probe(namespace, queries)
+        for kept, value, merged, superseded in plans:
+            if value is not kept.value:
+                self._pace()
+                self.store.put(namespace, kept.key, value)
+            for item in (*merged, *superseded):
+                self._pace()
+                self.store.delete(namespace, item.key)
+        report["search_ms_after"] = self._probe(namespace, queries)
+        metrics.inc("ltm_consolidation_removed_total", len(removed))
+        return report
+
+    def consolidate_user(self, user_id: str, dry_run: bool = False) -> Dict[str, Any]:
+        """Consolidate every memory namespace of a user.
+
+        Args:
+            user_id: The user whose memories are consolidated
+            dry_run: Only report what would change
+
+        Returns:
+            Dict[str, Any]: Per-namespace reports and their totals
+        """
+        reports = []
+        for namespace in self._list_namespaces(user_id):
+            if self._stop.is_set():
+                break
+            try:
+                reports.append(self.consolidate_namespace(namespace, dry_run=dry_run))
+            except Exception as e:
+                print(f"[WARNING] Could not consolidate {'/'.join(namespace)}: {e}")
+        metrics.inc("ltm_consolidation_runs_total")
+        return {
+            "user_id": user_id,
+            "namespaces": reports,
+            "items_before": sum(r["items_before"] for r in reports),
+            "items_after": sum(r["items_after"] for r in reports),
+            "bytes_saved": sum(r["bytes_saved"] for r in reports),
+        }
+
+    def consolidate_all(self, dry_run: bool = False) -> List[Dict[str, Any]]:
+        """Consolidate the memories of every user.
+
+        Args:
+            dry_run: Only report what would change
+
+        Returns:
+            List[Dict[str, Any]]: One report per user
+        """
+        reports = []
+        for user_id in self.list_users():
+            if self._stop.is_set():
+                break
+            reports.append(self.consolidate_user(user_id, dry_run=dry_run))
+        return reports
+
+
+class ConsolidationJob:
+    """Runs MemoryConsolidator.consolidate_all on a daemon thread every interval_s seconds."""
+
+    def __init__(self, consolidator: MemoryConsolidator, interval_s: float = 3600.0):
+        """Initialize the job.
+
+        Args:
+            consolidator: The consolidator to run
+            interval_s: Pause between the end of one pass and the start of the next
+        """
+        self.consolidator = consolidator
+        self.interval_s = interval_s
+        self.last_report: Optional[List[Dict[str, Any]]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ConsolidationJob":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="memory-consolidation", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.consolidator.stop()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.last_report = self.consolidator.consolidate_all()
+            except Exception as e:
+                print(f"[WARNING] Memory consolidation failed: {e}")
+
+
+def create_consolidator(is_busy: Optional[Callable[[], bool]] = None) -> MemoryConsolidator:
+    """Create a consolidator over the shared memory store, configured from CONFIG["memory_consolidation"].
+
+    Args:
+        is_busy: Returns True while live turns are running
+
+    Returns:
+        MemoryConsolidator: The consolidator
+    """
+    consolidation_config = get_config("memory_consolidation", {})
+    return MemoryConsolidator(
+        memory_store,
+        get_embeddings(),
+        similarity_threshold=float(consolidation_config.get("similarity_threshold", 0.92)),
+        ops_per_second=float(consolidation_config.get("max_ops_per_second", 20)),
+        max_items=int(consolidation_config.get("max_items", 10000)),
+        is_busy=is_busy,
+    )
@@ -0,0 +1,204 @@
+"""
+Conversation context policy for the LTM application.
+
+The checkpointer keeps the whole thread, but only a bounded part of it is
+sent to the model: a window of recent messages, a token budget, or a rolling
+summary of older turns followed by the recent ones.
+"""
+
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, get_buffer_string, trim_messages
+from langchain_core.runnables import RunnableConfig
+
+from config.app_config import get_config
+from config.prompt_templates import SUMMARY_PROMPT
+from core.state import State
+from utils import get_message_text
+
+try:
+    from langchain_core.messages.utils import count_tokens_approximately
+except ImportError:  # older langchain-core
+    def count_tokens_approximately(messages) -> int:
+        return sum(len(get_message_text(message)) // 4 + 3 for message in messages)
+
+CONTEXT_MODES = ("full", "window", "tokens", "summary")
+
+
+def get_context_policy() -> dict:
+    """Get the context policy with defaults filled in.
+
+    Returns:
+        dict: mode, max_messages, max_tokens and summary_trigger
+    """
+    policy = {
+        "mode": "summary",
+        "max_messages": 20,
+        "max_tokens": 4000,
+        "summary_trigger": 40,
+    }
+    policy.update(get_config("context_policy", {}))
+    if policy["mode"] not in CONTEXT_MODES:
+        print(f"[WARNING] Unknown context mode '{policy['mode']}', using 'full'")
+        policy["mode"] = "full"
+    return policy
+
+
+TRUNCATED_MARKER = "\n[... tool result truncated to fit the context budget ...]"
+
+
+def _current_turn(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """Get the latest user message and everything after it."""
+    return split_turn(messages)[1]
+
+
+def split_turn(messages: List[BaseMessage]) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """Split messages into the history and the current turn (the latest user message onwards)."""
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].type == "human":
+            return messages[:index], messages[index:]
+    return [], messages
+
+
+def _shrink_tool_results(messages: List[BaseMessage], max_tokens: int) -> List[BaseMessage]:
+    """Truncate tool results, oldest first, until the messages fit max_tokens.
+
+    The state is not modified; truncated results are copies.
+    """
+    messages = list(messages)
+    for index, message in enumerate(messages):
+        excess = count_tokens_approximately(messages) - max_tokens
+        if excess <= 0:
+            break
+        if message.type != "tool":
+            continue
+        text = get_message_text(message)
+        keep = max(0, len(text) - excess * 4 - len(TRUNCATED_MARKER))
+        messages[index] = message.model_copy(update={"content": text[:keep] + TRUNCATED_MARKER})
+    return messages
+
+
+def _keep_current_turn(trimmed: List[BaseMessage], messages: List[BaseMessage]) -> List[BaseMessage]:
+    """Fall back to the current turn when trimming dropped its user message."""
+    turn = _current_turn(messages)
+    return trimmed if len(trimmed) >= len(turn) else turn
+
+
+def select_context(state: State) -> List[BaseMessage]:
+    """Select the messages to send to the model for this call.
+
+    Windows always start on a user message, so a tool result is never sent
+    without the tool call that produced it. The latest user message and
+    everything after it are always kept: if the turn alone is over the
+    window it is sent whole, and if it is over the token budget its tool
+    results are truncated, oldest first.
+
+    Args:
+        state (State): The current state of the conversation.
+
+    Returns:
+        List[BaseMessage]: Messages for the prompt; in summary mode the
+        summary itself comes from context_summary
+    """
+    policy = get_context_policy()
+    messages = state["messages"]
+    if policy["mode"] == "full":
+        return messages
+
+    if policy["mode"] == "window":
+        trimmed = trim_messages(
+            messages, strategy="last", token_counter=len,
+            max_tokens=policy["max_messages"], start_on="human",
+        )
+        return _keep_current_turn(trimmed, messages)
+
+    if policy["mode"] == "tokens":
+        trimmed = trim_messages(
+            messages, strategy="last", token_counter=count_tokens_approximately,
+            max_tokens=policy["max_tokens"], start_on="human",
+        )
+        return _shrink_tool_results(_keep_current_turn(trimmed, messages), policy["max_tokens"])
+
+    # Summary mode: the summary stands in for everything before summary_upto
+    return messages[state.get("summary_upto", 0):]
+
+
+def context_summary(state: State) -> Optional[str]:
+    """Get the summary of the turns select_context left out, if any.
+
+    Args:
+        state (State): The current state of the conversation.
+
+    Returns:
+        Optional[str]: The rolling summary in summary mode, else None
+    """
+    if get_context_policy()["mode"] != "summary":
+        return None
+    return state.get("summary") or None
+
+
+def _summary_request(state: State):
+    """Work out whether older turns should be folded into the summary.
+
+    Returns:
+        tuple: (prompt text, new summary_upto) or None if nothing to do
+    """
+    policy = get_context_policy()
+    if policy["mode"] != "summary":
+        return None
+
+    messages = state["messages"]
+    upto = state.get("summary_upto", 0)
+    if len(messages) - upto <= policy["summary_trigger"]:
+        return None
+
+    # Keep the last max_messages verbatim, cutting at a user message
+    cut = len(messages) - policy["max_messages"]
+    while cut > upto and messages[cut].type != "human":
+        cut -= 1
+    if cut <= upto:
+        return None
+
+    prompt_text = SUMMARY_PROMPT.format(
+        summary=state.get("summary") or "(none)",
+        conversation=get_buffer_string(messages[upto:cut]),
+    )
+    return prompt_text, cut
+
+
+def summarize_conversation(state: State, config: RunnableConfig, model) -> dict:
+    """Fold turns that fell out of the window into the rolling summary.
+
+    Args:
+        state (State): The current state of the conversation.
+        config (RunnableConfig): The runtime configuration for the agent.
+        model: Chat model used to write the summary.
+
+    Returns:
+        dict: The updated summary and summary_upto, or no update
+    """
+    request = _summary_request(state)
+    if request is None:
+        return {}
+    prompt_text, cut = request
+    response = model.invoke(prompt_text)
+    return {"summary": get_message_text(response).strip(), "summary_upto": cut}
+
+
+async def asummarize_conversation(state: State, config: RunnableConfig, model) -> dict:
+    """Async version of summarize_conversation.
+
+    Args:
+        state (State): The current state of the conversation.
+        config (RunnableConfig): The runtime configuration for the agent.
+        model: Chat model used to write the summary.
+
+    Returns:
+        dict: The updated summary and summary_upto, or no update
+    """
+    request = _summary_request(state)
+    if request is None:
+        return {}
+    prompt_text, cut = request
+    response = await model.ainvoke(prompt_text)
+    return {"summary": get_message_text(response).strip(), "summary_upto": cut}
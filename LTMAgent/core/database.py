@@ -0,0 +1,139 @@
+"""
+MongoDB connection management for the LTM application.
+
+A single pooled MongoClient is shared by the checkpointer and the memory
+store, so each process opens one connection pool against the cluster.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from pymongo import MongoClient, monitoring
+from pymongo.database import Database
+
+from config.app_config import get_mongodb_store_config
+from core.instrumentation import MongoCommandListener
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Connection pool listener that keeps running counters for get_pool_stats()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "checkins": 0,
+            "checkout_failures": 0,
+            "pool_clears": 0,
+        }
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["open_connections"] = stats["connections_created"] - stats["connections_closed"]
+        stats["in_use"] = stats["checkouts"] - stats["checkins"]
+        return stats
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._bump("pool_clears")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._bump("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._bump("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._bump("checkout_failures")
+
+    def connection_checked_out(self, event):
+        self._bump("checkouts")
+
+    def connection_checked_in(self, event):
+        self._bump("checkins")
+
+
+_client_lock = threading.Lock()
+_client: Optional[MongoClient] = None
+_pool_listener = PoolStatsListener()
+
+
+def get_mongo_client() -> MongoClient:
+    """Get the process-wide MongoClient, creating it on first call.
+
+    Pool size and timeouts come from CONFIG["mongodb_pool"]. Every command's
+    round trip time is reported to the instrumentation metrics.
+
+    Returns:
+        MongoClient: The shared client
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                mongo_config = get_mongodb_store_config()
+                pool = mongo_config["pool"]
+                _client = MongoClient(
+                    mongo_config["uri"],
+                    maxPoolSize=pool["max_pool_size"],
+                    minPoolSize=pool["min_pool_size"],
+                    maxIdleTimeMS=pool["max_idle_time_ms"],
+                    connectTimeoutMS=pool["connect_timeout_ms"],
+                    serverSelectionTimeoutMS=pool["server_selection_timeout_ms"],
+                    waitQueueTimeoutMS=pool["wait_queue_timeout_ms"],
+                    event_listeners=[_pool_listener, MongoCommandListener()],
+                    # Connect on the first operation, not when the client is created
+                    connect=False,
+                )
+    return _client
+
+
+def get_database() -> Database:
+    """Get the configured application database on the shared client.
+
+    Returns:
+        Database: The database named by CONFIG["mongodb_db"]
+    """
+    return get_mongo_client()[get_mongodb_store_config()["db"]]
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Get connection pool statistics for the shared client.
+
+    Returns:
+        Dict[str, Any]: Pool settings and connection counters
+    """
+    stats: Dict[str, Any] = _pool_listener.snapshot()
+    stats["initialized"] = _client is not None
+    stats["max_pool_size"] = get_mongodb_store_config()["pool"]["max_pool_size"]
+    return stats
+
+
+def close_mongo_client() -> None:
+    """Close the shared client; the next get_mongo_client() call reconnects."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
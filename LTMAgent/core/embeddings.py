@@ -0,0 +1,255 @@
+"""
+Embedding helpers for the LTM application.
+
+Wraps the sentence-transformer model used by the memory store so identical
+texts are embedded once and then served from a content-addressed cache, and
+so concurrent embed calls from different sessions share one model batch.
+"""
+
+import array
+import hashlib
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from core.instrumentation import record_embedding
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-memory LRU and an optional on-disk tier.
+
+    Vectors are keyed by a SHA-256 of the model name, the embedding kind
+    (query or document) and the text, so switching models never serves stale
+    vectors. The disk tier is a small SQLite file that survives restarts.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 max_entries: int = 10000, cache_path: Optional[str] = None):
+        """Initialize the cache.
+
+        Args:
+            embeddings: The underlying embeddings model
+            model_name: Name of the model, part of every cache key
+            max_entries: Maximum number of vectors kept in memory
+            cache_path: Optional SQLite file for the persistent tier
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if cache_path:
+            self._disk = sqlite3.connect(cache_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._disk.commit()
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    vector = array.array("f", row[0]).tolist()
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+            self.misses += 1
+            return None
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        # Caller holds self._lock
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _store(self, entries: Dict[str, List[float]]) -> None:
+        with self._lock:
+            for key, vector in entries.items():
+                self._remember(key, vector)
+            if self._disk is not None:
+                self._disk.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, array.array("f", vector).tobytes()) for key, vector in entries.items()],
+                )
+                self._disk.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, computing only the texts not already cached."""
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            key = self._key("document", text)
+            if key in missing:
+                missing[key].append(i)
+                continue
+            vector = self._lookup(key)
+            if vector is None:
+                missing[key] = [i]
+            else:
+                results[i] = vector
+
+        if missing:
+            start = time.perf_counter()
+            vectors = self.embeddings.embed_documents([texts[idx[0]] for idx in missing.values()])
+            record_embedding("document", len(missing), time.perf_counter() - start)
+            computed = {}
+            for (key, indices), vector in zip(missing.items(), vectors):
+                vector = list(vector)
+                computed[key] = vector
+                for i in indices:
+                    results[i] = vector
+            self._store(computed)
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query, served from the cache when possible."""
+        key = self._key("query", text)
+        vector = self._lookup(key)
+        if vector is None:
+            start = time.perf_counter()
+            vector = list(self.embeddings.embed_query(text))
+            record_embedding("query", 1, time.perf_counter() - start)
+            self._store({key: vector})
+        return vector
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters.
+
+        Returns:
+            Dict[str, int]: Memory hits, disk hits, misses and cached entries
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._memory),
+            }
+
+
+class BatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that coalesces concurrent requests into batches.
+
+    Callers block on their own future while a single dispatcher thread waits
+    up to ``max_wait_ms`` for more requests, then embeds up to
+    ``max_batch_size`` texts with one ``embed_documents`` call and hands every
+    caller back its own vectors.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, symmetric: bool = True):
+        """Initialize the dispatcher.
+
+        Args:
+            embeddings: The underlying embeddings model
+            max_batch_size: Maximum number of texts per model call
+            max_wait_ms: How long to wait for more requests before flushing
+            symmetric: Whether queries and documents embed the same way (true
+                for all-MiniLM-L6-v2), so queries can join document batches
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.symmetric = symmetric
+        self.batches = 0
+        self.texts = 0
+
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                size += len(request[0])
+            self._flush(pending)
+
+    def _flush(self, pending: List[Tuple[List[str], Future]]) -> None:
+        texts = [text for request_texts, _ in pending for text in request_texts]
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts += len(texts)
+        offset = 0
+        for request_texts, future in pending:
+            future.set_result(vectors[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+    def _submit(self, texts: List[str]) -> List[List[float]]:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((list(texts), future))
+        return future.result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents as part of the next shared batch."""
+        if not texts:
+            return []
+        return self._submit(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query, batched with other requests when symmetric."""
+        if not self.symmetric:
+            return self.embeddings.embed_query(text)
+        return self._submit([text])[0]
+
+    def stats(self) -> Dict[str, float]:
+        """Get batching counters.
+
+        Returns:
+            Dict[str, float]: Number of batches, texts embedded and mean batch size
+        """
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+        }
@@ -2,21 +2,32 @@
 Graph construction for the LTM application.
 """
 
+import asyncio
+import threading
+
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.mongodb import MongoDBSaver
 from langgraph.graph import END, START, StateGraph
-from langgraph.prebuilt import ToolNode
-import os
-from pymongo import MongoClient
 
+from config.app_config import get_config, get_mongodb_store_config
+from core.database import get_mongo_client
+from core.instrumentation import InstrumentationHandler, format_trace, instrumentation_enabled
 from core.state import State
-from core.agent import agent, load_memories, route_tools
-from core.tools import all_tools
+from core.agent import agent, aagent, build_agent_chain, load_memories, aload_memories, route_tools
+from core.context import summarize_conversation, asummarize_conversation
+from core.tools import get_all_tools
+from core.tool_node import ConcurrentToolNode
 
-def build_graph(model_with_tools):
+def build_graph(model_with_tools, checkpointer=None, summary_model=None, tools=None):
     """Build the conversation graph with memory capabilities.
     
     Args:
         model_with_tools: The language model with bound tools
+        checkpointer: Optional checkpointer; defaults to MongoDB on the shared client
+        summary_model: Optional model without tools for the rolling summary;
+            defaults to model_with_tools
+        tools: Optional tools for the tools node; defaults to get_all_tools()
         
     Returns:
         Compiled graph ready for execution
@@ -25,32 +36,180 @@ def build_graph(model_with_tools):
     # Create the graph and add nodes
     builder = StateGraph(State)
     
-    # Add nodes
-    builder.add_node("load_memories", load_memories)
-    builder.add_node("agent", lambda state, config: agent(state, config, model_with_tools))
-    builder.add_node("tools", ToolNode(all_tools))
+    # Built once per graph, not per call
+    agent_chain = build_agent_chain(model_with_tools)
+
+    def call_agent(state, config):
+        return agent(state, config, agent_chain)
+
+    async def acall_agent(state, config):
+        return await aagent(state, config, agent_chain)
+
+    summarizer = summary_model or model_with_tools
+
+    def call_summarize(state, config):
+        return summarize_conversation(state, config, summarizer)
+
+    async def acall_summarize(state, config):
+        return await asummarize_conversation(state, config, summarizer)
+
+    # Add nodes; each has a sync and an async implementation so the same
+    # compiled graph serves stream() and astream() without blocking the loop
+    builder.add_node("load_memories", RunnableLambda(load_memories, afunc=aload_memories, name="load_memories"))
+    builder.add_node("summarize_conversation", RunnableLambda(call_summarize, afunc=acall_summarize, name="summarize_conversation"))
+    builder.add_node("agent", RunnableLambda(call_agent, afunc=acall_agent, name="agent"))
+    tool_config = get_config("tool_execution", {})
+    max_workers = int(tool_config.get("max_workers", 4))
+    tool_node = ConcurrentToolNode(
+        tools if tools is not None else get_all_tools(),
+        max_workers=max_workers,
+        pool_workers=int(tool_config.get("pool_workers", 0))
+        or max_workers * int(get_config("server", {}).get("max_concurrent_turns", 16)),
+    )
+    builder.add_node("tools", tool_node.as_runnable())
     
     # Add edges to the graph
+    # Memory prefetch and summarization are independent, so they run in
+    # parallel and the agent waits for both
     builder.add_edge(START, "load_memories")
-    builder.add_edge("load_memories", "agent")
+    builder.add_edge(START, "summarize_conversation")
+    builder.add_edge(["load_memories", "summarize_conversation"], "agent")
     builder.add_conditional_edges("agent", route_tools, ["tools", END])
     builder.add_edge("tools", "agent")
     
     # Compile the graph with MongoDB checkpointer for persistent memory
-    mongo_client = MongoClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
-    memory = MongoDBSaver(mongo_client, db_name="ltm_agent")
-    return builder.compile(checkpointer=memory)
+    if checkpointer is None:
+        checkpointer = create_checkpointer()
+    graph = builder.compile(checkpointer=checkpointer)
+    if instrumentation_enabled():
+        # Time every node, tool and model call of every run
+        graph = graph.with_config(callbacks=[InstrumentationHandler()])
+    return graph
+
+class LazyCheckpointer(BaseCheckpointSaver):
+    """Checkpointer proxy that defers creating the real saver until the first checkpoint operation.
+
+    MongoDBSaver creates its indexes when constructed, which connects to
+    MongoDB; behind this proxy that happens on the first turn, not when the
+    service starts.
+    """
+
+    def __init__(self, factory):
+        """Initialize the proxy.
+
+        Args:
+            factory: Zero-argument callable returning the real checkpointer
+        """
+        super().__init__()
+        self._factory = factory
+        self._saver = None
+        self._lock = threading.Lock()
+
+    @property
+    def saver(self) -> BaseCheckpointSaver:
+        """The real checkpointer, created on first access."""
+        if self._saver is None:
+            with self._lock:
+                if self._saver is None:
+                    self._saver = self._factory()
+                    self.serde = self._saver.serde
+        return self._saver
+
+    async def _asaver(self) -> BaseCheckpointSaver:
+        # First use connects and creates indexes; keep that off the event loop
+        return self._saver if self._saver is not None else await asyncio.to_thread(lambda: self.saver)
+
+    def __getattr__(self, name):
+        # Saver-specific attributes, e.g. MongoDBSaver.checkpoint_collection
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.saver, name)
+
+    def get_tuple(self, config):
+        return self.saver.get_tuple(config)
+
+    def list(self, config, **kwargs):
+        return self.saver.list(config, **kwargs)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id):
+        return self.saver.delete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+    async def aget_tuple(self, config):
+        return await (await self._asaver()).aget_tuple(config)
+
+    async def alist(self, config, **kwargs):
+        async for checkpoint in (await self._asaver()).alist(config, **kwargs):
+            yield checkpoint
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await (await self._asaver()).aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await (await self._asaver()).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await (await self._asaver()).adelete_thread(thread_id)
+
+def create_checkpointer() -> LazyCheckpointer:
+    """Create the MongoDB checkpointer on the shared, pooled client.
+    
+    The saver is built on the first checkpoint read or write, so creating
+    the service does not connect to MongoDB.
+    
+    Returns:
+        LazyCheckpointer: Proxy for a MongoDBSaver using the configured database and collections
+    """
+    def build() -> MongoDBSaver:
+        mongo_config = get_mongodb_store_config()
+        return MongoDBSaver(
+            get_mongo_client(),
+            db_name=mongo_config["db"],
+            checkpoint_collection_name=mongo_config["checkpoint_collection"],
+            writes_collection_name=mongo_config["writes_collection"],
+        )
+
+    return LazyCheckpointer(build)
 
 def pretty_print_stream_chunk(chunk):
     """Format and print stream chunks from the graph execution.
     
+    Accepts both node updates from stream()/process_message and token events
+    from LTMService.stream_response, which are printed incrementally. The
+    turn trace ending process_message output is printed as a breakdown.
+    
     Args:
         chunk: A chunk of data from the graph's stream method
     """
+    if "type" in chunk:
+        _print_stream_event(chunk)
+        return
+    if "trace" in chunk:
+        print(format_trace(chunk["trace"]), end="\n\n")
+        return
     for node, updates in chunk.items():
         print(f"Update from node: {node}")
         if "messages" in updates:
             updates["messages"][-1].pretty_print()
         else:
             print(updates)
-        print("\n")
\ No newline at end of file
+        print("\n")
+
+def _print_stream_event(event):
+    """Print a single token stream event without buffering whole messages."""
+    if event["type"] == "token":
+        print(event["text"], end="", flush=True)
+    elif event["type"] == "tool_call":
+        print(f"\n[tool call] {event['name']}({event['args']})", flush=True)
+    elif event["type"] == "tool_result":
+        print(f"[tool result] {event['name']}: {event['content'][:200]}", flush=True)
+    elif event["type"] == "final":
+        print("\n")
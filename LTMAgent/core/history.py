@@ -0,0 +1,319 @@
+"""
+Conversation history log for the LTM application.
+
+The checkpoint stores a thread's messages as one serialized list, so showing
+the last few messages of a long thread would mean loading all of them. The
+message log keeps one small document per user or assistant message, numbered
+per thread, so history is read a page at a time from an index, newest first.
+
+Threads that predate the log are imported from their checkpoint the first
+time their history is read; that is the only time their state is loaded.
+The import reads the checkpoint the thread had when the log first saw it,
+so messages logged since then are never imported twice or dropped.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+
+from config.app_config import get_config, get_mongodb_store_config
+from core.background import BackgroundWriter
+from utils import get_message_text
+
+KNOWN_THREADS = 10000
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def message_entry(message: BaseMessage) -> Optional[Dict[str, str]]:
+    """Convert a graph message to a history entry.
+
+    Returns:
+        Optional[Dict[str, str]]: {"role", "content"} for user messages and final
+        assistant answers; None for tool calls, tool results and system messages
+    """
+    if message.type == "human":
+        return {"role": "user", "content": get_message_text(message)}
+    if message.type == "ai" and not getattr(message, "tool_calls", None):
+        text = get_message_text(message)
+        return {"role": "assistant", "content": text} if text else None
+    return None
+
+
+def latest_checkpoint_id(checkpointer, thread_id: str) -> Optional[str]:
+    """Get the ID of a thread's latest checkpoint without deserializing it, or None if it has none."""
+    collection = getattr(checkpointer, "checkpoint_collection", None)
+    if collection is not None:
+        doc = collection.find_one({"thread_id": thread_id, "checkpoint_ns": ""}, {"checkpoint_id": 1},
+                                  sort=[("checkpoint_id", DESCENDING)])
+        return doc["checkpoint_id"] if doc is not None else None
+    checkpoint = checkpointer.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+    return checkpoint.config["configurable"]["checkpoint_id"] if checkpoint is not None else None
+
+
+class MessageLog:
+    """Per-thread message log in a MongoDB collection.
+
+    Messages: {thread_key: "<user_id>:<thread_id>", seq, role, content,
+    created_at}, unique on (thread_key, seq). Each thread also has one
+    counter document {_id: "seq:<thread_key>", seq, imported, checkpoint_id}
+    handing out sequence numbers; checkpoint_id is the checkpoint a thread
+    that predates the log had when the counter was created. Imported history
+    gets negative sequence numbers, so it sorts before everything logged
+    afterwards.
+    """
+
+    def __init__(self, collection: Collection, page_size: int = 50,
+                 latest_checkpoint: Optional[Callable[[str, str], Optional[str]]] = None,
+                 load_messages: Optional[Callable[[str, str, Optional[str]], List[BaseMessage]]] = None):
+        """Initialize the log.
+
+        Args:
+            collection: Collection holding messages and counters
+            page_size: Default number of messages per page
+            latest_checkpoint: Gets the ID of a thread's latest checkpoint, or None
+            load_messages: Loads a thread's messages from a checkpoint (user_id,
+                thread_id, checkpoint_id), for imports
+        """
+        self.collection = collection
+        self.page_size = page_size
+        self.latest_checkpoint = latest_checkpoint
+        self.load_messages = load_messages
+
+        self._known: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer = BackgroundWriter("message-log")
+        self._indexes_ready = False
+
+    @staticmethod
+    def thread_key(user_id: str, thread_id: str) -> str:
+        return f"{user_id}:{thread_id}"
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def ensure_indexes(self) -> None:
+        """Create the (thread_key, seq) index the pages are read from (idempotent)."""
+        if self._indexes_ready:
+            return
+        self.collection.create_index([("thread_key", ASCENDING), ("seq", DESCENDING)],
+                                     name="thread_seq", unique=True,
+                                     partialFilterExpression={"thread_key": {"$exists": True}})
+        self._indexes_ready = True
+
+    def _get_counter(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one({"_id": f"seq:{key}"})
+
+    def _create_counter(self, key: str, checkpoint_id: Optional[str]) -> None:
+        try:
+            self.collection.insert_one({"_id": f"seq:{key}", "seq": 0, "imported": checkpoint_id is None,
+                                        "checkpoint_id": checkpoint_id})
+        except DuplicateKeyError:
+            pass
+
+    def _next_seq(self, key: str) -> int:
+        counter = self.collection.find_one_and_update(
+            {"_id": f"seq:{key}"}, {"$inc": {"seq": 1}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        return counter["seq"]
+
+    def _insert(self, docs: List[Dict[str, Any]]) -> None:
+        self.ensure_indexes()
+        if docs:
+            self.collection.insert_many(docs, ordered=True)
+
+    def _find_page(self, key: str, before: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        self.ensure_indexes()
+        query: Dict[str, Any] = {"thread_key": key}
+        if before is not None:
+            query["seq"] = {"$lt": before}
+        return list(self.collection.find(query, {"_id": 0}).sort("seq", DESCENDING).limit(limit))
+
+    def _mark_imported(self, key: str) -> None:
+        self.collection.update_one({"_id": f"seq:{key}"}, {"$set": {"imported": True}}, upsert=True)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def prepare_thread(self, user_id: str, thread_id: str) -> None:
+        """Register a thread before its turn runs.
+
+        Must run before the turn writes its first checkpoint: a thread seen
+        for the first time is marked as needing an import only if it already
+        had a checkpoint, and that checkpoint is what will be imported. Costs
+        at most two lookups per thread and process.
+
+        Args:
+            user_id: The user ID
+            thread_id: The conversation thread ID
+        """
+        key = self.thread_key(user_id, thread_id)
+        with self._lock:
+            if key in self._known:
+                self._known.move_to_end(key)
+                return
+        if self._get_counter(key) is None:
+            checkpoint_id = self.latest_checkpoint(user_id, thread_id) if self.latest_checkpoint else None
+            self._create_counter(key, checkpoint_id)
+        with self._lock:
+            self._known[key] = True
+            while len(self._known) > KNOWN_THREADS:
+                self._known.popitem(last=False)
+
+    def append(self, user_id: str, thread_id: str, role: str, content: str, wait: bool = False) -> None:
+        """Append a message to a thread's log in the background.
+
+        Args:
+            user_id: The user ID
+            thread_id: The conversation thread ID
+            role: "user" or "assistant"
+            content: Message text
+            wait: Block until the write is done
+        """
+        key = self.thread_key(user_id, thread_id)
+        created_at = _now()
+
+        def write():
+            self._insert([{
+                "thread_key": key, "seq": self._next_seq(key),
+                "role": role, "content": content, "created_at": created_at,
+            }])
+
+        future = self._writer.submit(write, "log message")
+        if wait:
+            future.result()
+
+    def flush(self) -> None:
+        """Wait for pending appends to be written."""
+        self._writer.flush()
+
+    def _import(self, user_id: str, thread_id: str) -> None:
+        """Copy the messages from before the log existed out of the checkpoint the thread had then."""
+        key = self.thread_key(user_id, thread_id)
+        counter = self._get_counter(key)
+        if counter is None or counter.get("imported", True):
+            return
+        if self.load_messages is not None:
+            # Everything after this checkpoint was logged as it happened
+            messages = self.load_messages(user_id, thread_id, counter.get("checkpoint_id"))
+            older = [entry for entry in map(message_entry, messages) if entry]
+            created_at = _now()
+            self._insert([
+                {"thread_key": key, "seq": -(len(older) - i), **entry, "created_at": created_at}
+                for i, entry in enumerate(older)
+            ])
+        self._mark_imported(key)
+
+    def get_page(self, user_id: str, thread_id: str, limit: Optional[int] = None,
+                 cursor: Optional[int] = None) -> Dict[str, Any]:
+        """Read one page of a thread's history.
+
+        Args:
+            user_id: The user ID
+            thread_id: The conversation thread ID
+            limit: Page size; defaults to the log's page size
+            cursor: next_cursor of the previous (newer) page
+
+        Returns:
+            Dict[str, Any]: {"items": [{"role", "content", "created"}...] oldest first,
+            "next_cursor": cursor for the page before it, or None at the start}
+        """
+        limit = limit or self.page_size
+        key = self.thread_key(user_id, thread_id)
+        self.flush()
+        docs = self._find_page(key, cursor, limit + 1)
+        if len(docs) <= limit:
+            counter = self._get_counter(key)
+            if counter is None:
+                # A thread read before any turn ran on it since the log existed
+                self.prepare_thread(user_id, thread_id)
+                counter = self._get_counter(key)
+            if counter is not None and not counter.get("imported", True):
+                # Reached the start of the log of a thread that predates it
+                self._import(user_id, thread_id)
+                docs = self._find_page(key, cursor, limit + 1)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = docs[-1]["seq"]
+        items = [
+            {"role": doc["role"], "content": doc["content"], "created": doc["created_at"].isoformat()}
+            for doc in reversed(docs)
+        ]
+        return {"items": items, "next_cursor": next_cursor}
+
+
+class InMemoryMessageLog(MessageLog):
+    """Message log kept in process memory, for runs without MongoDB."""
+
+    def __init__(self, page_size: int = 50, latest_checkpoint=None, load_messages=None):
+        super().__init__(None, page_size=page_size, latest_checkpoint=latest_checkpoint,
+                         load_messages=load_messages)
+        self._messages: Dict[str, List[Dict[str, Any]]] = {}
+        self._counters: Dict[str, Dict[str, Any]] = {}
+        self._store_lock = threading.Lock()
+        self._indexes_ready = True
+
+    def _get_counter(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._store_lock:
+            counter = self._counters.get(key)
+            return dict(counter) if counter else None
+
+    def _create_counter(self, key: str, checkpoint_id: Optional[str]) -> None:
+        with self._store_lock:
+            self._counters.setdefault(key, {"seq": 0, "imported": checkpoint_id is None,
+                                            "checkpoint_id": checkpoint_id})
+
+    def _next_seq(self, key: str) -> int:
+        with self._store_lock:
+            counter = self._counters.setdefault(key, {"seq": 0, "imported": True})
+            counter["seq"] += 1
+            return counter["seq"]
+
+    def _insert(self, docs: List[Dict[str, Any]]) -> None:
+        with self._store_lock:
+            for doc in docs:
+                log = self._messages.setdefault(doc["thread_key"], [])
+                log.append(dict(doc))
+                log.sort(key=lambda d: d["seq"])
+
+    def _find_page(self, key: str, before: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        with self._store_lock:
+            docs = [d for d in self._messages.get(key, []) if before is None or d["seq"] < before]
+        return [dict(d) for d in reversed(docs[-limit:])]
+
+    def _mark_imported(self, key: str) -> None:
+        with self._store_lock:
+            self._counters.setdefault(key, {"seq": 0})["imported"] = True
+
+
+def create_message_log(latest_checkpoint=None, load_messages=None) -> MessageLog:
+    """Create the MongoDB message log on the shared client.
+
+    Args:
+        latest_checkpoint: Gets the ID of a thread's latest checkpoint, or None
+        load_messages: Loads a thread's messages from a checkpoint, for imports
+
+    Returns:
+        MessageLog: Log using the configured messages collection
+    """
+    from core.database import get_database
+
+    return MessageLog(
+        get_database()[get_mongodb_store_config()["messages_collection"]],
+        page_size=get_config("history", {}).get("page_size", 50),
+        latest_checkpoint=latest_checkpoint,
+        load_messages=load_messages,
+    )
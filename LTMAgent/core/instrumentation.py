@@ -0,0 +1,451 @@
+"""
+Latency instrumentation for the LTM application.
+
+A callback handler attached to the compiled graph times every node, tool
+and model call; the embedder and the MongoDB client report their own calls.
+Everything lands in process-wide metrics (rendered in the Prometheus text
+format) and, while a turn is being traced, in that turn's trace, so a slow
+turn can be broken down into where it spent its time.
+"""
+
+import contextvars
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from pymongo import monitoring
+
+from config.app_config import get_config
+
+GRAPH_NODES = ("load_memories", "summarize_conversation", "agent", "tools")
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms with Prometheus text exposition."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """Initialize an empty registry.
+
+        Args:
+            buckets: Upper bounds (seconds) of the histogram buckets
+        """
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+
+    @staticmethod
+    def _key(labels: Optional[Dict[str, str]]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in (labels or {}).items()))
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        """Register the type ("counter" or "histogram") and help text of a metric."""
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None) -> None:
+        """Add value to a counter."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """Set the current value of a gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """Record one observation in a histogram."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # Per-bucket counts, then sum and count
+            values = series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    values[i] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    @staticmethod
+    def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = [*key, *extra]
+        if not pairs:
+            return ""
+        escaped = (
+            name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for name, value in pairs
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics page
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted([*self._counters.items(), *self._gauges.items()]):
+                kind, help_text = self._help.get(name, ("gauge" if name in self._gauges else "counter", ""))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{self._format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                _, help_text = self._help.get(name, ("histogram", ""))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for key, values in sorted(series.items()):
+                    for bound, count in zip(self.buckets, values):
+                        lines.append(f"{name}_bucket{self._format_labels(key, (('le', f'{bound:g}'),))} {count:g}")
+                    lines.append(f"{name}_bucket{self._format_labels(key, (('le', '+Inf'),))} {values[-1]:g}")
+                    lines.append(f"{name}_sum{self._format_labels(key)} {values[-2]:.6f}")
+                    lines.append(f"{name}_count{self._format_labels(key)} {values[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drop all recorded values (descriptions are kept)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+metrics = Metrics()
+metrics.describe("ltm_turn_duration_seconds", "histogram", "Wall time of a conversation turn")
+metrics.describe("ltm_node_duration_seconds", "histogram", "Wall time of a graph node run")
+metrics.describe("ltm_tool_duration_seconds", "histogram", "Wall time of a tool call")
+metrics.describe("ltm_llm_duration_seconds", "histogram", "Wall time of a chat model call")
+metrics.describe("ltm_llm_tokens_total", "counter", "Chat model tokens by direction")
+metrics.describe("ltm_embedding_duration_seconds", "histogram", "Wall time of an embedding model call")
+metrics.describe("ltm_embedding_texts_total", "counter", "Texts sent to the embedding model")
+metrics.describe("ltm_mongo_command_duration_seconds", "histogram", "MongoDB command round trip time")
+metrics.describe("ltm_mongo_command_failures_total", "counter", "Failed MongoDB commands")
+
+
+# ============================================================================
+# TURN TRACES
+# ============================================================================
+
+class TurnTrace:
+    """Timings collected while one conversation turn runs."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_ms: Optional[float] = None
+        self.nodes: List[Dict[str, Any]] = []
+        self.tools: List[Dict[str, Any]] = []
+        self.llm = {"calls": 0, "ms": 0.0, "input_tokens": 0, "output_tokens": 0}
+        self.embeddings = {"calls": 0, "texts": 0, "ms": 0.0}
+        self.mongo = {"commands": 0, "ms": 0.0, "failures": 0}
+        self.recall: List[Dict[str, Any]] = []
+        self.routes: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, section: str, **values) -> None:
+        """Append an entry to a list section or add to the counters of a dict section."""
+        with self._lock:
+            target = getattr(self, section)
+            if isinstance(target, list):
+                target.append(values)
+            else:
+                for name, value in values.items():
+                    target[name] += value
+
+    def finish(self) -> "TurnTrace":
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        metrics.observe("ltm_turn_duration_seconds", self.total_ms / 1000)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the trace as plain data.
+
+        Returns:
+            Dict[str, Any]: Turn time, node and tool timings, model, embedding and
+            MongoDB totals, the recall packing and the model routing of the turn
+        """
+        with self._lock:
+            return {
+                "turn_ms": round(self.total_ms, 2) if self.total_ms is not None else None,
+                "nodes": [dict(entry) for entry in self.nodes],
+                "tools": [dict(entry) for entry in self.tools],
+                "llm": {**self.llm, "ms": round(self.llm["ms"], 2)},
+                "embeddings": {**self.embeddings, "ms": round(self.embeddings["ms"], 2)},
+                "mongo": {**self.mongo, "ms": round(self.mongo["ms"], 2)},
+                "recall": [dict(entry) for entry in self.recall],
+                "routes": [dict(entry) for entry in self.routes],
+            }
+
+
+_current_trace: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar(
+    "ltm_turn_trace", default=None
+)
+
+
+def start_trace() -> Tuple[TurnTrace, contextvars.Token]:
+    """Start tracing a turn in the current context.
+
+    Returns:
+        tuple: The new trace and the token to pass to end_trace()
+    """
+    trace = TurnTrace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(trace: TurnTrace, token: contextvars.Token) -> TurnTrace:
+    """Stop tracing the turn started with start_trace() and finish its trace."""
+    try:
+        _current_trace.reset(token)
+    except ValueError:
+        # A generator closed from another context (e.g. by garbage collection)
+        pass
+    return trace.finish()
+
+
+def current_trace() -> Optional[TurnTrace]:
+    return _current_trace.get()
+
+
+def instrumentation_enabled() -> bool:
+    return get_config("instrumentation", {}).get("enabled", True)
+
+
+# ============================================================================
+# RECORDERS
+# ============================================================================
+
+def record_embedding(kind: str, texts: int, seconds: float) -> None:
+    """Record one call to the embedding model.
+
+    Args:
+        kind: "query" or "document"
+        texts: Number of texts embedded
+        seconds: Wall time of the call
+    """
+    metrics.observe("ltm_embedding_duration_seconds", seconds, {"kind": kind})
+    metrics.inc("ltm_embedding_texts_total", texts, {"kind": kind})
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add("embeddings", calls=1, texts=texts, ms=seconds * 1000)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Command listener recording the round trip time of every MongoDB command.
+
+    pymongo calls it on the thread running the command, so commands issued
+    while a turn is traced are attributed to that turn.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, failed=False)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+    @staticmethod
+    def _record(event, failed: bool) -> None:
+        seconds = event.duration_micros / 1_000_000
+        labels = {"command": event.command_name}
+        metrics.observe("ltm_mongo_command_duration_seconds", seconds, labels)
+        if failed:
+            metrics.inc("ltm_mongo_command_failures_total", 1, labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add("mongo", commands=1, ms=seconds * 1000, failures=int(failed))
+
+
+class InstrumentationHandler(BaseCallbackHandler):
+    """Callback handler timing graph nodes, tools and chat model calls."""
+
+    # Timings are taken in the callback itself, so it must not be deferred
+    # to an executor under astream()
+    run_inline = True
+
+    def __init__(self):
+        self._starts: Dict[Any, Tuple[str, str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, kind: str, name: str) -> None:
+        with self._lock:
+            self._starts[run_id] = (kind, name, time.perf_counter())
+
+    def _stop(self, run_id) -> Optional[Tuple[str, str, float]]:
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+        if started is None:
+            return None
+        kind, name, start = started
+        return kind, name, time.perf_counter() - start
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run, not the same-named runnable it wraps
+        if node in GRAPH_NODES and kwargs.get("name") == node:
+            with self._lock:
+                nested = self._starts.get(parent_run_id, (None, None))[1] == node
+            if not nested:
+                self._start(run_id, "node", node)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        stopped = self._stop(run_id)
+        if stopped is not None:
+            self._record_node(stopped[1], stopped[2])
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        stopped = self._stop(run_id)
+        if stopped is not None:
+            self._record_node(stopped[1], stopped[2])
+
+    @staticmethod
+    def _record_node(node: str, seconds: float) -> None:
+        metrics.observe("ltm_node_duration_seconds", seconds, {"node": node})
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add("nodes", node=node, ms=round(seconds * 1000, 2))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        self._start(run_id, "tool", name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._record_tool(run_id, "success")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._record_tool(run_id, "error")
+
+    def _record_tool(self, run_id, status: str) -> None:
+        stopped = self._stop(run_id)
+        if stopped is None:
+            return
+        _, name, seconds = stopped
+        metrics.observe("ltm_tool_duration_seconds", seconds, {"tool": name, "status": status})
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add("tools", tool=name, ms=round(seconds * 1000, 2), status=status)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", (metadata or {}).get("langgraph_node", "unknown"))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", (metadata or {}).get("langgraph_node", "unknown"))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        stopped = self._stop(run_id)
+        if stopped is None:
+            return
+        _, node, seconds = stopped
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+
+        metrics.observe("ltm_llm_duration_seconds", seconds, {"node": node})
+        metrics.inc("ltm_llm_tokens_total", input_tokens, {"direction": "input"})
+        metrics.inc("ltm_llm_tokens_total", output_tokens, {"direction": "output"})
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add("llm", calls=1, ms=seconds * 1000,
+                      input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._stop(run_id)
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def render_metrics() -> str:
+    """Render the process-wide metrics in the Prometheus text format."""
+    return metrics.render()
+
+
+def format_trace(trace: Dict[str, Any]) -> str:
+    """Format a turn trace as a short, human-readable breakdown.
+
+    Args:
+        trace: A trace from TurnTrace.to_dict()
+
+    Returns:
+        str: One line for the turn and one per node, tool and backend
+    """
+    lines = [f"turn {trace['turn_ms']} ms"]
+    for entry in trace["nodes"]:
+        lines.append(f"  node {entry['node']:<24} {entry['ms']:>9} ms")
+    for entry in trace["tools"]:
+        lines.append(f"  tool {entry['tool']:<24} {entry['ms']:>9} ms  {entry['status']}")
+    llm, embeddings, mongo = trace["llm"], trace["embeddings"], trace["mongo"]
+    lines.append(f"  llm: {llm['calls']} calls, {llm['ms']} ms, "
+                 f"{llm['input_tokens']} in / {llm['output_tokens']} out tokens")
+    lines.append(f"  embeddings: {embeddings['calls']} calls, {embeddings['texts']} texts, {embeddings['ms']} ms")
+    lines.append(f"  mongo: {mongo['commands']} commands, {mongo['ms']} ms")
+    for entry in trace.get("recall", []):
+        lines.append(f"  recall: {entry['kept']}/{entry['candidates']} memories, "
+                     f"{entry['tokens']}/{entry['budget']} tokens ({entry['tokenizer']}), "
+                     f"{len(entry['dropped'])} dropped")
+        for dropped in entry["dropped"]:
+            lines.append(f"    dropped {dropped['kind']} {dropped['key']}: {dropped['reason']}")
+    for entry in trace.get("routes", []):
+        notes = [f"failed over from {', '.join(entry['failed'])}"] if entry["failed"] else []
+        notes += ["hedged"] if entry["hedged"] else []
+        lines.append(f"  route: {entry['provider']} in {entry['first_response_ms']} ms"
+                     + (f" ({'; '.join(notes)})" if notes else ""))
+    return "\n".join(lines)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics for Prometheus from a daemon thread; repeated calls reuse the server.
+
+    Args:
+        port: Port to listen on
+        host: Interface to bind; loopback by default, so metrics are not
+            exposed to the network unless asked for
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+            threading.Thread(
+                target=_metrics_server.serve_forever, name="metrics-server", daemon=True
+            ).start()
+            print(f"Serving metrics on http://{host}:{port}/metrics")
+    return _metrics_server
@@ -0,0 +1,366 @@
+"""
+Embedded local memory store for the LTM application.
+
+An alternative to the MongoDB store for machines without a vector-search
+cluster. Each namespace keeps its normalized embeddings in a memory-mapped
+float32 array next to a JSON metadata snapshot and a journal of the writes
+since, and search is a vectorized dot product with top-k selection, so
+startup only maps files and never waits for an index build. A write batch
+appends to the journal; the snapshot is rewritten only when the journal
+grows past the number of items.
+
+Texts and queries are embedded before the store lock is taken, so a slow
+embedding never holds up reads and searches in other namespaces.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langgraph.store.base import (
+    BaseStore,
+    GetOp,
+    Item,
+    ListNamespacesOp,
+    Op,
+    PutOp,
+    Result,
+    SearchItem,
+    SearchOp,
+)
+from langgraph.store.base.embed import get_text_at_path
+
+META_FILE = "meta.json"
+JOURNAL_FILE = "journal.jsonl"
+VECTORS_FILE = "vectors.f32"
+INITIAL_CAPACITY = 64
+# Journal entries always allowed before compacting, however few items there are
+MIN_COMPACT_ENTRIES = 256
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def _value_at(value: Any, path: str) -> Any:
+    """Read a dotted path such as "content.subject" from a stored value."""
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+class _Namespace:
+    """Items and vectors of a single namespace, backed by one directory."""
+
+    def __init__(self, path: str, namespace: Tuple[str, ...], dims: int):
+        self.path = path
+        self.namespace = namespace
+        self.dims = dims
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.free_rows: List[int] = []
+        self.capacity = 0
+        self.vectors: Optional[np.memmap] = None
+        self.journal_entries = 0
+        self._pending: List[Dict[str, Any]] = []
+
+    @classmethod
+    def create(cls, path: str, namespace: Tuple[str, ...], dims: int) -> "_Namespace":
+        os.makedirs(path, exist_ok=True)
+        ns = cls(path, namespace, dims)
+        ns._resize(INITIAL_CAPACITY)
+        ns.compact()
+        return ns
+
+    @classmethod
+    def load(cls, path: str) -> "_Namespace":
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        ns = cls(path, tuple(meta["namespace"]), meta["dims"])
+        for key, item in meta["items"].items():
+            ns.items[key] = _decode_item(item)
+        journal_path = os.path.join(path, JOURNAL_FILE)
+        if os.path.exists(journal_path):
+            with open(journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # a batch cut off by a crash
+                    if entry["op"] == "put":
+                        ns.items[entry["key"]] = _decode_item(entry["item"])
+                    else:
+                        ns.items.pop(entry["key"], None)
+                    ns.journal_entries += 1
+        # The vector file only grows, so its size is the capacity
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        ns.capacity = os.path.getsize(vectors_path) // (ns.dims * 4)
+        used = {item["row"] for item in ns.items.values() if item["row"] is not None}
+        ns.free_rows = [row for row in range(ns.capacity) if row not in used]
+        ns.vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(ns.capacity, ns.dims))
+        return ns
+
+    def _resize(self, capacity: int) -> None:
+        """Grow the vector file to capacity rows, keeping existing rows."""
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        old = self.vectors
+        if old is not None:
+            old.flush()
+        with open(vectors_path, "ab") as f:
+            f.truncate(capacity * self.dims * 4)
+        self.vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dims))
+        self.free_rows.extend(range(self.capacity, capacity))
+        self.capacity = capacity
+
+    def compact(self) -> None:
+        """Write every item to the snapshot and empty the journal."""
+        meta = {
+            "namespace": list(self.namespace),
+            "dims": self.dims,
+            "items": {key: _encode_item(item) for key, item in self.items.items()},
+        }
+        self.vectors.flush()
+        tmp_path = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+        open(os.path.join(self.path, JOURNAL_FILE), "w").close()
+        self.journal_entries = 0
+        self._pending.clear()
+
+    def save(self) -> None:
+        """Persist the writes since the last save: append them to the journal, or compact."""
+        if not self._pending:
+            return
+        if self.journal_entries + len(self._pending) > max(MIN_COMPACT_ENTRIES, len(self.items)):
+            self.compact()
+            return
+        # Vectors first, so a journal entry never points at an unwritten row
+        self.vectors.flush()
+        with open(os.path.join(self.path, JOURNAL_FILE), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in self._pending))
+        self.journal_entries += len(self._pending)
+        self._pending.clear()
+
+    def put(self, key: str, value: Dict[str, Any], vector: Optional[np.ndarray]) -> None:
+        now = _now()
+        existing = self.items.get(key)
+        row = existing["row"] if existing and existing["row"] is not None else None
+        if vector is not None and row is None:
+            if not self.free_rows:
+                self._resize(self.capacity * 2)
+            row = self.free_rows.pop(0)
+        elif vector is None and row is not None:
+            self.vectors[row] = 0
+            self.free_rows.append(row)
+            row = None
+        if vector is not None:
+            self.vectors[row] = vector
+        item = {
+            "value": value,
+            "row": row,
+            "created_at": existing["created_at"] if existing else now,
+            "updated_at": now,
+        }
+        self.items[key] = item
+        self._pending.append({"op": "put", "key": key, "item": _encode_item(item)})
+
+    def delete(self, key: str) -> None:
+        item = self.items.pop(key, None)
+        if item is not None:
+            if item["row"] is not None:
+                self.vectors[item["row"]] = 0
+                self.free_rows.append(item["row"])
+            self._pending.append({"op": "delete", "key": key})
+
+
+def _encode_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {**item, "created_at": item["created_at"].isoformat(), "updated_at": item["updated_at"].isoformat()}
+
+
+def _decode_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    item["created_at"] = datetime.fromisoformat(item["created_at"])
+    item["updated_at"] = datetime.fromisoformat(item["updated_at"])
+    return item
+
+
+class LocalVectorStore(BaseStore):
+    """BaseStore backed by memory-mapped per-namespace embedding arrays.
+
+    Scores are (1 + cosine) / 2, the same scale MongoDB Atlas vector search
+    reports for cosine similarity, so ranking and thresholds carry over.
+    """
+
+    def __init__(self, path: str, embeddings: Embeddings, dims: int,
+                 fields: Optional[List[str]] = None):
+        """Open (or create) a store under path.
+
+        Args:
+            path: Directory holding one subdirectory per namespace
+            embeddings: Embedder for stored texts and queries
+            dims: Embedding dimensions
+            fields: Value paths to embed; defaults to the whole value
+        """
+        self.path = path
+        self.embeddings = embeddings
+        self.dims = dims
+        self.fields = fields or ["$"]
+        self._lock = threading.RLock()
+        self._namespaces: Dict[Tuple[str, ...], _Namespace] = {}
+
+        os.makedirs(path, exist_ok=True)
+        for entry in os.listdir(path):
+            ns_path = os.path.join(path, entry)
+            if os.path.isfile(os.path.join(ns_path, META_FILE)):
+                ns = _Namespace.load(ns_path)
+                self._namespaces[ns.namespace] = ns
+
+    def _namespace(self, namespace: Tuple[str, ...], create: bool = False) -> Optional[_Namespace]:
+        ns = self._namespaces.get(namespace)
+        if ns is None and create:
+            digest = hashlib.sha1("\x1f".join(namespace).encode("utf-8")).hexdigest()[:16]
+            ns = _Namespace.create(os.path.join(self.path, f"ns_{digest}"), namespace, self.dims)
+            self._namespaces[namespace] = ns
+        return ns
+
+    def _text_for(self, op: PutOp) -> Optional[str]:
+        if op.index is False:
+            return None
+        fields = self.fields if op.index is None else list(op.index)
+        texts = [text for field in fields for text in get_text_at_path(op.value, field)]
+        return "\n".join(texts) if texts else None
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        array = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(array, axis=-1, keepdims=True)
+        return array / np.where(norms == 0, 1, norms)
+
+    def _embed(self, ops: List[Op]) -> Dict[int, np.ndarray]:
+        """Embed the texts of puts and the queries of searches, by op position, in one call each."""
+        put_texts = {}
+        for i, op in enumerate(ops):
+            if isinstance(op, PutOp) and op.value is not None:
+                text = self._text_for(op)
+                if text is not None:
+                    put_texts[i] = text
+        vectors: Dict[int, np.ndarray] = {}
+        if put_texts:
+            embedded = self._normalize(self.embeddings.embed_documents(list(put_texts.values())))
+            vectors.update(zip(put_texts, embedded))
+        for i, op in enumerate(ops):
+            if isinstance(op, SearchOp) and op.query:
+                vectors[i] = self._normalize(self.embeddings.embed_query(op.query))
+        return vectors
+
+    def _put(self, op: PutOp, vector: Optional[np.ndarray], touched: Dict[Tuple[str, ...], _Namespace]) -> None:
+        ns = self._namespace(tuple(op.namespace), create=op.value is not None)
+        if ns is None:
+            return
+        if op.value is None:
+            ns.delete(op.key)
+        else:
+            ns.put(op.key, op.value, vector)
+        touched[ns.namespace] = ns
+
+    def _get(self, op: GetOp) -> Optional[Item]:
+        ns = self._namespace(tuple(op.namespace))
+        item = ns.items.get(op.key) if ns else None
+        if item is None:
+            return None
+        return Item(
+            value=item["value"], key=op.key, namespace=ns.namespace,
+            created_at=item["created_at"], updated_at=item["updated_at"],
+        )
+
+    def _search(self, op: SearchOp, query: Optional[np.ndarray]) -> List[SearchItem]:
+        prefix = tuple(op.namespace_prefix)
+        candidates = []  # (namespace, key, item)
+        for namespace, ns in self._namespaces.items():
+            if namespace[:len(prefix)] != prefix:
+                continue
+            for key, item in ns.items.items():
+                if op.filter and any(_value_at(item["value"], path) != expected
+                                     for path, expected in op.filter.items()):
+                    continue
+                candidates.append((ns, key, item))
+
+        if not op.query:
+            candidates.sort(key=lambda c: c[2]["updated_at"], reverse=True)
+            window = candidates[op.offset:op.offset + op.limit]
+            return [self._search_item(ns, key, item, None) for ns, key, item in window]
+
+        # Like a vector index, semantic search only sees embedded items
+        candidates = [c for c in candidates if c[2]["row"] is not None]
+        scores = np.empty(len(candidates), dtype=np.float32)
+        by_namespace: Dict[Tuple[str, ...], List[int]] = {}
+        for i, (ns, _, _) in enumerate(candidates):
+            by_namespace.setdefault(ns.namespace, []).append(i)
+        for namespace, indices in by_namespace.items():
+            ns = self._namespaces[namespace]
+            rows = [candidates[i][2]["row"] for i in indices]
+            scores[indices] = ns.vectors[rows] @ query
+
+        wanted = min(len(candidates), op.offset + op.limit)
+        if wanted == 0:
+            return []
+        top = np.argpartition(-scores, wanted - 1)[:wanted]
+        top = top[np.argsort(-scores[top], kind="stable")][op.offset:]
+        return [
+            self._search_item(candidates[i][0], candidates[i][1], candidates[i][2], (1.0 + float(scores[i])) / 2.0)
+            for i in top
+        ]
+
+    @staticmethod
+    def _search_item(ns: _Namespace, key: str, item: Dict[str, Any], score: Optional[float]) -> SearchItem:
+        return SearchItem(
+            namespace=ns.namespace, key=key, value=item["value"],
+            created_at=item["created_at"], updated_at=item["updated_at"], score=score,
+        )
+
+    def _list_namespaces(self, op: ListNamespacesOp) -> List[Tuple[str, ...]]:
+        def matches(namespace, condition) -> bool:
+            path = tuple(condition.path)
+            part = namespace[:len(path)] if condition.match_type == "prefix" else namespace[-len(path):]
+            return len(part) == len(path) and all(p == "*" or p == n for p, n in zip(path, part))
+
+        namespaces = set()
+        for namespace in self._namespaces:
+            if op.match_conditions and not all(matches(namespace, c) for c in op.match_conditions):
+                continue
+            namespaces.add(namespace[:op.max_depth] if op.max_depth else namespace)
+        return sorted(namespaces)[op.offset:op.offset + op.limit]
+
+    def batch(self, ops: Iterable[Op]) -> List[Result]:
+        ops = list(ops)
+        for op in ops:
+            if not isinstance(op, (PutOp, GetOp, SearchOp, ListNamespacesOp)):
+                raise ValueError(f"Unsupported operation: {op!r}")
+        vectors = self._embed(ops)
+
+        results: List[Result] = []
+        touched: Dict[Tuple[str, ...], _Namespace] = {}
+        with self._lock:
+            for i, op in enumerate(ops):
+                if isinstance(op, PutOp):
+                    self._put(op, vectors.get(i), touched)
+                    results.append(None)
+                elif isinstance(op, GetOp):
+                    results.append(self._get(op))
+                elif isinstance(op, SearchOp):
+                    results.append(self._search(op, vectors.get(i)))
+                else:
+                    results.append(self._list_namespaces(op))
+            for ns in touched.values():
+                ns.save()
+        return results
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Result]:
+        return await asyncio.to_thread(self.batch, list(ops))
@@ -0,0 +1,167 @@
+"""
+Memory search result caching for the LTM application.
+
+The agent loop often repeats the same memory search within seconds. The
+caching store below serves those repeats from memory and drops cached
+results for a namespace as soon as anything is written to it.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from langgraph.store.base import BaseStore, Op, PutOp, Result, SearchOp
+
+SearchKey = Tuple[Tuple[str, ...], Optional[str], str, int, int]
+
+
+class SearchResultCache:
+    """LRU cache of search results with a TTL and namespace invalidation."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached searches
+            ttl_seconds: How long a cached result may be served
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._entries: "OrderedDict[SearchKey, Tuple[float, List[Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every write, so a search that started before a write
+        # cannot put its (possibly stale) result into the cache afterwards
+        self._generation = 0
+
+    @staticmethod
+    def key(op: SearchOp) -> SearchKey:
+        """Build the cache key of a search: namespace (which includes the user), query, filter, limit and offset."""
+        return (
+            tuple(op.namespace_prefix),
+            op.query,
+            json.dumps(op.filter, sort_keys=True, default=str),
+            op.limit,
+            op.offset,
+        )
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: SearchKey) -> Optional[List[Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: SearchKey, results: List[Any], generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: Tuple[str, ...]) -> None:
+        """Drop every cached search whose namespace prefix covers the written namespace."""
+        with self._lock:
+            self._generation += 1
+            stale = [key for key in self._entries if tuple(namespace[:len(key[0])]) == key[0]]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters.
+
+        Returns:
+            Dict[str, int]: Hits, misses, invalidated entries and cached entries
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+
+class CachingStore(BaseStore):
+    """Store wrapper that caches search results and invalidates them on writes.
+
+    Every put or delete in a namespace drops the cached searches covering it,
+    then notifies the registered write listeners.
+    """
+
+    def __init__(self, store: BaseStore, cache: SearchResultCache):
+        """Initialize the wrapper.
+
+        Args:
+            store: The store doing the actual work
+            cache: Cache for search results
+        """
+        self.store = store
+        self.cache = cache
+        self._write_listeners: List[Callable[[List[PutOp]], None]] = []
+
+    def add_write_listener(self, listener: Callable[[List[PutOp]], None]) -> None:
+        """Register a callback receiving the PutOps (value None means delete) of each write batch."""
+        self._write_listeners.append(listener)
+
+    def _split(self, ops: List[Op]):
+        """Answer cached searches and collect the ops that must reach the store."""
+        results: List[Result] = [None] * len(ops)
+        pending: List[int] = []
+        for i, op in enumerate(ops):
+            if isinstance(op, SearchOp):
+                cached = self.cache.get(SearchResultCache.key(op))
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            pending.append(i)
+        return results, pending
+
+    def _finish(self, ops: List[Op], results: List[Result], pending: List[int],
+                pending_results: List[Result], generation: int) -> List[Result]:
+        for i, result in zip(pending, pending_results):
+            results[i] = result
+            if isinstance(ops[i], SearchOp):
+                self.cache.put(SearchResultCache.key(ops[i]), result, generation)
+
+        writes = [op for op in ops if isinstance(op, PutOp)]
+        if writes:
+            for op in writes:
+                self.cache.invalidate(op.namespace)
+            for listener in self._write_listeners:
+                try:
+                    listener(writes)
+                except Exception as e:
+                    print(f"[WARNING] Memory write listener failed: {e}")
+        return results
+
+    def batch(self, ops: Iterable[Op]) -> List[Result]:
+        ops = list(ops)
+        generation = self.cache.generation
+        results, pending = self._split(ops)
+        pending_results = self.store.batch([ops[i] for i in pending]) if pending else []
+        return self._finish(ops, results, pending, pending_results, generation)
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Result]:
+        ops = list(ops)
+        generation = self.cache.generation
+        results, pending = self._split(ops)
+        pending_results = await self.store.abatch([ops[i] for i in pending]) if pending else []
+        return self._finish(ops, results, pending, pending_results, generation)
@@ -3,30 +3,243 @@ Memory management for the LTM application using LangMem with MongoDB Store.
 Supports Episodic, Semantic, Procedural, and Associative memory types.
 """
 
-from langchain_huggingface import HuggingFaceEmbeddings
+from langgraph.store.base import BaseStore
 from langgraph.store.mongodb.base import MongoDBStore, create_vector_index_config
-from pymongo import MongoClient
-import os
+import asyncio
+import threading
 from pydantic import BaseModel, Field
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
 from langmem import create_manage_memory_tool, create_search_memory_tool
-from typing import List
-
-print("Initializing MongoDB Memory Store")
-
-# MongoDB connection
-mongo_client = MongoClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
-db = mongo_client["ltm_agent"]
-collection = db["memories"]
-
-# LangGraph MongoDB store for LangMem tools
-memory_store = MongoDBStore(
-    collection=collection,
-    index_config=create_vector_index_config(
-        embed=HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"),
-        dims=384,  # all-MiniLM-L6-v2 has 384 dimensions
-        fields=["content"],
-    ),
-    auto_index_timeout=60  # Wait up to 60 seconds for index creation
+from concurrent.futures import ThreadPoolExecutor
+import json
+from typing import Any, Dict, List, Optional
+
+from config.app_config import get_config, get_mongodb_store_config
+from core.database import get_database
+from core.embeddings import BatchingEmbeddings, CachedEmbeddings
+from core.memory_cache import CachingStore, SearchResultCache
+from core.triple_index import InMemoryTripleIndex, TripleIndex, create_triple_index
+from utils import get_user_id
+
+# ============================================================================
+# LAZY RESOURCES
+# ============================================================================
+# The embedder and the MongoDB store are expensive (model load, connection,
+# index creation), so they are created on first use rather than at import.
+
+# Index settings come from CONFIG["memory_index"]; the "hf:" prefix names the
+# HuggingFace provider (sentence-transformers/all-MiniLM-L6-v2 by default)
+_index_config = get_mongodb_store_config()["index"]
+EMBEDDING_MODEL = _index_config["embed"].split(":", 1)[-1]
+EMBEDDING_DIMS = int(_index_config["dims"])
+
+_init_lock = threading.Lock()
+_embeddings: Optional[CachedEmbeddings] = None
+_memory_store: Optional[BaseStore] = None
+_triple_index: Optional[TripleIndex] = None
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """Get the shared embedder, loading the model on first call.
+
+    The sentence-transformer sits behind a content-addressed cache, so repeated
+    queries and memory writes are not re-embedded, and a micro-batcher, so
+    cache misses from concurrent sessions share one model call.
+
+    Returns:
+        CachedEmbeddings: The process-wide embedder
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _init_lock:
+            if _embeddings is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                embedding_cache_config = get_config("embedding_cache", {})
+                embedding_batch_config = get_config("embedding_batch", {})
+                _embeddings = CachedEmbeddings(
+                    BatchingEmbeddings(
+                        HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
+                        max_batch_size=int(embedding_batch_config.get("max_batch_size", 32)),
+                        max_wait_ms=float(embedding_batch_config.get("max_wait_ms", 5)),
+                    ),
+                    model_name=EMBEDDING_MODEL,
+                    max_entries=int(embedding_cache_config.get("max_entries", 10000)),
+                    cache_path=embedding_cache_config.get("path"),
+                )
+    return _embeddings
+
+
+def get_memory_store() -> BaseStore:
+    """Get the memory store, creating it on first call.
+
+    CONFIG["memory_backend"] selects MongoDB with Atlas vector search
+    ("mongodb") or the embedded memory-mapped store ("local").
+
+    Returns:
+        BaseStore: The process-wide memory store
+    """
+    global _memory_store
+    if _memory_store is None:
+        embeddings = get_embeddings()
+        with _init_lock:
+            if _memory_store is None and get_config("memory_backend") == "local":
+                from core.local_store import LocalVectorStore
+
+                print("Initializing Local Memory Store")
+                _memory_store = LocalVectorStore(
+                    get_config("local_store_path"),
+                    embeddings,
+                    dims=EMBEDDING_DIMS,
+                    fields=["content"],
+                )
+            elif _memory_store is None:
+                print("Initializing MongoDB Memory Store")
+                collection = get_database()[get_mongodb_store_config()["collection"]]
+                _memory_store = MongoDBStore(
+                    collection=collection,
+                    index_config=create_vector_index_config(
+                        embed=embeddings,
+                        dims=EMBEDDING_DIMS,  # all-MiniLM-L6-v2 has 384 dimensions
+                        fields=["content"],
+                    ),
+                    auto_index_timeout=60  # Wait up to 60 seconds for index creation
+                )
+    return _memory_store
+
+
+def configure_memory_store(store: BaseStore) -> None:
+    """Use an already built store (e.g. an InMemoryStore in benchmarks) as the memory store.
+
+    Must be called before the first memory operation.
+
+    Args:
+        store: The store the memory tools and prefetch should use
+    """
+    global _memory_store, _triple_index
+    with _init_lock:
+        _memory_store = store
+        _triple_index = InMemoryTripleIndex(memory_store)
+
+
+def get_triple_index() -> TripleIndex:
+    """Get the exact-match triple index, creating it on first call.
+
+    MongoDB-backed with the "mongodb" memory backend; otherwise kept in
+    memory and loaded from the store per user on first lookup.
+
+    Returns:
+        TripleIndex: The process-wide triple index
+    """
+    global _triple_index
+    if _triple_index is None:
+        with _init_lock:
+            if _triple_index is None and get_config("memory_backend") == "local":
+                _triple_index = InMemoryTripleIndex(memory_store)
+            elif _triple_index is None:
+                _triple_index = create_triple_index()
+    return _triple_index
+
+
+class LazyStore(BaseStore):
+    """Store proxy that defers creating the real store until the first operation.
+
+    Tools and graphs can hold this object from import time without paying for
+    the connection or the embedding model up front.
+    """
+
+    def __init__(self, factory):
+        """Initialize the proxy.
+
+        Args:
+            factory: Zero-argument callable returning the real store
+        """
+        self._factory = factory
+
+    def batch(self, ops):
+        return self._factory().batch(ops)
+
+    async def abatch(self, ops):
+        # First use connects and loads the model; keep that off the event loop
+        store = await asyncio.to_thread(self._factory)
+        return await store.abatch(ops)
+
+
+def _build_memory_store() -> CachingStore:
+    """Build the store the tools use: the lazy store behind the search cache.
+
+    The caching store also runs the write listeners (the triple index), so it
+    is always there; disabling the cache only makes it hold no entries.
+    """
+    cache_config = get_config("memory_search_cache", {})
+    enabled = cache_config.get("enabled", True)
+    return CachingStore(
+        LazyStore(get_memory_store),
+        SearchResultCache(
+            max_entries=int(cache_config.get("max_entries", 1024)) if enabled else 0,
+            ttl_seconds=float(cache_config.get("ttl_seconds", 60)),
+        ),
+    )
+
+
+memory_store = _build_memory_store()
+# Keep the exact-match triple index in sync with every semantic memory write
+memory_store.add_write_listener(lambda ops: get_triple_index().index_writes(ops))
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get counters of the embedding cache and the memory search cache.
+
+    Returns:
+        Dict[str, Any]: Statistics keyed by cache name, for caches in use
+    """
+    stats = {}
+    if _embeddings is not None:
+        stats["embeddings"] = _embeddings.stats()
+    if memory_store.cache.max_entries:
+        stats["memory_search"] = memory_store.cache.stats()
+    return stats
+
+
+def warm_up_memory(background: bool = True) -> Optional[threading.Thread]:
+    """Create the memory store and load the embedding model ahead of first use.
+
+    Args:
+        background: Run in a daemon thread instead of blocking the caller
+
+    Returns:
+        Optional[threading.Thread]: The warm-up thread when running in background
+    """
+    def _warm_up():
+        try:
+            get_memory_store()
+            get_embeddings().embed_query("warm up")
+        except Exception as e:
+            print(f"[WARNING] Memory warm-up failed: {e}")
+
+    if not background:
+        _warm_up()
+        return None
+    thread = threading.Thread(target=_warm_up, name="memory-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# Namespace templates for every memory type; "{user_id}" is filled in from the
+# runtime config by the LangMem tools and by search_all_memories below.
+MEMORY_NAMESPACES = {
+    "episodic": ("memories", "{user_id}", "episodes"),
+    "semantic": ("memories", "{user_id}", "triples"),
+    "procedural": ("memories", "{user_id}", "procedures"),
+    "general": ("memories", "{user_id}"),
+}
+
+# Maps the last namespace segment back to its memory type
+_NAMESPACE_KINDS = {"episodes": "episodic", "triples": "semantic", "procedures": "procedural"}
+
+# Shared pool for the per-namespace prefetch searches (threads start on first use)
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=len(MEMORY_NAMESPACES), thread_name_prefix="memory-prefetch"
 )
 
 # ============================================================================
@@ -76,40 +289,170 @@ class Procedural(BaseModel):
 
 # Episodic Memory Tools
 manage_episodic_memory_tool = create_manage_memory_tool(
-    namespace=("memories", "{user_id}", "episodes"),
-    store=memory_store
+    namespace=MEMORY_NAMESPACES["episodic"],
+    store=memory_store,
+    name="manage_episodic_memory"
 )
 search_episodic_memory_tool = create_search_memory_tool(
-    namespace=("memories", "{user_id}", "episodes"),
-    store=memory_store
+    namespace=MEMORY_NAMESPACES["episodic"],
+    store=memory_store,
+    name="search_episodic_memory"
 )
 
-# Semantic Memory Tools
+# Semantic Memory Tools (triples, so they land in the exact-match index)
 manage_semantic_memory_tool = create_manage_memory_tool(
-    namespace=("memories", "{user_id}", "triples"),
-    store=memory_store
+    namespace=MEMORY_NAMESPACES["semantic"],
+    schema=Triple,
+    store=memory_store,
+    name="manage_semantic_memory"
 )
 search_semantic_memory_tool = create_search_memory_tool(
-    namespace=("memories", "{user_id}", "triples"),
-    store=memory_store
+    namespace=MEMORY_NAMESPACES["semantic"],
+    store=memory_store,
+    name="search_semantic_memory"
+)
+
+def lookup_facts(subject: Optional[str] = None, predicate: Optional[str] = None,
+                 object: Optional[str] = None, *, config: RunnableConfig) -> str:
+    """Look up stored facts by exact subject, predicate or object.
+
+    Faster and more precise than search_semantic_memory when you know the
+    entity: e.g. subject="user" for everything known about the user, or
+    subject="user", predicate="prefers" for their preferences. Matching
+    ignores case and extra spaces; give a subject or an object.
+    """
+    try:
+        facts = get_triple_index().lookup(get_user_id(config), subject=subject,
+                                          predicate=predicate, object=object)
+    except ValueError as e:
+        return str(e)
+    return json.dumps(facts)
+
+
+async def alookup_facts(subject: Optional[str] = None, predicate: Optional[str] = None,
+                        object: Optional[str] = None, *, config: RunnableConfig) -> str:
+    return await asyncio.to_thread(lookup_facts, subject, predicate, object, config=config)
+
+
+lookup_facts_tool = StructuredTool.from_function(
+    func=lookup_facts,
+    coroutine=alookup_facts,
+    name="lookup_facts",
 )
 
 # Procedural Memory Tools
 manage_procedural_memory_tool = create_manage_memory_tool(
-    namespace=("memories", "{user_id}", "procedures"),
-    store=memory_store
+    namespace=MEMORY_NAMESPACES["procedural"],
+    store=memory_store,
+    name="manage_procedural_memory"
 )
 search_procedural_memory_tool = create_search_memory_tool(
-    namespace=("memories", "{user_id}", "procedures"),
-    store=memory_store
+    namespace=MEMORY_NAMESPACES["procedural"],
+    store=memory_store,
+    name="search_procedural_memory"
 )
 
 # General Memory Tools (for mixed usage)
 manage_general_memory_tool = create_manage_memory_tool(
-    namespace=("memories", "{user_id}"),
-    store=memory_store
+    namespace=MEMORY_NAMESPACES["general"],
+    store=memory_store,
+    name="manage_general_memory"
 )
 search_general_memory_tool = create_search_memory_tool(
-    namespace=("memories", "{user_id}"),
-    store=memory_store
+    namespace=MEMORY_NAMESPACES["general"],
+    store=memory_store,
+    name="search_general_memory"
 )
+
+
+# ============================================================================
+# MEMORY PREFETCH
+# ============================================================================
+
+def _user_namespaces(user_id: str) -> Dict[str, tuple]:
+    """Resolve every namespace template for a user."""
+    return {
+        kind: tuple(part.format(user_id=user_id) for part in template)
+        for kind, template in MEMORY_NAMESPACES.items()
+    }
+
+
+def _merge_hits(results) -> List[Dict[str, Any]]:
+    """Merge per-namespace search results into one ranked hit list.
+
+    The general namespace is a prefix of the typed ones, so the same memory can
+    come back more than once; hits are de-duplicated by (namespace, key) and
+    returned best score first.
+    """
+    hits: Dict[tuple, Dict[str, Any]] = {}
+    for kind, items in results:
+        if isinstance(items, Exception):
+            print(f"[WARNING] Memory prefetch failed for {kind} memories: {items}")
+            continue
+        for item in items:
+            ident = (tuple(item.namespace), item.key)
+            score = item.score if item.score is not None else 0.0
+            if ident in hits and hits[ident]["score"] >= score:
+                continue
+            hits[ident] = {
+                "kind": _NAMESPACE_KINDS.get(item.namespace[-1], "general"),
+                "namespace": tuple(item.namespace),
+                "key": item.key,
+                "content": item.value.get("content", item.value),
+                "score": score,
+                "updated_at": item.updated_at,
+            }
+
+    return sorted(hits.values(), key=lambda hit: hit["score"], reverse=True)
+
+
+def search_all_memories(user_id: str, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+    """Search every memory namespace of a user concurrently.
+
+    Args:
+        user_id: The user whose memories are searched
+        query: Natural language query, usually the latest user message
+        limit: Maximum number of hits per namespace
+
+    Returns:
+        List[Dict[str, Any]]: Hits with kind, namespace, key, content, score and updated_at
+    """
+    futures = {
+        kind: _prefetch_executor.submit(memory_store.search, namespace, query=query, limit=limit)
+        for kind, namespace in _user_namespaces(user_id).items()
+    }
+
+    results = []
+    for kind, future in futures.items():
+        try:
+            results.append((kind, future.result()))
+        except Exception as e:
+            results.append((kind, e))
+    return _merge_hits(results)
+
+
+async def asearch_all_memories(user_id: str, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+    """Async version of search_all_memories, searching namespaces with asyncio.gather.
+
+    Args:
+        user_id: The user whose memories are searched
+        query: Natural language query, usually the latest user message
+        limit: Maximum number of hits per namespace
+
+    Returns:
+        List[Dict[str, Any]]: Hits with kind, namespace, key, content, score and updated_at
+    """
+    namespaces = _user_namespaces(user_id)
+    results = await asyncio.gather(
+        *(memory_store.asearch(namespace, query=query, limit=limit) for namespace in namespaces.values()),
+        return_exceptions=True,
+    )
+    return _merge_hits(zip(namespaces, results))
+
+
+def format_memory_hit(hit: Dict[str, Any]) -> str:
+    """Render a memory hit as a single line for the recall block."""
+    content = hit["content"]
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    return f"[{hit['kind']}] {content}"
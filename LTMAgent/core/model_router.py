@@ -0,0 +1,431 @@
+"""
+Provider routing for the LTM application.
+
+The service used to bind exactly one chat model, so a slow or rate-limited
+Groq made every turn slow or failing. RoutingChatModel holds several
+providers (Groq and Ollama, each with the tools bound), keeps a rolling
+window of latency and errors per provider, sends each call to the first
+healthy provider in priority order, fails over when a provider errors
+before answering and can hedge a slow call by starting the next provider
+after a deadline. The decision is attached to the answer's
+response_metadata["route"] and to the turn trace.
+"""
+
+import asyncio
+import json
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, BaseMessageChunk
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from config.app_config import get_config
+from core.instrumentation import current_trace, metrics
+
+metrics.describe("ltm_model_route_total", "counter", "Chat model calls by provider and outcome")
+metrics.describe("ltm_model_first_response_seconds", "histogram",
+                 "Time to a provider's first chunk (whole answer when not streaming)")
+
+# Calls in a provider's window before its error rate or latency can demote it
+MIN_CALLS = 5
+
+# Window sample of a provider that lost a hedge race: its answer was never
+# awaited, so it counts as slower than any latency limit
+HEDGE_LOST = float("inf")
+
+# Inner provider calls are not traced separately: the router's own run
+# carries the answer, its token usage and the streamed chunks
+_UNTRACED = {"callbacks": []}
+
+
+class ProviderHealth:
+    """Rolling latency and error window per provider, shared by a router and its tool-bound copies."""
+
+    def __init__(self, window: int = 20, max_error_rate: float = 0.5, max_consecutive_failures: int = 3,
+                 failure_cooldown_s: float = 30.0, max_latency_s: float = 0.0):
+        """Initialize the tracker.
+
+        Args:
+            window: Number of recent calls kept per provider
+            max_error_rate: Error rate over the window from which a provider is demoted
+            max_consecutive_failures: Failures in a row from which a provider is demoted
+            failure_cooldown_s: How long a provider stays demoted after its last
+                failure or slow answer before it is tried first again
+            max_latency_s: Median first-response latency from which a provider is
+                demoted; 0 disables
+        """
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.max_consecutive_failures = max_consecutive_failures
+        self.failure_cooldown_s = failure_cooldown_s
+        self.max_latency_s = max_latency_s
+        self._calls: Dict[str, deque] = {}
+        self._consecutive_failures: Dict[str, int] = {}
+        # Time of the last failure or over-limit latency per provider
+        self._last_bad: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record_success(self, provider: str, seconds: float) -> None:
+        metrics.observe("ltm_model_first_response_seconds", seconds, {"provider": provider})
+        with self._lock:
+            self._calls.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+            self._consecutive_failures[provider] = 0
+            if self.max_latency_s and seconds > self.max_latency_s:
+                self._last_bad[provider] = time.monotonic()
+
+    def record_hedge_lost(self, provider: str) -> None:
+        """Record that another provider answered first after this one was hedged."""
+        metrics.inc("ltm_model_route_total", labels={"provider": provider, "outcome": "hedge_lost"})
+        with self._lock:
+            self._calls.setdefault(provider, deque(maxlen=self.window)).append(HEDGE_LOST)
+            self._last_bad[provider] = time.monotonic()
+
+    def record_failure(self, provider: str) -> None:
+        metrics.inc("ltm_model_route_total", labels={"provider": provider, "outcome": "error"})
+        with self._lock:
+            self._calls.setdefault(provider, deque(maxlen=self.window)).append(None)
+            self._consecutive_failures[provider] = self._consecutive_failures.get(provider, 0) + 1
+            self._last_bad[provider] = time.monotonic()
+
+    def _unhealthy(self, provider: str, now: float) -> bool:
+        # A demoted provider gets no calls, so its window cannot recover by
+        # itself; after the cooldown it is tried again and judged afresh
+        if now - self._last_bad.get(provider, float("-inf")) >= self.failure_cooldown_s:
+            return False
+        if self._consecutive_failures.get(provider, 0) >= self.max_consecutive_failures:
+            return True
+        calls = self._calls.get(provider)
+        if not calls or len(calls) < MIN_CALLS:
+            return False
+        latencies = [seconds for seconds in calls if seconds is not None]
+        if (len(calls) - len(latencies)) / len(calls) >= self.max_error_rate:
+            return True
+        return bool(self.max_latency_s and latencies and statistics.median(latencies) > self.max_latency_s)
+
+    def order(self, providers: List[str]) -> List[str]:
+        """Order providers for a call: healthy ones first, each group in priority order."""
+        now = time.monotonic()
+        with self._lock:
+            return sorted(providers, key=lambda provider: self._unhealthy(provider, now))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the rolling window per provider.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Calls, error rate, hedge races lost, median and
+            p95 first-response latency in ms of answered calls, and whether the
+            provider is currently demoted
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = {}
+            for provider, calls in self._calls.items():
+                errors = sum(1 for seconds in calls if seconds is None)
+                lost = sum(1 for seconds in calls if seconds == HEDGE_LOST)
+                latencies = sorted(seconds for seconds in calls if seconds is not None and seconds != HEDGE_LOST)
+                stats[provider] = {
+                    "calls": len(calls),
+                    "error_rate": round(errors / len(calls), 3) if calls else 0.0,
+                    "hedges_lost": lost,
+                    "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+                    "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+                    "demoted": self._unhealthy(provider, now),
+                }
+            return stats
+
+
+class RoutingChatModel(BaseChatModel):
+    """Chat model routing each call to one of several providers.
+
+    Providers are tried in priority order, healthy ones first. A provider
+    that fails before its first chunk is replaced by the next one; a failure
+    after output was streamed is raised. With hedge_after_s set, the next
+    provider is started when the current one has not answered by then, and
+    the first to answer wins.
+    """
+
+    providers: Dict[str, Any]
+    """Provider name to chat model (or tool-bound runnable), in priority order."""
+    hedge_after_s: float = 0.0
+    """Start the next provider when no answer arrived by then; 0 disables hedging."""
+    health: Any = None
+    """ProviderHealth shared with copies made by bind_tools."""
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        if self.health is None:
+            self.health = ProviderHealth()
+
+    @property
+    def _llm_type(self) -> str:
+        return "routing"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"providers": list(self.providers), "hedge_after_s": self.hedge_after_s}
+
+    def bind_tools(self, tools, **kwargs) -> "RoutingChatModel":
+        """Bind the tools to every provider; the copy shares this router's health tracker."""
+        return RoutingChatModel(
+            providers={name: model.bind_tools(tools, **kwargs) for name, model in self.providers.items()},
+            hedge_after_s=self.hedge_after_s,
+            health=self.health,
+        )
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def _route(self, provider: str, order: List[str], started: List[str], failed: List[str],
+               seconds: float) -> Dict[str, Any]:
+        """Record the winning provider and describe the decision."""
+        self.health.record_success(provider, seconds)
+        hedged = len(started) > len(failed) + 1
+        metrics.inc("ltm_model_route_total", labels={"provider": provider, "outcome": "hedged" if hedged else "ok"})
+        route = {
+            "provider": provider,
+            "order": order,
+            "failed": list(failed),
+            "hedged": hedged,
+            "first_response_ms": round(seconds * 1000, 2),
+        }
+        trace = current_trace()
+        if trace is not None:
+            trace.add("routes", **route)
+        return route
+
+    def _record_losers(self, winner: str, started: List[str], failed: List[str]) -> None:
+        """Count providers still running when another answered first as slow.
+
+        Their answers are dropped (or their calls cancelled), so without this
+        a provider that always loses to its hedge would stay first in line.
+        """
+        for provider in started:
+            if provider != winner and provider not in failed:
+                self.health.record_hedge_lost(provider)
+
+    def _race(self, run: Callable[[str], Iterator[Any]]) -> Iterator[Tuple[Dict[str, Any], Any]]:
+        """Run providers in worker threads and yield the winner's items with the route.
+
+        Args:
+            run: Calls one provider and iterates its output (chunks, or one message)
+
+        Yields:
+            tuple: (route, item) for every item of the winning provider
+        """
+        order = self.health.order(list(self.providers))
+        events: "queue.Queue[Tuple[str, str, Any]]" = queue.Queue()
+        started: List[str] = []
+        failed: List[str] = []
+        start_times: Dict[str, float] = {}
+        winner: Optional[str] = None
+        route: Dict[str, Any] = {}
+
+        def worker(provider: str) -> None:
+            try:
+                for item in run(provider):
+                    events.put((provider, "item", item))
+                    if winner not in (None, provider):
+                        return
+                events.put((provider, "done", None))
+            except Exception as e:
+                events.put((provider, "error", e))
+
+        def launch() -> bool:
+            if len(started) == len(order):
+                return False
+            provider = order[len(started)]
+            started.append(provider)
+            start_times[provider] = time.perf_counter()
+            threading.Thread(target=worker, args=(provider,), daemon=True,
+                             name=f"model-router-{provider}").start()
+            return True
+
+        launch()
+        while True:
+            can_hedge = winner is None and self.hedge_after_s > 0 and len(started) < len(order)
+            try:
+                provider, kind, payload = events.get(timeout=self.hedge_after_s if can_hedge else None)
+            except queue.Empty:
+                launch()
+                continue
+            if kind == "error":
+                if provider == winner:
+                    raise payload
+                if winner is not None:
+                    continue  # already recorded as a lost hedge
+                self.health.record_failure(provider)
+                failed.append(provider)
+                if len(failed) == len(started) and not launch():
+                    raise payload
+                continue
+            if winner is None:
+                winner = provider
+                route = self._route(provider, order, started, failed,
+                                    time.perf_counter() - start_times[provider])
+                self._record_losers(winner, started, failed)
+            if provider != winner:
+                continue
+            if kind == "done":
+                return
+            yield route, payload
+
+    async def _arace(self, run: Callable[[str], AsyncIterator[Any]]) -> AsyncIterator[Tuple[Dict[str, Any], Any]]:
+        """Async version of _race: providers run as tasks, losers are cancelled."""
+        order = self.health.order(list(self.providers))
+        events: "asyncio.Queue[Tuple[str, str, Any]]" = asyncio.Queue()
+        tasks: Dict[str, asyncio.Task] = {}
+        failed: List[str] = []
+        start_times: Dict[str, float] = {}
+        winner: Optional[str] = None
+        route: Dict[str, Any] = {}
+
+        async def worker(provider: str) -> None:
+            try:
+                async for item in run(provider):
+                    await events.put((provider, "item", item))
+                await events.put((provider, "done", None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await events.put((provider, "error", e))
+
+        def launch() -> bool:
+            if len(tasks) == len(order):
+                return False
+            provider = order[len(tasks)]
+            start_times[provider] = time.perf_counter()
+            tasks[provider] = asyncio.create_task(worker(provider))
+            return True
+
+        launch()
+        try:
+            while True:
+                can_hedge = winner is None and self.hedge_after_s > 0 and len(tasks) < len(order)
+                try:
+                    if can_hedge:
+                        provider, kind, payload = await asyncio.wait_for(events.get(), self.hedge_after_s)
+                    else:
+                        provider, kind, payload = await events.get()
+                except asyncio.TimeoutError:
+                    launch()
+                    continue
+                if kind == "error":
+                    if provider == winner:
+                        raise payload
+                    if winner is not None:
+                        continue  # already recorded as a lost hedge
+                    self.health.record_failure(provider)
+                    failed.append(provider)
+                    if len(failed) == len(tasks) and not launch():
+                        raise payload
+                    continue
+                if winner is None:
+                    winner = provider
+                    route = self._route(provider, order, list(tasks), failed,
+                                        time.perf_counter() - start_times[provider])
+                    self._record_losers(winner, list(tasks), failed)
+                    for name, task in tasks.items():
+                        if name != winner:
+                            task.cancel()
+                if provider != winner:
+                    continue
+                if kind == "done":
+                    return
+                yield route, payload
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    # ------------------------------------------------------------------
+    # BaseChatModel
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _as_chunk(message: BaseMessage) -> BaseMessageChunk:
+        """Providers without streaming support yield their whole answer from stream()."""
+        if isinstance(message, BaseMessageChunk):
+            return message
+        return AIMessageChunk(
+            content=message.content,
+            id=message.id,
+            additional_kwargs=message.additional_kwargs,
+            response_metadata=message.response_metadata,
+            usage_metadata=getattr(message, "usage_metadata", None),
+            tool_call_chunks=[
+                tool_call_chunk(name=call["name"], args=json.dumps(call["args"]), id=call["id"], index=i)
+                for i, call in enumerate(getattr(message, "tool_calls", []))
+            ],
+        )
+
+    @staticmethod
+    def _with_route(message: BaseMessage, route: Dict[str, Any]) -> BaseMessage:
+        return message.model_copy(update={"response_metadata": {**message.response_metadata, "route": route}})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        for route, message in self._race(
+            lambda provider: iter([self.providers[provider].invoke(messages, _UNTRACED, stop=stop, **kwargs)])
+        ):
+            return ChatResult(generations=[ChatGeneration(message=self._with_route(message, route))])
+        raise RuntimeError("No provider returned an answer.")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        async def run(provider: str):
+            yield await self.providers[provider].ainvoke(messages, _UNTRACED, stop=stop, **kwargs)
+
+        async for route, message in self._arace(run):
+            return ChatResult(generations=[ChatGeneration(message=self._with_route(message, route))])
+        raise RuntimeError("No provider returned an answer.")
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        first = True
+        for route, chunk in self._race(
+            lambda provider: self.providers[provider].stream(messages, _UNTRACED, stop=stop, **kwargs)
+        ):
+            chunk = self._as_chunk(chunk)
+            if first:
+                chunk, first = self._with_route(chunk, route), False
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        first = True
+        async for route, chunk in self._arace(
+            lambda provider: self.providers[provider].astream(messages, _UNTRACED, stop=stop, **kwargs)
+        ):
+            chunk = self._as_chunk(chunk)
+            if first:
+                chunk, first = self._with_route(chunk, route), False
+            yield ChatGenerationChunk(message=chunk)
+
+
+def create_routing_model(providers: Dict[str, BaseChatModel]) -> RoutingChatModel:
+    """Create a router over the given providers with the settings in CONFIG["model_routing"].
+
+    Args:
+        providers: Provider name to chat model, in priority order
+
+    Returns:
+        RoutingChatModel: The router
+    """
+    routing = get_config("model_routing", {})
+    return RoutingChatModel(
+        providers=providers,
+        hedge_after_s=float(routing.get("hedge_after_s", 0)),
+        health=ProviderHealth(
+            window=int(routing.get("window", 20)),
+            max_error_rate=float(routing.get("max_error_rate", 0.5)),
+            max_consecutive_failures=int(routing.get("max_consecutive_failures", 3)),
+            failure_cooldown_s=float(routing.get("failure_cooldown_s", 30)),
+            max_latency_s=float(routing.get("max_latency_s", 0)),
+        ),
+    )
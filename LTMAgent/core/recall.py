@@ -0,0 +1,246 @@
+"""
+Recall packing for the LTM application.
+
+Memory prefetch can return many hits, some of them long or repeated across
+namespaces. The packer below turns scored hits into the recall block under a
+token budget: it drops duplicates, ranks by relevance blended with recency,
+shortens oversized memories and keeps adding lines while they fit, and
+reports what it dropped so the prompt size of every turn is predictable.
+"""
+
+import hashlib
+import math
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.app_config import get_config
+from core.instrumentation import current_trace, metrics
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+metrics.describe("ltm_recall_memories_total", "counter", "Prefetched memories by packing outcome")
+
+# Where tiktoken downloads an encoding from; its cache file is named by the
+# SHA-1 of this URL
+ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/{name}.tiktoken"
+
+_encoding_lock = threading.Lock()
+_encodings: Dict[str, Any] = {}
+
+
+class TokenCounter:
+    """Counts and truncates text with a tiktoken encoding, or approximately (4 characters a token)."""
+
+    def __init__(self, encoding: Optional[Any] = None):
+        """Initialize the counter.
+
+        Args:
+            encoding: A tiktoken encoding; None counts approximately
+        """
+        self.encoding = encoding
+
+    @property
+    def name(self) -> str:
+        return self.encoding.name if self.encoding is not None else "approximate"
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / 4)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens tokens, marking the cut with an ellipsis."""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return self.encoding.decode(tokens[:max(max_tokens - 1, 0)]).rstrip() + "…"
+        return text[:max(max_tokens * 4 - 1, 0)].rstrip() + "…"
+
+
+def _cached_encoding_file(encoding_name: str) -> Optional[str]:
+    """Path of an encoding in the tiktoken cache, or None when it is not there.
+
+    The cache is TIKTOKEN_CACHE_DIR (or DATA_GYM_CACHE_DIR), else tiktoken's
+    default under the temp directory, so a vendored file can be provided by
+    pointing TIKTOKEN_CACHE_DIR at it.
+
+    Args:
+        encoding_name: tiktoken encoding
+
+    Returns:
+        Optional[str]: The cached file, if it exists
+    """
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return None
+    url = ENCODING_URL.format(name=encoding_name)
+    path = os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest())
+    return path if os.path.exists(path) else None
+
+
+def _load_encoding(encoding_name: str) -> Optional[Any]:
+    """Load a tiktoken encoding, downloading it only when CONFIG["recall"]["encoding_download"] is set."""
+    if _cached_encoding_file(encoding_name) is None \
+            and not get_config("recall", {}).get("encoding_download", False):
+        print(f"[WARNING] tiktoken encoding '{encoding_name}' is not in the tiktoken cache "
+              f"(TIKTOKEN_CACHE_DIR), approximating tokens; set LTM_RECALL_ENCODING_DOWNLOAD=true "
+              f"to download it")
+        return None
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        print(f"[WARNING] Could not load tiktoken encoding '{encoding_name}', "
+              f"approximating tokens: {e}")
+        return None
+
+
+def get_token_counter(encoding_name: Optional[str] = None) -> TokenCounter:
+    """Get a token counter for the configured encoding.
+
+    The tiktoken encoding is loaded once per process from the tiktoken cache
+    and never fetched over the network unless downloads are enabled; the
+    load runs outside the lock, so one slow load does not block turns that
+    only need an encoding already loaded. When tiktoken is not installed or
+    the encoding is not available, tokens are approximated instead.
+
+    Args:
+        encoding_name: tiktoken encoding; defaults to CONFIG["recall"]["encoding"]
+
+    Returns:
+        TokenCounter: The counter
+    """
+    encoding_name = encoding_name or get_config("recall", {}).get("encoding", "cl100k_base")
+    if not TIKTOKEN_AVAILABLE:
+        return TokenCounter()
+    with _encoding_lock:
+        if encoding_name in _encodings:
+            return TokenCounter(_encodings[encoding_name])
+    encoding = _load_encoding(encoding_name)
+    with _encoding_lock:
+        return TokenCounter(_encodings.setdefault(encoding_name, encoding))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def _recency(updated_at: Optional[datetime], now: datetime, half_life_days: float) -> float:
+    """1.0 for a memory written now, halving every half_life_days."""
+    if updated_at is None or half_life_days <= 0:
+        return 0.0
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    age_days = max((now - updated_at).total_seconds(), 0.0) / 86400
+    return 0.5 ** (age_days / half_life_days)
+
+
+def pack_recall(hits: List[Dict[str, Any]], format_hit: Callable[[Dict[str, Any]], str],
+                max_tokens: int = 800, max_results: int = 8, max_item_tokens: int = 200,
+                recency_weight: float = 0.2, half_life_days: float = 30.0,
+                counter: Optional[TokenCounter] = None,
+                now: Optional[datetime] = None) -> Tuple[List[str], Dict[str, Any]]:
+    """Pack memory hits into recall lines under a token budget.
+
+    Hits are ranked by (1 - recency_weight) * score + recency_weight * recency,
+    hits whose text repeats a better-ranked one are dropped, lines longer than
+    max_item_tokens are shortened, and lines are taken in rank order while
+    they fit in max_tokens (a line that does not fit is skipped, so a
+    shorter one further down can still be used).
+
+    Args:
+        hits: Hits with kind, key, content, score and updated_at
+        format_hit: Renders a hit as one recall line
+        max_tokens: Token budget for all recall lines together
+        max_results: Maximum number of lines
+        max_item_tokens: Maximum tokens of a single line
+        recency_weight: Share of the rank given to recency (0 ranks by score only)
+        half_life_days: Age at which a memory's recency halves
+        counter: Token counter; defaults to get_token_counter()
+        now: Reference time for recency; defaults to the current time
+
+    Returns:
+        tuple: (recall lines in rank order, report with candidates, kept,
+        tokens, budget, tokenizer and the dropped hits with their reason:
+        "duplicate", "limit" or "budget")
+    """
+    counter = counter or get_token_counter()
+    now = now or datetime.now(tz=timezone.utc)
+
+    ranked = sorted(
+        hits,
+        key=lambda hit: (1 - recency_weight) * (hit.get("score") or 0.0)
+        + recency_weight * _recency(hit.get("updated_at"), now, half_life_days),
+        reverse=True,
+    )
+
+    lines: List[str] = []
+    dropped: List[Dict[str, Any]] = []
+    seen = set()
+    used = truncated = 0
+    for hit in ranked:
+        line = format_hit(hit)
+        entry = {"kind": hit.get("kind"), "key": hit.get("key")}
+        text = _normalize(line)
+        if text in seen:
+            dropped.append({**entry, "reason": "duplicate"})
+            continue
+        seen.add(text)
+        if len(lines) >= max_results:
+            dropped.append({**entry, "reason": "limit"})
+            continue
+        shortened = counter.truncate(line, max_item_tokens)
+        truncated += shortened != line
+        tokens = counter.count(shortened)
+        if used + tokens > max_tokens:
+            dropped.append({**entry, "reason": "budget", "tokens": tokens})
+            continue
+        lines.append(shortened)
+        used += tokens
+
+    report = {
+        "candidates": len(hits),
+        "kept": len(lines),
+        "truncated": truncated,
+        "tokens": used,
+        "budget": max_tokens,
+        "tokenizer": counter.name,
+        "dropped": dropped,
+    }
+    metrics.inc("ltm_recall_memories_total", len(lines), {"outcome": "kept"})
+    for reason in ("duplicate", "limit", "budget"):
+        count = sum(1 for entry in dropped if entry["reason"] == reason)
+        if count:
+            metrics.inc("ltm_recall_memories_total", count, {"outcome": reason})
+    trace = current_trace()
+    if trace is not None:
+        trace.add("recall", **{name: value for name, value in report.items() if name != "dropped"},
+                  dropped=[dict(entry) for entry in dropped])
+    return lines, report
+
+
+def pack_recall_from_config(hits: List[Dict[str, Any]],
+                            format_hit: Callable[[Dict[str, Any]], str]) -> Tuple[List[str], Dict[str, Any]]:
+    """pack_recall with the limits from CONFIG["recall"] and CONFIG["memory_prefetch"]."""
+    recall_config = get_config("recall", {})
+    return pack_recall(
+        hits,
+        format_hit,
+        max_tokens=int(recall_config.get("max_tokens", 800)),
+        max_results=int(get_config("memory_prefetch", {}).get("max_results", 8)),
+        max_item_tokens=int(recall_config.get("max_item_tokens", 200)),
+        recency_weight=float(recall_config.get("recency_weight", 0.2)),
+        half_life_days=float(recall_config.get("half_life_days", 30)),
+    )
@@ -0,0 +1,140 @@
+"""
+Turn recording for the LTM application.
+
+Load tests with scripted conversations miss the shape of real traffic: how
+many tool calls a turn makes, how long tool results and answers are, and
+how turns arrive over time. With recording enabled, every turn is appended
+to a JSONL trace with its prompt, each model output (text and tool calls),
+each tool result and their timings. benchmarks/replay_trace.py replays such
+a trace against the graph with the model and tools answered from the trace.
+"""
+
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+
+from config.app_config import get_config
+from core.background import BackgroundWriter
+from utils import get_message_text
+
+
+def turn_messages(messages: List[BaseMessage], user_prompt: str) -> List[BaseMessage]:
+    """Get the messages a turn added after its user prompt."""
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if message.type == "human" and get_message_text(message) == user_prompt:
+            return messages[index + 1:]
+    return []
+
+
+def build_turn_record(user_id: str, thread_id: str, user_prompt: str, messages: List[BaseMessage],
+                      trace: Optional[Dict[str, Any]] = None, started_at: Optional[float] = None) -> Dict[str, Any]:
+    """Describe one turn for the trace file.
+
+    Model steps get the time of their agent node and tool steps the time of
+    their tool call, taken in order from the turn trace when there is one.
+
+    Args:
+        user_id: The user ID
+        thread_id: The conversation thread ID
+        user_prompt: The user's message
+        messages: Messages the turn added (see turn_messages)
+        trace: The turn trace from TurnTrace.to_dict()
+        started_at: Unix time the turn started
+
+    Returns:
+        Dict[str, Any]: user_id, thread_id, prompt, started_at, turn_ms and
+        steps: {"type": "model", content, tool_calls, ms} and
+        {"type": "tool", name, tool_call_id, content, status, ms}
+    """
+    agent_ms = [entry["ms"] for entry in (trace or {}).get("nodes", []) if entry["node"] == "agent"]
+    tool_ms: Dict[str, List[float]] = {}
+    for entry in (trace or {}).get("tools", []):
+        tool_ms.setdefault(entry["tool"], []).append(entry["ms"])
+
+    steps = []
+    for message in messages:
+        if message.type == "ai":
+            steps.append({
+                "type": "model",
+                "content": get_message_text(message),
+                "tool_calls": [{"name": call["name"], "args": call["args"], "id": call["id"]}
+                               for call in message.tool_calls],
+                "ms": agent_ms.pop(0) if agent_ms else None,
+            })
+        elif message.type == "tool":
+            timings = tool_ms.get(message.name) or []
+            steps.append({
+                "type": "tool",
+                "name": message.name,
+                "tool_call_id": message.tool_call_id,
+                "content": get_message_text(message),
+                "status": getattr(message, "status", "success"),
+                "ms": timings.pop(0) if timings else None,
+            })
+    return {
+        "user_id": user_id,
+        "thread_id": thread_id,
+        "prompt": user_prompt,
+        "started_at": started_at,
+        "turn_ms": (trace or {}).get("turn_ms"),
+        "steps": steps,
+    }
+
+
+class TurnRecorder:
+    """Appends turn records to a JSONL file from a background writer."""
+
+    def __init__(self, path: str):
+        """Initialize the recorder.
+
+        Args:
+            path: JSONL file to append to
+        """
+        self.path = path
+        self.recorded = 0
+
+        self._writer = BackgroundWriter("turn-recorder")
+        self._lock = threading.Lock()
+
+    def record(self, record: Dict[str, Any]) -> None:
+        """Queue a turn record (see build_turn_record) for appending."""
+        line = json.dumps(record, default=str) + "\n"
+
+        def write():
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            with self._lock:
+                self.recorded += 1
+
+        self._writer.submit(write, f"record turn to {self.path}")
+
+    def flush(self) -> None:
+        """Wait for pending appends."""
+        self._writer.flush()
+
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    """Read the turn records of a trace file, in arrival order.
+
+    Args:
+        path: JSONL file written by TurnRecorder
+
+    Returns:
+        List[Dict[str, Any]]: Turn records sorted by started_at
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    records.sort(key=lambda record: record.get("started_at") or 0.0)
+    return records
+
+
+def create_turn_recorder() -> Optional[TurnRecorder]:
+    """Create the recorder for CONFIG["replay"]["record_path"], or None when recording is off."""
+    path = get_config("replay", {}).get("record_path")
+    return TurnRecorder(path) if path else None
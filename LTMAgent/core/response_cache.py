@@ -0,0 +1,264 @@
+"""
+Response cache for the LTM application.
+
+Users often ask the same factual or how-to question again, and each time the
+agent pays for a full generation. When enabled, the first agent call of a
+turn is answered from this cache if the same user asked the same question
+(exact tier) or a very similar one (semantic tier, by embedding similarity)
+with the same recall context and at the same point of a conversation: the
+key includes the previous assistant message and the thread's summary, so a
+follow-up such as "tell me more about that" only matches after the same
+answer. A thread's first question has no conversation context and can be
+answered from another thread. Only direct answers are cached, never answers
+that needed tools, and a user's entries are dropped whenever their memories
+change.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, BaseMessage
+from langgraph.store.base import PutOp
+
+from config.app_config import get_config
+from core.instrumentation import metrics
+from utils import get_message_text
+
+CacheKey = Tuple[str, str, str]
+
+metrics.describe("ltm_response_cache_total", "counter", "Response cache lookups by result")
+metrics.describe("ltm_response_cache_saved_seconds_total", "counter",
+                 "Generation time saved by response cache hits")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt for matching: case, whitespace and trailing punctuation."""
+    return " ".join(prompt.casefold().split()).rstrip(" ?!.")
+
+
+def recall_fingerprint(recall: List[str], context: str = "") -> str:
+    """Hash the recall lines and conversation context a response was generated with."""
+    return hashlib.sha256("\n".join([*recall, "\x00", context]).encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("text", "vector", "generation_s", "expires")
+
+    def __init__(self, text: str, vector: Optional[np.ndarray], generation_s: float, expires: float):
+        self.text = text
+        self.vector = vector
+        self.generation_s = generation_s
+        self.expires = expires
+
+
+class ResponseCache:
+    """LRU cache of direct agent answers per (user, normalized prompt, recall and conversation context)."""
+
+    def __init__(self, embeddings: Optional[Embeddings] = None, max_entries: int = 1000,
+                 ttl_seconds: float = 86400.0, similarity_threshold: float = 0.95,
+                 min_prompt_words: int = 3):
+        """Initialize the cache.
+
+        Args:
+            embeddings: Embedder for the semantic tier; None for exact matches only
+            max_entries: Maximum number of cached answers
+            ttl_seconds: How long an answer may be served
+            similarity_threshold: Cosine similarity from which a prompt counts as
+                the same question
+            min_prompt_words: Shorter prompts ("yes", "and Tokyo?") depend on the
+                conversation, so they are never cached
+        """
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.min_prompt_words = min_prompt_words
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, user_id: str, prompt: str, recall: List[str], context: str) -> Optional[CacheKey]:
+        normalized = normalize_prompt(prompt)
+        if len(normalized.split()) < self.min_prompt_words:
+            return None
+        return (user_id, normalized, recall_fingerprint(recall, context))
+
+    def _embed(self, normalized: str) -> Optional[np.ndarray]:
+        if self.embeddings is None:
+            return None
+        vector = np.asarray(self.embeddings.embed_query(normalized), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _hit(self, entry: _Entry, tier: str) -> Tuple[str, str]:
+        if tier == "exact":
+            self.exact_hits += 1
+        else:
+            self.semantic_hits += 1
+        self.saved_seconds += entry.generation_s
+        metrics.inc("ltm_response_cache_total", labels={"result": tier})
+        metrics.inc("ltm_response_cache_saved_seconds_total", entry.generation_s)
+        return entry.text, tier
+
+    def get(self, user_id: str, prompt: str, recall: List[str], context: str = "") -> Optional[Tuple[str, str]]:
+        """Find a cached answer.
+
+        Args:
+            user_id: The user asking
+            prompt: The user's message
+            recall: The recall lines of this turn
+            context: The conversation context of this turn (see conversation_context)
+
+        Returns:
+            Optional[Tuple[str, str]]: (answer, "exact" or "semantic"), or None
+        """
+        key = self._key(user_id, prompt, recall, context)
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires >= now:
+                self._entries.move_to_end(key)
+                return self._hit(entry, "exact")
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if k[0] == user_id and k[2] == key[2] and e.vector is not None and e.expires >= now]
+
+        if candidates:
+            vector = self._embed(key[1])
+            if vector is not None:
+                best_key, best = max(candidates, key=lambda c: float(c[1].vector @ vector))
+                if float(best.vector @ vector) >= self.similarity_threshold:
+                    with self._lock:
+                        if best_key in self._entries:
+                            self._entries.move_to_end(best_key)
+                        return self._hit(best, "semantic")
+
+        with self._lock:
+            self.misses += 1
+        metrics.inc("ltm_response_cache_total", labels={"result": "miss"})
+        return None
+
+    def put(self, user_id: str, prompt: str, recall: List[str], text: str, generation_s: float,
+            context: str = "") -> None:
+        """Cache a direct answer.
+
+        Args:
+            user_id: The user who asked
+            prompt: The user's message
+            recall: The recall lines the answer was generated with
+            text: The answer
+            generation_s: How long generating it took, credited on every hit
+            context: The conversation context the answer was generated in
+        """
+        key = self._key(user_id, prompt, recall, context)
+        if key is None or not text:
+            return
+        entry = _Entry(text, self._embed(key[1]), generation_s, time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop every cached answer of a user."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == user_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def invalidate_writes(self, ops: List[PutOp]) -> None:
+        """Write listener for the memory store: drop the answers of users whose memories changed."""
+        for user_id in {op.namespace[1] for op in ops if len(op.namespace) > 1 and op.namespace[0] == "memories"}:
+            self.invalidate_user(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters.
+
+        Returns:
+            Dict[str, Any]: Exact and semantic hits, misses, hit rate, invalidated
+            entries, cached entries and generation time saved
+        """
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "saved_s": round(self.saved_seconds, 3),
+            }
+
+
+def cacheable_turn(messages: List[BaseMessage]) -> Optional[str]:
+    """Get the user prompt if this agent call starts a turn (the last message is the user's)."""
+    if messages and messages[-1].type == "human":
+        return get_message_text(messages[-1]).strip()
+    return None
+
+
+def conversation_context(messages: List[BaseMessage], summary: Optional[str] = None) -> str:
+    """Describe where in a conversation a prompt was asked.
+
+    Returns the thread's summary and the last assistant message before the
+    prompt, or "" for the first question of a thread.
+    """
+    previous = ""
+    for message in reversed(messages[:-1]):
+        if message.type == "ai":
+            previous = get_message_text(message)
+            break
+    return f"{summary or ''}\x00{previous}" if summary or previous else ""
+
+
+def cached_message(text: str, tier: str) -> AIMessage:
+    """Build the agent message for a cached answer, marked in response_metadata."""
+    return AIMessage(content=text, response_metadata={"response_cache": tier})
+
+
+_cache_lock = threading.Lock()
+_response_cache: Optional[ResponseCache] = None
+_configured = False
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the response cache configured in CONFIG["response_cache"], or None when disabled.
+
+    The semantic tier reuses the memory embedder, and the cache listens to
+    memory writes to invalidate users whose memories change.
+
+    Returns:
+        Optional[ResponseCache]: The process-wide cache
+    """
+    global _response_cache, _configured
+    if not _configured:
+        with _cache_lock:
+            if not _configured:
+                cache_config = get_config("response_cache", {})
+                if cache_config.get("enabled"):
+                    from core.memory_manager import get_embeddings, memory_store
+
+                    _response_cache = ResponseCache(
+                        embeddings=get_embeddings() if cache_config.get("semantic", True) else None,
+                        max_entries=int(cache_config.get("max_entries", 1000)),
+                        ttl_seconds=float(cache_config.get("ttl_seconds", 86400)),
+                        similarity_threshold=float(cache_config.get("similarity_threshold", 0.95)),
+                        min_prompt_words=int(cache_config.get("min_prompt_words", 3)),
+                    )
+                    memory_store.add_write_listener(_response_cache.invalidate_writes)
+                _configured = True
+    return _response_cache
@@ -0,0 +1,258 @@
+"""
+Internet search for the LTM application.
+
+SearxSearchResults opened a new HTTP connection for every query, ignored
+the configured request timeout and blocked the event loop under astream.
+SearxSearch keeps one pooled sync and one pooled async httpx client for
+the Searx instance, applies CONFIG["request_timeout"] to every request and
+caches results for a short time per normalized query, so the model asking
+the same thing twice in a conversation costs one request.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_core.tools import BaseTool, StructuredTool
+
+from config.app_config import get_config
+from core.instrumentation import metrics
+
+metrics.describe("ltm_search_requests_total", "counter", "Internet searches by cache result and status")
+
+SEARCH_TOOL_DESCRIPTION = (
+    "A meta search engine. Useful for when you need to answer questions about current events. "
+    "Input should be a search query. Output is a JSON array of the query results."
+)
+NO_RESULTS = [{"Result": "No good Search Result was found"}]
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query for caching (case and whitespace)."""
+    return " ".join(query.casefold().split())
+
+
+class SearxSearch:
+    """Searx client with pooled connections, a request timeout and a TTL result cache."""
+
+    def __init__(self, host: str, num_results: int = 5, timeout_s: float = 10.0,
+                 max_connections: int = 10, cache_ttl_s: float = 300.0, cache_entries: int = 512):
+        """Initialize the client.
+
+        Args:
+            host: URL of the Searx instance (or of its /search endpoint)
+            num_results: Results returned per query
+            timeout_s: Timeout of each request (connect, read and write)
+            max_connections: Connection pool size of each client
+            cache_ttl_s: How long results are reused for the same query; 0 disables caching
+            cache_entries: Maximum number of cached queries
+        """
+        self.host = host
+        self.num_results = num_results
+        self.timeout_s = timeout_s
+        self.cache_ttl_s = cache_ttl_s
+        self.cache_entries = cache_entries
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        self._limits = httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections)
+        self._client: Optional[httpx.Client] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._cache: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout_s, limits=self._limits)
+            return self._client
+
+    def _aclient(self) -> httpx.AsyncClient:
+        # An AsyncClient's connections belong to the event loop they were
+        # opened on, so each loop gets its own pool
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(timeout=self.timeout_s, limits=self._limits)
+                self._async_clients[loop] = client
+            return client
+
+    def close(self) -> None:
+        """Close the sync client; the async client is closed by aclose()."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close the sync client and the async client of the running event loop."""
+        self.close()
+        with self._lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _cached(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        if self.cache_ttl_s <= 0:
+            return None
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._cache.pop(key, None)
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+        metrics.inc("ltm_search_requests_total", labels={"cache": "hit", "status": "ok"})
+        return entry[1]
+
+    def _store(self, key: str, results: List[Dict[str, Any]]) -> None:
+        if self.cache_ttl_s <= 0:
+            return
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl_s, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters.
+
+        Returns:
+            Dict[str, Any]: Hits, misses, failed requests and cached queries
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "errors": self.errors, "entries": len(self._cache)}
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _params(self, query: str) -> Dict[str, str]:
+        # Same request as SearxSearchWrapper: the configured URL itself is queried
+        return {"q": query, "language": "en", "format": "json"}
+
+    def _parse(self, response: httpx.Response) -> List[Dict[str, Any]]:
+        """Turn a Searx JSON response into results shaped like SearxSearchResults output."""
+        response.raise_for_status()
+        results = [
+            {
+                "snippet": result.get("content", ""),
+                "title": result.get("title", ""),
+                "link": result.get("url", ""),
+                "engines": result.get("engines", []),
+                "category": result.get("category", ""),
+            }
+            for result in response.json().get("results", [])[:self.num_results]
+        ]
+        return results or NO_RESULTS
+
+    def _failed(self, query: str, error: Exception) -> RuntimeError:
+        with self._lock:
+            self.errors += 1
+        metrics.inc("ltm_search_requests_total", labels={"cache": "miss", "status": "error"})
+        return RuntimeError(f"Search for '{query}' failed: {error}")
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Search Searx, reusing recent results for the same normalized query.
+
+        Args:
+            query: The search query
+
+        Returns:
+            List[Dict[str, Any]]: Results with snippet, title, link, engines and category
+
+        Raises:
+            RuntimeError: If the request fails or times out
+        """
+        key = normalize_query(query)
+        results = self._cached(key)
+        if results is not None:
+            return results
+        try:
+            results = self._parse(self._sync_client().get(self.host, params=self._params(query)))
+        except (httpx.HTTPError, ValueError) as e:
+            raise self._failed(query, e) from e
+        metrics.inc("ltm_search_requests_total", labels={"cache": "miss", "status": "ok"})
+        self._store(key, results)
+        return results
+
+    async def asearch(self, query: str) -> List[Dict[str, Any]]:
+        """Async version of search, without blocking the event loop."""
+        key = normalize_query(query)
+        results = self._cached(key)
+        if results is not None:
+            return results
+        try:
+            results = self._parse(await self._aclient().get(self.host, params=self._params(query)))
+        except (httpx.HTTPError, ValueError) as e:
+            raise self._failed(query, e) from e
+        metrics.inc("ltm_search_requests_total", labels={"cache": "miss", "status": "ok"})
+        self._store(key, results)
+        return results
+
+    def as_tool(self) -> BaseTool:
+        """Wrap the client as the agent's searx_search_results tool (sync and async)."""
+        return build_search_tool(lambda: self)
+
+
+def build_search_tool(get_client: Callable[[], SearxSearch]) -> BaseTool:
+    """Build the agent's searx_search_results tool (sync and async).
+
+    Args:
+        get_client: Returns the Searx client; called on every search, so the
+            client can be created on the first one
+
+    Returns:
+        BaseTool: The search tool
+    """
+    def searx_search_results(query: str) -> str:
+        return json.dumps(get_client().search(query))
+
+    async def asearx_search_results(query: str) -> str:
+        return json.dumps(await get_client().asearch(query))
+
+    return StructuredTool.from_function(
+        func=searx_search_results,
+        coroutine=asearx_search_results,
+        name="searx_search_results",
+        description=SEARCH_TOOL_DESCRIPTION,
+    )
+
+
+def create_searx_search(host: Optional[str] = None) -> SearxSearch:
+    """Create a Searx client with the settings in CONFIG["search"] and CONFIG["request_timeout"].
+
+    Args:
+        host: Searx base URL; defaults to CONFIG["searx_host"]
+
+    Returns:
+        SearxSearch: The client
+    """
+    search_config = get_config("search", {})
+    return SearxSearch(
+        host or get_config("searx_host"),
+        num_results=int(search_config.get("num_results", 5)),
+        timeout_s=float(get_config("request_timeout", 10)),
+        max_connections=int(search_config.get("max_connections", 10)),
+        cache_ttl_s=float(search_config.get("cache_ttl_s", 300)),
+        cache_entries=int(search_config.get("cache_entries", 512)),
+    )
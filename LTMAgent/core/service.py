@@ -6,24 +6,66 @@ It provides clean, high-level methods that can be used by any UI implementation
 (CLI, web, desktop) without needing to understand the internal implementation.
 """
 
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
 import uuid
-from typing import Dict, List, Any, Generator, Optional, Tuple
+from typing import Dict, Iterable, List, Any, AsyncGenerator, Generator, Optional, Tuple
 
+from langchain_core.messages import AIMessage
 from langchain_groq import ChatGroq
 from langchain_ollama import ChatOllama
 
-from config.app_config import get_config
-from core.tools import all_tools
+from config.app_config import get_config, get_mongodb_store_config
+from core.tools import get_all_tools, get_searx_search
 from core.graph_builder import build_graph
+from core.memory_manager import get_cache_stats, get_triple_index, memory_store, warm_up_memory
+from core.database import get_database, get_pool_stats
+from core.threads import InMemoryThreadCatalog, create_thread_catalog
+from core.history import InMemoryMessageLog, create_message_log, latest_checkpoint_id
+from core.consolidation import ConsolidationJob, create_consolidator
+from core.response_cache import get_response_cache
+from core.model_router import RoutingChatModel, create_routing_model
+from core.replay import build_turn_record, create_turn_recorder, turn_messages
+from core.instrumentation import (TurnTrace, end_trace, instrumentation_enabled, render_metrics,
+                                  start_metrics_server, start_trace)
+from utils import get_message_text
 
 class LTMService:
     """Service class to manage LTM agent interactions."""
     
-    def __init__(self):
-        """Initialize the LTM service."""
-        self.model = None
+    def __init__(self, model=None, tools=None, checkpointer=None, thread_catalog=None, message_log=None,
+                 recorder=None):
+        """Initialize the LTM service.
+        
+        Args:
+            model: Optional chat model to use instead of the configured provider
+                (e.g. a scripted model for load tests)
+            tools: Optional tools; defaults to get_all_tools()
+            checkpointer: Optional checkpointer; defaults to MongoDB
+            thread_catalog: Optional thread catalog; defaults to MongoDB, or to
+                an in-memory catalog when a checkpointer is injected
+            message_log: Optional history log; defaults like thread_catalog
+            recorder: Optional TurnRecorder appending every turn to a trace
+                file; defaults to CONFIG["replay"]["record_path"] (off when unset)
+        """
+        self.model = model
+        self.custom_model = model is not None
         self.model_with_tools = None
         self.graph = None
+        self.tools = tools if tools is not None else get_all_tools()
+        self.checkpointer = checkpointer
+        if thread_catalog is None:
+            thread_catalog = InMemoryThreadCatalog() if checkpointer is not None else create_thread_catalog()
+        self.thread_catalog = thread_catalog
+        self.message_log = message_log
+        self.recorder = recorder if recorder is not None else create_turn_recorder()
+        self._active_turns = 0
+        self._turns_lock = threading.Lock()
+        self.consolidation_job = None
         
         # Store model configuration to avoid repeated config calls
         self.model_provider = get_config("model_provider")
@@ -36,10 +78,37 @@ class LTMService:
         except Exception as e:
             raise RuntimeError(f"Failed to initialize LTM service: {e}") from e
         
+        instrumentation_config = get_config("instrumentation", {})
+        metrics_port = instrumentation_config.get("metrics_port")
+        if instrumentation_enabled() and metrics_port:
+            metrics_host = instrumentation_config.get("metrics_host", "127.0.0.1")
+            try:
+                start_metrics_server(metrics_port, metrics_host)
+            except OSError as e:
+                print(f"[WARNING] Could not serve metrics on {metrics_host}:{metrics_port}: {e}")
+        
+        consolidation_config = get_config("memory_consolidation", {})
+        if consolidation_config.get("enabled"):
+            self.consolidation_job = ConsolidationJob(
+                create_consolidator(is_busy=self.is_busy),
+                interval_s=float(consolidation_config.get("interval_s", 3600)),
+            ).start()
+        
     def _initialize_model(self):
         """Initialize the language model based on configuration."""
         # Determine which model provider to use
-        if self.model_provider == "groq":
+        if self.custom_model:
+            # Injected model, used as is
+            pass
+        elif get_config("model_routing", {}).get("enabled"):
+            # Both providers, the configured one first
+            providers = {
+                "groq": lambda: ChatGroq(model=self.model_name),
+                "ollama": lambda: ChatOllama(base_url=self.ollama_host, model=self.ollama_model),
+            }
+            order = sorted(providers, key=lambda name: name != self.model_provider)
+            self.model = create_routing_model({name: providers[name]() for name in order})
+        elif self.model_provider == "groq":
             # Use Groq for Llama models
             self.model = ChatGroq(model=self.model_name)
         else:
@@ -47,10 +116,65 @@ class LTMService:
             self.model = ChatOllama(base_url=self.ollama_host, model=self.ollama_model)
         
         # Bind tools to the model
-        self.model_with_tools = self.model.bind_tools(all_tools)
+        self.model_with_tools = self.model.bind_tools(self.tools)
         
         # Build the conversation graph
-        self.graph = build_graph(self.model_with_tools)
+        self.graph = build_graph(self.model_with_tools, checkpointer=self.checkpointer,
+                                 summary_model=self.model, tools=self.tools)
+        
+        # The history log reads the graph's checkpointer, so it comes after the graph
+        if self.message_log is None:
+            factory = InMemoryMessageLog if self.checkpointer is not None else create_message_log
+            self.message_log = factory(latest_checkpoint=self._latest_checkpoint, load_messages=self._load_messages)
+    
+    def warm_up(self, background: bool = True):
+        """Create the memory store and load the embedding model ahead of the first turn.
+        
+        Args:
+            background: Warm up in a daemon thread instead of blocking
+        """
+        return warm_up_memory(background=background)
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get statistics of the shared MongoDB connection pool.
+        
+        Returns:
+            Dict[str, Any]: Pool settings and connection counters
+        """
+        return get_pool_stats()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters of the embedding, memory search, response and search caches.
+        
+        Returns:
+            Dict[str, Any]: Cache statistics keyed by cache name
+        """
+        stats = get_cache_stats()
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            stats["responses"] = response_cache.stats()
+        searx_search = get_searx_search()
+        if searx_search is not None:
+            stats["search"] = searx_search.stats()
+        return stats
+    
+    def get_metrics(self) -> str:
+        """Get node, tool, model, embedding and MongoDB timings as Prometheus metrics.
+        
+        Returns:
+            str: Metrics in the Prometheus text exposition format
+        """
+        return render_metrics()
+    
+    def get_routing_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the rolling latency and error window of each model provider.
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: Per-provider statistics, empty without model routing
+        """
+        if isinstance(self.model, RoutingChatModel):
+            return self.model.health.stats()
+        return {}
     
     def get_model_info(self) -> Dict[str, str]:
         """Get information about the currently loaded model.
@@ -58,7 +182,14 @@ class LTMService:
         Returns:
             Dict[str, str]: Dictionary with model information
         """
-        if self.model_provider == "groq":
+        if self.custom_model:
+            provider = "Custom"
+            model_name = self.model._llm_type
+        elif isinstance(self.model, RoutingChatModel):
+            names = {"groq": self.model_name, "ollama": self.ollama_model}
+            provider = "Routed (" + ", ".join(name.capitalize() for name in self.model.providers) + ")"
+            model_name = " / ".join(names[name] for name in self.model.providers)
+        elif self.model_provider == "groq":
             provider = "Groq"
             model_name = self.model_name
         else:
@@ -70,17 +201,32 @@ class LTMService:
             "model_name": model_name
         }
     
-    def get_available_users(self) -> List[str]:
-        """Get a list of existing user IDs from memory.
+    def get_available_users(self, limit: Optional[int] = None) -> List[str]:
+        """Get existing user IDs from the thread catalog.
         
-        This is a placeholder - in a real implementation, you would
-        retrieve this information from a database or file.
+        Args:
+            limit: Maximum number of users; defaults to one catalog page
         
         Returns:
-            List[str]: List of user IDs
+            List[str]: List of user IDs, in ID order
+        """
+        try:
+            return [user["id"] for user in self.list_users(limit=limit)["items"]]
+        except Exception as e:
+            print(f"[WARNING] Could not list users: {e}")
+            return []
+    
+    def list_users(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of users.
+        
+        Args:
+            limit: Page size; defaults to CONFIG["thread_catalog"]["page_size"]
+            cursor: next_cursor of the previous page
+            
+        Returns:
+            Dict[str, Any]: {"items": [{"id", "created", "last_active"}...], "next_cursor"}
         """
-        # Placeholder implementation
-        return ["user1", "user2", "user3"]
+        return self.thread_catalog.list_users(limit=limit, cursor=cursor)
     
     def create_user_id(self) -> str:
         """Generate a new user ID.
@@ -90,20 +236,119 @@ class LTMService:
         """
         return str(uuid.uuid4())[:8]
     
-    def get_threads_for_user(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get conversation threads for a given user.
+    def get_threads_for_user(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get a user's most recently active conversation threads.
         
         Args:
             user_id: The user ID to get threads for
+            limit: Maximum number of threads; defaults to one catalog page
             
         Returns:
-            List[Dict[str, Any]]: List of thread information
+            List[Dict[str, Any]]: Thread information (id, title, created, last_active, turns)
         """
-        # Placeholder implementation
-        return [
-            {"id": "thread1", "created": "2023-05-01", "title": "First conversation"},
-            {"id": "thread2", "created": "2023-05-02", "title": "Second conversation"}
-        ]
+        try:
+            return self.list_threads(user_id, limit=limit)["items"]
+        except Exception as e:
+            print(f"[WARNING] Could not list threads: {e}")
+            return []
+    
+    def list_threads(self, user_id: str, limit: Optional[int] = None,
+                     cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of a user's threads, most recently active first.
+        
+        Args:
+            user_id: The user ID to get threads for
+            limit: Page size; defaults to CONFIG["thread_catalog"]["page_size"]
+            cursor: next_cursor of the previous page
+            
+        Returns:
+            Dict[str, Any]: {"items": [thread information...], "next_cursor"}
+        """
+        return self.thread_catalog.list_threads(user_id, limit=limit, cursor=cursor)
+    
+    def get_history(self, user_id: str, thread_id: str, limit: Optional[int] = None,
+                    cursor: Optional[int] = None) -> Dict[str, Any]:
+        """Get one page of a thread's messages, newest page first.
+        
+        Reads the message log, never the full checkpoint (except once, to
+        import a thread that predates the log).
+        
+        Args:
+            user_id: The user ID
+            thread_id: The conversation thread ID
+            limit: Page size; defaults to CONFIG["history"]["page_size"]
+            cursor: next_cursor of the previous page, to load older messages
+            
+        Returns:
+            Dict[str, Any]: {"items": [{"role", "content", "created"}...] oldest first,
+            "next_cursor": cursor for older messages, or None at the start}
+        """
+        return self.message_log.get_page(user_id, thread_id, limit=limit, cursor=cursor)
+    
+    def rebuild_thread_catalog(self) -> Dict[str, int]:
+        """Backfill the thread catalog from the checkpoint and memory collections.
+        
+        Only needed once for conversations that predate the catalog.
+        
+        Returns:
+            Dict[str, int]: Number of threads and users found
+        """
+        mongo_config = get_mongodb_store_config()
+        database = get_database()
+        checkpointer = self.graph.checkpointer
+        return self.thread_catalog.rebuild(
+            database[mongo_config["checkpoint_collection"]],
+            database[mongo_config["collection"]],
+            serde=getattr(checkpointer, "serde", None),
+        )
+    
+    def lookup_facts(self, user_id: str, subject: Optional[str] = None, predicate: Optional[str] = None,
+                     object: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Look up a user's semantic memories by exact subject, predicate or object.
+        
+        Args:
+            user_id: The user ID
+            subject: Subject of the facts, e.g. "user"
+            predicate: Optional predicate, e.g. "prefers"
+            object: Object of the facts; subject or object is required
+            limit: Maximum number of facts
+            
+        Returns:
+            List[Dict[str, Any]]: Facts (key, subject, predicate, object, context), newest first
+        """
+        return get_triple_index().lookup(user_id, subject=subject, predicate=predicate,
+                                         object=object, limit=limit)
+    
+    def rebuild_triple_index(self, user_id: str) -> int:
+        """Index a user's semantic memories written before the triple index existed.
+        
+        Args:
+            user_id: The user ID
+            
+        Returns:
+            int: Number of semantic memories read
+        """
+        return get_triple_index().rebuild(memory_store, user_id)
+    
+    def consolidate_memories(self, user_id: Optional[str] = None, dry_run: bool = False) -> Any:
+        """Merge and supersede near-duplicate memories now, pausing while turns run.
+        
+        Args:
+            user_id: The user to consolidate; defaults to every user
+            dry_run: Only report what would change
+            
+        Returns:
+            Any: The user's report, or a list of reports for every user, with
+            items before and after, bytes saved and probe search latency
+        """
+        consolidator = create_consolidator(is_busy=self.is_busy)
+        if user_id is not None:
+            return consolidator.consolidate_user(user_id, dry_run=dry_run)
+        return consolidator.consolidate_all(dry_run=dry_run)
+    
+    def is_busy(self) -> bool:
+        """Tell whether any turn is running; background jobs wait while it is."""
+        return self._active_turns > 0
     
     def create_thread_id(self) -> str:
         """Generate a new thread ID.
@@ -123,7 +368,8 @@ class LTMService:
             thread_id: The conversation thread ID
             
         Yields:
-            Dict[str, Any]: Output chunks from the graph execution
+            Dict[str, Any]: Output chunks from the graph execution, followed by
+            {"trace": ...} with the turn's timings when instrumentation is on
         """
         # Configure runtime settings
         config = {"configurable": {
@@ -132,5 +378,431 @@ class LTMService:
         }}
         
         # Process the user input and yield results
-        for chunk in self.graph.stream({"messages": [("user", user_prompt)]}, config=config):
-            yield chunk
\ No newline at end of file
+        started_at = self._begin_turn(user_prompt, user_id, thread_id)
+        trace, token = start_trace() if instrumentation_enabled() else (None, None)
+        final_text = ""
+        try:
+            for chunk in self.graph.stream({"messages": [("user", user_prompt)]}, config=config):
+                final_text = self._final_text(chunk, final_text)
+                yield chunk
+        finally:
+            self._leave_turn()
+            if trace is not None:
+                end_trace(trace, token)
+        self._end_turn(user_id, thread_id, final_text, user_prompt, trace, started_at)
+        if trace is not None:
+            yield {"trace": trace.to_dict()}
+    
+    async def aprocess_message(self, user_prompt: str, user_id: str,
+                               thread_id: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """Process a user message asynchronously.
+        
+        Runs the graph with astream, so the LLM call, memory searches, tool
+        calls and checkpoint writes all await instead of holding a thread,
+        and one event loop can serve many conversations at once.
+        
+        Args:
+            user_prompt: The user's message
+            user_id: The user ID
+            thread_id: The conversation thread ID
+            
+        Yields:
+            Dict[str, Any]: Output chunks from the graph execution, followed by
+            {"trace": ...} with the turn's timings when instrumentation is on
+        """
+        config = {"configurable": {
+            "user_id": user_id,
+            "thread_id": thread_id
+        }}
+        
+        started_at = await asyncio.to_thread(self._begin_turn, user_prompt, user_id, thread_id)
+        trace, token = start_trace() if instrumentation_enabled() else (None, None)
+        final_text = ""
+        try:
+            async for chunk in self.graph.astream({"messages": [("user", user_prompt)]}, config=config):
+                final_text = self._final_text(chunk, final_text)
+                yield chunk
+        finally:
+            self._leave_turn()
+            if trace is not None:
+                end_trace(trace, token)
+        await self._aend_turn(user_id, thread_id, final_text, user_prompt, trace, started_at)
+        if trace is not None:
+            yield {"trace": trace.to_dict()}
+    
+    async def aprocess_batch(self, items: Iterable[Dict[str, Any]], max_concurrency: Optional[int] = None,
+                             resume_path: Optional[str] = None,
+                             cancel_event: Optional[threading.Event] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run many turns concurrently, yielding each result as it finishes.
+        
+        Items of the same (user_id, thread_id) form one conversation and run
+        in order; different conversations run concurrently, at most
+        max_concurrency turns at once. Each turn is a regular
+        aprocess_message turn with its own checkpoint thread and trace.
+        
+        With resume_path, every result is appended to that JSONL file and
+        items it already records as "ok" are skipped, so an interrupted or
+        cancelled batch continues where it stopped. Setting cancel_event
+        stops starting new turns; running turns finish.
+        
+        Args:
+            items: Dicts with user_id, thread_id and prompt, and an optional
+                unique id (defaults to "<user_id>/<thread_id>/<n>" for the
+                n-th item of that conversation)
+            max_concurrency: Turns running at once; defaults to CONFIG["batch"]
+            resume_path: JSONL file recording results across runs
+            cancel_event: Event that cancels the batch when set
+            
+        Yields:
+            Dict[str, Any]: {"type": "result", id, user_id, thread_id, status
+            ("ok" or "error"), response, error, ms} per finished item, then one
+            {"type": "summary", ...} with counts, elapsed time, throughput and
+            latency percentiles
+        """
+        max_concurrency = max_concurrency or int(get_config("batch", {}).get("max_concurrency", 8))
+        cancel_event = cancel_event or threading.Event()
+        done = self._load_batch_results(resume_path) if resume_path else set()
+        
+        conversations: Dict[Tuple[str, str], List[Tuple[str, Dict[str, Any]]]] = {}
+        total = 0
+        for item in items:
+            lane = conversations.setdefault((item["user_id"], item["thread_id"]), [])
+            item_id = str(item.get("id") or f"{item['user_id']}/{item['thread_id']}/{len(lane)}")
+            lane.append((item_id, item))
+            total += 1
+        resumed = sum(1 for lane in conversations.values() for item_id, _ in lane if item_id in done)
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def run_conversation(lane: List[Tuple[str, Dict[str, Any]]]) -> None:
+            for item_id, item in lane:
+                if item_id in done:
+                    continue
+                async with semaphore:
+                    if cancel_event.is_set():
+                        return
+                    result = await self._run_batch_item(item_id, item)
+                # Recorded here rather than by the consumer, so turns that
+                # finish after it stopped reading are not run again on resume
+                if resume_file is not None:
+                    resume_file.write(json.dumps(result) + "\n")
+                    resume_file.flush()
+                await results.put(result)
+        
+        async def run_all() -> None:
+            try:
+                await asyncio.gather(*(run_conversation(lane) for lane in conversations.values()))
+            finally:
+                await results.put(None)
+        
+        resume_file = open(resume_path, "a", encoding="utf-8") if resume_path else None
+        start = time.perf_counter()
+        runner = asyncio.create_task(run_all())
+        latencies, failed = [], 0
+        try:
+            while (result := await results.get()) is not None:
+                latencies.append(result["ms"])
+                failed += result["status"] != "ok"
+                yield result
+            await runner
+        finally:
+            if not runner.done():
+                # The consumer stopped early: let running turns finish, start no more
+                cancel_event.set()
+                await asyncio.shield(runner)
+            if resume_file is not None:
+                resume_file.close()
+        
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        yield {
+            "type": "summary",
+            "items": total,
+            "completed": len(latencies) - failed,
+            "failed": failed,
+            "resumed": resumed,
+            "pending": total - resumed - len(latencies),
+            "cancelled": cancel_event.is_set(),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": latencies[len(latencies) // 2] if latencies else None,
+            "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None,
+            "max_concurrency": max_concurrency,
+        }
+    
+    def process_batch(self, items: Iterable[Dict[str, Any]], max_concurrency: Optional[int] = None,
+                      resume_path: Optional[str] = None,
+                      cancel_event: Optional[threading.Event] = None) -> Generator[Dict[str, Any], None, None]:
+        """Run many turns concurrently from synchronous code, yielding each result as it finishes.
+        
+        Runs aprocess_batch on an event loop in a worker thread; see there
+        for ordering, resuming and cancelling. Closing the generator early
+        cancels the batch.
+        
+        Args:
+            items: Dicts with user_id, thread_id, prompt and an optional id
+            max_concurrency: Turns running at once; defaults to CONFIG["batch"]
+            resume_path: JSONL file recording results across runs
+            cancel_event: Event that cancels the batch when set
+            
+        Yields:
+            Dict[str, Any]: One "result" event per finished item, then the "summary"
+        """
+        cancel_event = cancel_event or threading.Event()
+        events: "queue.Queue[Any]" = queue.Queue()
+        
+        async def drive() -> None:
+            async for event in self.aprocess_batch(items, max_concurrency, resume_path, cancel_event):
+                events.put(event)
+        
+        def run() -> None:
+            try:
+                asyncio.run(drive())
+            except BaseException as e:
+                events.put(e)
+            finally:
+                events.put(None)
+        
+        worker = threading.Thread(target=run, daemon=True, name="ltm-batch")
+        worker.start()
+        try:
+            while (event := events.get()) is not None:
+                if isinstance(event, BaseException):
+                    raise event
+                yield event
+        finally:
+            cancel_event.set()
+            worker.join()
+    
+    async def _run_batch_item(self, item_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one batch item as a turn and describe its outcome."""
+        start = time.perf_counter()
+        response, error = "", None
+        try:
+            async for chunk in self.aprocess_message(item["prompt"], item["user_id"], item["thread_id"]):
+                response = self._final_text(chunk, response)
+        except Exception as e:
+            error = repr(e)
+        return {
+            "type": "result",
+            "id": item_id,
+            "user_id": item["user_id"],
+            "thread_id": item["thread_id"],
+            "status": "ok" if error is None else "error",
+            "response": response,
+            "error": error,
+            "ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+    
+    @staticmethod
+    def _load_batch_results(path: str) -> set:
+        """Get the IDs of the items a resume file records as completed."""
+        done = set()
+        if not os.path.exists(path):
+            return done
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by an interrupted run
+                    continue
+                if result.get("type") == "result" and result.get("status") == "ok":
+                    done.add(result["id"])
+        return done
+    
+    def stream_response(self, user_prompt: str, user_id: str,
+                        thread_id: str) -> Generator[Dict[str, Any], None, None]:
+        """Process a user message, streaming the response token by token.
+        
+        Yields events instead of node updates:
+        {"type": "token", "text": ...} for each text delta from the agent,
+        {"type": "tool_call", "name", "args", "id"} when the agent calls a tool,
+        {"type": "tool_result", "name", "content", "id"} when a tool returns, and
+        a last {"type": "final", "text": ...} with the complete final answer
+        (and the turn's "trace" when instrumentation is on).
+        
+        Args:
+            user_prompt: The user's message
+            user_id: The user ID
+            thread_id: The conversation thread ID
+            
+        Yields:
+            Dict[str, Any]: Token stream events
+        """
+        config = {"configurable": {
+            "user_id": user_id,
+            "thread_id": thread_id
+        }}
+        turn = {"final": ""}
+        
+        started_at = self._begin_turn(user_prompt, user_id, thread_id)
+        trace, token = start_trace() if instrumentation_enabled() else (None, None)
+        try:
+            for mode, payload in self.graph.stream({"messages": [("user", user_prompt)]}, config=config,
+                                                   stream_mode=["messages", "updates"]):
+                yield from self._token_events(mode, payload, turn)
+        finally:
+            self._leave_turn()
+            if trace is not None:
+                end_trace(trace, token)
+        self._end_turn(user_id, thread_id, turn["final"], user_prompt, trace, started_at)
+        yield self._final_event(turn, trace)
+    
+    async def astream_response(self, user_prompt: str, user_id: str,
+                               thread_id: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """Async version of stream_response.
+        
+        Args:
+            user_prompt: The user's message
+            user_id: The user ID
+            thread_id: The conversation thread ID
+            
+        Yields:
+            Dict[str, Any]: Token stream events
+        """
+        config = {"configurable": {
+            "user_id": user_id,
+            "thread_id": thread_id
+        }}
+        turn = {"final": ""}
+        
+        started_at = await asyncio.to_thread(self._begin_turn, user_prompt, user_id, thread_id)
+        trace, token = start_trace() if instrumentation_enabled() else (None, None)
+        try:
+            async for mode, payload in self.graph.astream({"messages": [("user", user_prompt)]}, config=config,
+                                                          stream_mode=["messages", "updates"]):
+                for event in self._token_events(mode, payload, turn):
+                    yield event
+        finally:
+            self._leave_turn()
+            if trace is not None:
+                end_trace(trace, token)
+        await self._aend_turn(user_id, thread_id, turn["final"], user_prompt, trace, started_at)
+        yield self._final_event(turn, trace)
+    
+    def _begin_turn(self, user_prompt: str, user_id: str, thread_id: str) -> float:
+        """Record a turn in the thread catalog and the history log before the graph runs.
+        
+        Returns:
+            float: Unix time the turn started
+        """
+        started_at = time.time()
+        self.thread_catalog.record_turn(user_id, thread_id, user_prompt)
+        self.message_log.prepare_thread(user_id, thread_id)
+        self.message_log.append(user_id, thread_id, "user", user_prompt)
+        with self._turns_lock:
+            self._active_turns += 1
+        return started_at
+    
+    def _leave_turn(self) -> None:
+        with self._turns_lock:
+            self._active_turns -= 1
+    
+    def _end_turn(self, user_id: str, thread_id: str, final_text: str, user_prompt: Optional[str] = None,
+                  trace: Optional[TurnTrace] = None, started_at: Optional[float] = None) -> None:
+        """Log the turn's final answer and record the turn when recording is on."""
+        if final_text:
+            self.message_log.append(user_id, thread_id, "assistant", final_text)
+        if self.recorder is not None and user_prompt is not None:
+            try:
+                state = self.graph.get_state(self._turn_config(user_id, thread_id))
+                self._record_turn(user_id, thread_id, user_prompt, state, trace, started_at)
+            except Exception as e:
+                print(f"[WARNING] Could not record turn: {e}")
+    
+    async def _aend_turn(self, user_id: str, thread_id: str, final_text: str, user_prompt: Optional[str] = None,
+                         trace: Optional[TurnTrace] = None, started_at: Optional[float] = None) -> None:
+        """Async version of _end_turn; the checkpoint read awaits instead of blocking the event loop."""
+        if final_text:
+            self.message_log.append(user_id, thread_id, "assistant", final_text)
+        if self.recorder is not None and user_prompt is not None:
+            try:
+                state = await self.graph.aget_state(self._turn_config(user_id, thread_id))
+                self._record_turn(user_id, thread_id, user_prompt, state, trace, started_at)
+            except Exception as e:
+                print(f"[WARNING] Could not record turn: {e}")
+    
+    @staticmethod
+    def _turn_config(user_id: str, thread_id: str) -> Dict[str, Any]:
+        return {"configurable": {"user_id": user_id, "thread_id": thread_id}}
+    
+    def _record_turn(self, user_id: str, thread_id: str, user_prompt: str, state: Any,
+                     trace: Optional[TurnTrace], started_at: Optional[float]) -> None:
+        """Append the turn's model outputs and tool results, read from its checkpoint state, to the trace file."""
+        messages = state.values.get("messages", [])
+        self.recorder.record(build_turn_record(
+            user_id, thread_id, user_prompt, turn_messages(messages, user_prompt),
+            trace=trace.to_dict() if trace is not None else None, started_at=started_at,
+        ))
+    
+    @staticmethod
+    def _final_text(chunk: Dict[str, Any], current: str) -> str:
+        """Track the latest agent answer (a message without tool calls) in node updates."""
+        updates = chunk.get("agent")
+        if isinstance(updates, dict):
+            for message in updates.get("messages", []):
+                if not message.tool_calls:
+                    current = get_message_text(message)
+        return current
+    
+    def _latest_checkpoint(self, user_id: str, thread_id: str) -> Optional[str]:
+        return latest_checkpoint_id(self.graph.checkpointer, thread_id)
+    
+    def _load_messages(self, user_id: str, thread_id: str, checkpoint_id: Optional[str] = None) -> List[Any]:
+        config = {"configurable": {"user_id": user_id, "thread_id": thread_id}}
+        if checkpoint_id is not None:
+            config["configurable"]["checkpoint_id"] = checkpoint_id
+        state = self.graph.get_state(config)
+        return state.values.get("messages", [])
+    
+    @staticmethod
+    def _final_event(turn: Dict[str, str], trace) -> Dict[str, Any]:
+        event = {"type": "final", "text": turn["final"]}
+        if trace is not None:
+            event["trace"] = trace.to_dict()
+        return event
+    
+    def _token_events(self, mode: str, payload: Any, turn: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Translate one item of a ("messages", "updates") stream into token events.
+        
+        Args:
+            mode: The stream mode the item came from
+            payload: The stream item
+            turn: Per-turn scratch state; "final" tracks the last agent answer
+            
+        Returns:
+            List[Dict[str, Any]]: Events for this item, possibly empty
+        """
+        events = []
+        if mode == "messages":
+            message, metadata = payload
+            if metadata.get("langgraph_node") == "agent" and isinstance(message, AIMessage):
+                text = get_message_text(message)
+                if text:
+                    events.append({"type": "token", "text": text})
+            return events
+        
+        for node, updates in payload.items():
+            if not isinstance(updates, dict):
+                continue
+            for message in updates.get("messages", []):
+                if node == "agent" and message.tool_calls:
+                    for tool_call in message.tool_calls:
+                        events.append({
+                            "type": "tool_call",
+                            "name": tool_call["name"],
+                            "args": tool_call["args"],
+                            "id": tool_call["id"],
+                        })
+                elif node == "agent":
+                    turn["final"] = get_message_text(message)
+                elif node == "tools":
+                    events.append({
+                        "type": "tool_result",
+                        "name": message.name,
+                        "content": get_message_text(message),
+                        "id": message.tool_call_id,
+                    })
+        return events
@@ -2,9 +2,14 @@
 State definitions for the LTM application conversation graph.
 """
 
-from typing import List
+from typing import Any, Dict, List
 from langgraph.graph import MessagesState
 
 class State(MessagesState):
     """State definition for the conversation graph with memory capabilities."""
-    recall_memories: List[str]
\ No newline at end of file
+    recall_memories: List[str]
+    # Rolling summary of messages[:summary_upto]; see core/context.py
+    summary: str
+    summary_upto: int
+    # Per-tool timings of the latest tools step; see core/tool_node.py
+    tool_timings: List[Dict[str, Any]]
\ No newline at end of file
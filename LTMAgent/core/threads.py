@@ -0,0 +1,400 @@
+"""
+Thread and user catalog for the LTM application.
+
+Listing a user's conversations from the checkpoint collection means scanning
+every checkpoint of every thread. Instead, each turn upserts one small
+document per thread (title, created, last active, turn count) and one per
+user, and listings page through those with index-backed cursors. Recent
+pages are cached in memory and dropped when the user has a new turn.
+"""
+
+import base64
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.collection import Collection
+
+from config.app_config import get_config, get_mongodb_store_config
+from core.background import BackgroundWriter
+
+TITLE_LENGTH = 60
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # pymongo returns naive datetimes unless the client is tz_aware
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def make_title(message: str) -> str:
+    """Title a thread after its first user message."""
+    title = " ".join(message.split())
+    return title if len(title) <= TITLE_LENGTH else title[:TITLE_LENGTH - 3].rstrip() + "..."
+
+
+def encode_cursor(*parts: Any) -> str:
+    """Encode the sort key of the last listed entry as an opaque cursor."""
+    payload = json.dumps([p.isoformat() if isinstance(p, datetime) else p for p in parts])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor from encode_cursor(); parts come back as encoded (timestamps as strings).
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        parts = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(parts, list):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return parts
+
+
+def decode_thread_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a thread listing cursor into its (last_active, thread_id) sort key.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    parts = decode_cursor(cursor)
+    try:
+        last_active, thread_id = parts
+        return _as_utc(datetime.fromisoformat(last_active)), str(thread_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def decode_user_cursor(cursor: str) -> str:
+    """Decode a user listing cursor into the last listed user ID.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    parts = decode_cursor(cursor)
+    if len(parts) != 1:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return str(parts[0])
+
+
+def _thread_info(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": doc["thread_id"],
+        "title": doc.get("title") or doc["thread_id"],
+        "created": _as_utc(doc["created_at"]).isoformat(),
+        "last_active": _as_utc(doc["last_active"]).isoformat(),
+        "turns": doc.get("turns", 0),
+    }
+
+
+def _user_info(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": doc["_id"],
+        "created": _as_utc(doc["created_at"]).isoformat(),
+        "last_active": _as_utc(doc["last_active"]).isoformat(),
+    }
+
+
+class ThreadCatalog:
+    """Catalog of users and their threads in two MongoDB collections.
+
+    threads: {_id: "<user_id>:<thread_id>", user_id, thread_id, title,
+    created_at, last_active, turns}, indexed on (user_id, last_active,
+    thread_id) for newest-first pages. users: {_id: user_id, created_at,
+    last_active}, paged by _id.
+    """
+
+    def __init__(self, threads: Collection, users: Collection,
+                 page_size: int = 20, cache_entries: int = 256):
+        """Initialize the catalog.
+
+        Args:
+            threads: Collection of thread documents
+            users: Collection of user documents
+            page_size: Default number of entries per page
+            cache_entries: Number of listing pages kept in memory
+        """
+        self.threads = threads
+        self.users = users
+        self.page_size = page_size
+        self.cache_entries = cache_entries
+
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer = BackgroundWriter("thread-catalog")
+        self._indexes_ready = False
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def ensure_indexes(self) -> None:
+        """Create the indexes the listings rely on (idempotent)."""
+        if self._indexes_ready:
+            return
+        self.threads.create_index(
+            [("user_id", ASCENDING), ("last_active", DESCENDING), ("thread_id", DESCENDING)],
+            name="user_last_active",
+        )
+        self._indexes_ready = True
+
+    def _upsert_turn(self, user_id: str, thread_id: str, title: str, at: datetime) -> None:
+        self.ensure_indexes()
+        self.threads.update_one(
+            {"_id": f"{user_id}:{thread_id}"},
+            {
+                "$setOnInsert": {"user_id": user_id, "thread_id": thread_id, "title": title, "created_at": at},
+                "$set": {"last_active": at},
+                "$inc": {"turns": 1},
+            },
+            upsert=True,
+        )
+        self.users.update_one(
+            {"_id": user_id},
+            {"$setOnInsert": {"created_at": at}, "$set": {"last_active": at}},
+            upsert=True,
+        )
+
+    def _find_threads(self, user_id: str, after: Optional[Tuple[datetime, str]], limit: int) -> List[Dict[str, Any]]:
+        self.ensure_indexes()
+        query: Dict[str, Any] = {"user_id": user_id}
+        if after:
+            last_active, thread_id = after
+            query["$or"] = [
+                {"last_active": {"$lt": last_active}},
+                {"last_active": last_active, "thread_id": {"$lt": thread_id}},
+            ]
+        cursor = self.threads.find(query).sort(
+            [("last_active", DESCENDING), ("thread_id", DESCENDING)]
+        ).limit(limit)
+        return list(cursor)
+
+    def _find_users(self, after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        query = {"_id": {"$gt": after}} if after else {}
+        return list(self.users.find(query).sort("_id", ASCENDING).limit(limit))
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _cached(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            page = self._cache.get(key)
+            if page is not None:
+                self._cache.move_to_end(key)
+            return page
+
+    def _remember(self, key: Tuple, page: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[key] = page
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def _invalidate(self, user_id: str) -> None:
+        with self._lock:
+            stale = [key for key in self._cache if key[0] == "users" or key[1] == user_id]
+            for key in stale:
+                del self._cache[key]
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def record_turn(self, user_id: str, thread_id: str, message: str, wait: bool = False) -> None:
+        """Record that a turn started on a thread.
+
+        The first turn creates the thread (titled after its message) and the
+        user; later turns bump last_active and the turn count.
+
+        Args:
+            user_id: The user ID
+            thread_id: The conversation thread ID
+            message: The user's message
+            wait: Block until the write is done instead of writing in the background
+        """
+        self._invalidate(user_id)
+
+        def write():
+            try:
+                self._upsert_turn(user_id, thread_id, make_title(message), _now())
+            finally:
+                # Pages read while the write was in flight may be stale
+                self._invalidate(user_id)
+
+        future = self._writer.submit(write, "update thread catalog")
+        if wait:
+            future.result()
+
+    def list_threads(self, user_id: str, limit: Optional[int] = None,
+                     cursor: Optional[str] = None) -> Dict[str, Any]:
+        """List a user's threads, most recently active first.
+
+        Args:
+            user_id: The user ID
+            limit: Page size; defaults to the catalog's page size
+            cursor: next_cursor of the previous page
+
+        Returns:
+            Dict[str, Any]: {"items": [thread info...], "next_cursor": str or None}
+        """
+        limit = limit or self.page_size
+        key = ("threads", user_id, limit, cursor)
+        page = self._cached(key)
+        if page is None:
+            docs = self._find_threads(user_id, decode_thread_cursor(cursor) if cursor else None, limit + 1)
+            next_cursor = None
+            if len(docs) > limit:
+                docs = docs[:limit]
+                next_cursor = encode_cursor(_as_utc(docs[-1]["last_active"]), docs[-1]["thread_id"])
+            page = {"items": [_thread_info(doc) for doc in docs], "next_cursor": next_cursor}
+            self._remember(key, page)
+        return page
+
+    def list_users(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """List users by ID.
+
+        Args:
+            limit: Page size; defaults to the catalog's page size
+            cursor: next_cursor of the previous page
+
+        Returns:
+            Dict[str, Any]: {"items": [user info...], "next_cursor": str or None}
+        """
+        limit = limit or self.page_size
+        key = ("users", None, limit, cursor)
+        page = self._cached(key)
+        if page is None:
+            docs = self._find_users(decode_user_cursor(cursor) if cursor else None, limit + 1)
+            next_cursor = None
+            if len(docs) > limit:
+                docs = docs[:limit]
+                next_cursor = encode_cursor(docs[-1]["_id"])
+            page = {"items": [_user_info(doc) for doc in docs], "next_cursor": next_cursor}
+            self._remember(key, page)
+        return page
+
+    def rebuild(self, checkpoints: Collection, memories: Optional[Collection] = None,
+                serde=None) -> Dict[str, int]:
+        """Backfill the catalog from existing checkpoints and memories.
+
+        Threads are found by grouping root checkpoints by thread_id; their
+        user comes from the user_id that LangGraph copies into checkpoint
+        metadata. Users who only have memories are found from the memory
+        namespaces ("memories", user_id, ...). Existing entries are kept.
+
+        Args:
+            checkpoints: The checkpointer's checkpoint collection
+            memories: Optional memory store collection
+            serde: The checkpointer's serializer, to decode metadata values
+
+        Returns:
+            Dict[str, int]: Number of threads and users found
+        """
+        self.ensure_indexes()
+        checkpoints.create_index([("metadata.user_id", ASCENDING), ("thread_id", ASCENDING)],
+                                 name="metadata_user_thread")
+        now = _now()
+        thread_ops, users = [], {}
+        pipeline = [
+            {"$match": {"checkpoint_ns": ""}},
+            {"$group": {
+                "_id": "$thread_id",
+                "user_id": {"$first": "$metadata.user_id"},
+                "turns": {"$sum": 1},
+            }},
+        ]
+        for group in checkpoints.aggregate(pipeline, allowDiskUse=True):
+            user_id = group.get("user_id")
+            if user_id is not None and serde is not None and not isinstance(user_id, str):
+                user_id = serde.loads_typed(tuple(user_id))
+            if not isinstance(user_id, str):
+                continue
+            users[user_id] = now
+            thread_ops.append(UpdateOne(
+                {"_id": f"{user_id}:{group['_id']}"},
+                {"$setOnInsert": {
+                    "user_id": user_id, "thread_id": group["_id"], "title": group["_id"],
+                    "created_at": now, "last_active": now, "turns": group["turns"],
+                }},
+                upsert=True,
+            ))
+        if memories is not None:
+            for user_id in memories.distinct("namespace.1", {"namespace.0": "memories"}):
+                users.setdefault(user_id, now)
+
+        if thread_ops:
+            self.threads.bulk_write(thread_ops, ordered=False)
+        if users:
+            self.users.bulk_write([
+                UpdateOne({"_id": user_id}, {"$setOnInsert": {"created_at": at, "last_active": at}}, upsert=True)
+                for user_id, at in users.items()
+            ], ordered=False)
+        with self._lock:
+            self._cache.clear()
+        return {"threads": len(thread_ops), "users": len(users)}
+
+
+class InMemoryThreadCatalog(ThreadCatalog):
+    """Thread catalog kept in process memory, for runs without MongoDB."""
+
+    def __init__(self, page_size: int = 20, cache_entries: int = 256):
+        super().__init__(None, None, page_size=page_size, cache_entries=cache_entries)
+        self._threads: Dict[str, Dict[str, Any]] = {}
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._indexes_ready = True
+
+    def _upsert_turn(self, user_id: str, thread_id: str, title: str, at: datetime) -> None:
+        with self._lock:
+            doc = self._threads.setdefault(f"{user_id}:{thread_id}", {
+                "user_id": user_id, "thread_id": thread_id, "title": title, "created_at": at, "turns": 0,
+            })
+            doc["last_active"] = at
+            doc["turns"] += 1
+            self._users.setdefault(user_id, {"_id": user_id, "created_at": at})["last_active"] = at
+
+    def _find_threads(self, user_id: str, after: Optional[Tuple[datetime, str]], limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            docs = [dict(doc) for doc in self._threads.values() if doc["user_id"] == user_id]
+        docs.sort(key=lambda doc: (doc["last_active"], doc["thread_id"]), reverse=True)
+        if after:
+            docs = [doc for doc in docs if (doc["last_active"], doc["thread_id"]) < tuple(after)]
+        return docs[:limit]
+
+    def _find_users(self, after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            docs = sorted((dict(doc) for doc in self._users.values()), key=lambda doc: doc["_id"])
+        if after:
+            docs = [doc for doc in docs if doc["_id"] > after]
+        return docs[:limit]
+
+    def rebuild(self, checkpoints=None, memories=None, serde=None) -> Dict[str, int]:
+        return {"threads": len(self._threads), "users": len(self._users)}
+
+
+def create_thread_catalog() -> ThreadCatalog:
+    """Create the MongoDB thread catalog on the shared client.
+
+    Returns:
+        ThreadCatalog: Catalog using the configured threads and users collections
+    """
+    from core.database import get_database
+
+    mongo_config = get_mongodb_store_config()
+    catalog_config = get_config("thread_catalog", {})
+    database = get_database()
+    return ThreadCatalog(
+        database[mongo_config["threads_collection"]],
+        database[mongo_config["users_collection"]],
+        page_size=catalog_config.get("page_size", 20),
+        cache_entries=catalog_config.get("cache_entries", 256),
+    )
@@ -0,0 +1,152 @@
+"""
+Tool execution node for the LTM application.
+
+Runs the tool calls of the latest AI message concurrently on a pool shared by
+all turns (each turn limited to its own share of it), collapses identical calls (same tool, same arguments) into one execution and
+reports per-tool timings alongside the tool messages.
+"""
+
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool
+
+from core.state import State
+
+TOOL_CALL_ERROR_TEMPLATE = "Error: {error}\n Please fix your mistakes."
+
+
+class ConcurrentToolNode:
+    """Graph node that executes tool calls concurrently and de-duplicated."""
+
+    def __init__(self, tools: Sequence[BaseTool], max_workers: int = 4,
+                 pool_workers: Optional[int] = None):
+        """Initialize the node.
+
+        Args:
+            tools: Tools the agent may call, looked up by name
+            max_workers: Maximum number of tool calls of one turn running at once
+            pool_workers: Threads of the pool shared by all turns; defaults to max_workers
+        """
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.max_workers = max(1, int(max_workers))
+        self.pool_workers = max(self.max_workers, int(pool_workers or self.max_workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_workers, thread_name_prefix="tool")
+
+    def as_runnable(self, name: str = "tools") -> RunnableLambda:
+        """Wrap the node so it runs under both stream() and astream()."""
+        return RunnableLambda(self.invoke, afunc=self.ainvoke, name=name)
+
+    @staticmethod
+    def _group_calls(state: State) -> Dict[Tuple[str, str], List[dict]]:
+        """Group the pending tool calls by (tool name, canonical arguments)."""
+        groups: Dict[Tuple[str, str], List[dict]] = {}
+        for call in state["messages"][-1].tool_calls:
+            key = (call["name"], json.dumps(call["args"], sort_keys=True, default=str))
+            groups.setdefault(key, []).append(call)
+        return groups
+
+    def _error_message(self, call: dict, error: str) -> ToolMessage:
+        return ToolMessage(
+            content=TOOL_CALL_ERROR_TEMPLATE.format(error=error),
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    def _run_call(self, call: dict, config: RunnableConfig) -> Tuple[ToolMessage, float]:
+        start = time.perf_counter()
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            message = self._error_message(
+                call, f"{call['name']} is not a valid tool, try one of [{', '.join(self.tools_by_name)}]."
+            )
+        else:
+            try:
+                message = tool.invoke({**call, "type": "tool_call"}, config)
+            except Exception as e:
+                message = self._error_message(call, repr(e))
+        return message, (time.perf_counter() - start) * 1000
+
+    async def _arun_call(self, call: dict, config: RunnableConfig,
+                         semaphore: asyncio.Semaphore) -> Tuple[ToolMessage, float]:
+        async with semaphore:
+            start = time.perf_counter()
+            tool = self.tools_by_name.get(call["name"])
+            if tool is None:
+                message = self._error_message(
+                    call, f"{call['name']} is not a valid tool, try one of [{', '.join(self.tools_by_name)}]."
+                )
+            else:
+                try:
+                    message = await tool.ainvoke({**call, "type": "tool_call"}, config)
+                except Exception as e:
+                    message = self._error_message(call, repr(e))
+            return message, (time.perf_counter() - start) * 1000
+
+    @staticmethod
+    def _collect(groups: Dict[Tuple[str, str], List[dict]],
+                 results: List[Tuple[ToolMessage, float]]) -> Dict[str, Any]:
+        """Fan each result back out to every call in its group, in call order."""
+        by_id: Dict[str, ToolMessage] = {}
+        timings = []
+        for calls, (message, elapsed_ms) in zip(groups.values(), results):
+            for call in calls:
+                by_id[call["id"]] = message.model_copy(update={"tool_call_id": call["id"]})
+            timings.append({
+                "tool": calls[0]["name"],
+                "ms": round(elapsed_ms, 2),
+                "calls": len(calls),
+                "status": getattr(message, "status", "success"),
+            })
+        ordered = [by_id[call["id"]] for calls in groups.values() for call in calls]
+        return {"messages": ordered, "tool_timings": timings}
+
+    def invoke(self, state: State, config: RunnableConfig) -> Dict[str, Any]:
+        """Execute the pending tool calls on the thread pool.
+
+        Args:
+            state (State): The current state of the conversation.
+            config (RunnableConfig): The runtime configuration for the agent.
+
+        Returns:
+            Dict[str, Any]: Tool messages and per-tool timings
+        """
+        groups = self._group_calls(state)
+        # The turn takes a slot before submitting each call, so it never has
+        # more than max_workers calls on the shared pool and a turn with many
+        # calls cannot starve the others. Each call runs in a copy of the
+        # node's context, so context-bound state such as the turn trace
+        # follows it onto the pool threads
+        slots = threading.BoundedSemaphore(self.max_workers)
+        futures = []
+        for calls in groups.values():
+            slots.acquire()
+            future = self._executor.submit(contextvars.copy_context().run, self._run_call, calls[0], config)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        return self._collect(groups, [future.result() for future in futures])
+
+    async def ainvoke(self, state: State, config: RunnableConfig) -> Dict[str, Any]:
+        """Execute the pending tool calls concurrently on the event loop.
+
+        Args:
+            state (State): The current state of the conversation.
+            config (RunnableConfig): The runtime configuration for the agent.
+
+        Returns:
+            Dict[str, Any]: Tool messages and per-tool timings
+        """
+        groups = self._group_calls(state)
+        semaphore = asyncio.Semaphore(self.max_workers)
+        results = await asyncio.gather(
+            *(self._arun_call(calls[0], config, semaphore) for calls in groups.values())
+        )
+        return self._collect(groups, list(results))
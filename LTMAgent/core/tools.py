@@ -3,14 +3,11 @@ Tools configuration for the LTM application.
 
 This module defines and configures the tools available to the agent.
 """
-from langchain_community.tools import SearxSearchResults
-from langchain_community.utilities import SearxSearchWrapper
-from langchain_core.tools import StructuredTool
-from typing import List
+from langchain_core.tools import BaseTool, StructuredTool
+from typing import List, Optional
+import threading
 
-from config.app_config import get_config
 from core.memory_manager import (
-    memory_store,
     manage_episodic_memory_tool,
     search_episodic_memory_tool,
     manage_semantic_memory_tool,
@@ -18,8 +15,10 @@ from core.memory_manager import (
     manage_procedural_memory_tool,
     search_procedural_memory_tool,
     manage_general_memory_tool,
-    search_general_memory_tool
+    search_general_memory_tool,
+    lookup_facts_tool
 )
+from core.search import SearxSearch, build_search_tool, create_searx_search
 
 # Try to import LangMem tools (for fallback if needed)
 try:
@@ -28,10 +27,38 @@ try:
 except ImportError:
     LANGMEM_AVAILABLE = False
 
-search_internet_tool = SearxSearchResults(
-    num_results=5,
-    wrapper=SearxSearchWrapper(searx_host=get_config("searx_host"))
-)
+_search_lock = threading.Lock()
+_searx_search: Optional[SearxSearch] = None
+_search_internet_tool: Optional[BaseTool] = None
+
+def get_searx_search() -> Optional[SearxSearch]:
+    """Get the Searx client behind the search tool, or None before the first search."""
+    return _searx_search
+
+def _searx_client() -> SearxSearch:
+    """Get the pooled Searx client, creating it on the first search."""
+    global _searx_search
+    if _searx_search is None:
+        with _search_lock:
+            if _searx_search is None:
+                _searx_search = create_searx_search()
+    return _searx_search
+
+def get_search_tool() -> BaseTool:
+    """Get the internet search tool.
+
+    Building the tool only describes it to the model; the pooled Searx
+    client behind it is created when the agent first searches.
+
+    Returns:
+        BaseTool: The shared Searx search tool
+    """
+    global _search_internet_tool
+    if _search_internet_tool is None:
+        with _search_lock:
+            if _search_internet_tool is None:
+                _search_internet_tool = build_search_tool(_searx_client)
+    return _search_internet_tool
 
 # Memory management tools - all types available
 memory_tools = [
@@ -39,15 +66,17 @@ memory_tools = [
     search_episodic_memory_tool,    # Search episodic memories (experiences/learning)
     manage_semantic_memory_tool,    # Create/update/delete semantic memories (facts/triples)
     search_semantic_memory_tool,    # Search semantic memories (facts/relationships)
+    lookup_facts_tool,              # Exact subject/predicate/object lookup of semantic memories
     manage_procedural_memory_tool,  # Create/update/delete procedural memories (instructions/rules)
     search_procedural_memory_tool,  # Search procedural memories (how-to knowledge)
     manage_general_memory_tool,     # General memory management (associative relationships)
     search_general_memory_tool,     # General memory search (associative retrieval)
 ]
 
-all_tools = [
-    search_internet_tool
-]
+def get_all_tools() -> List[BaseTool]:
+    """Get every tool available to the agent.
 
-# Add all memory tools
-all_tools.extend(memory_tools)
\ No newline at end of file
+    Returns:
+        List[BaseTool]: The internet search tool followed by all memory tools
+    """
+    return [get_search_tool(), *memory_tools]
\ No newline at end of file
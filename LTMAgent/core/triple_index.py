@@ -0,0 +1,258 @@
+"""
+Exact-match index of semantic triples for the LTM application.
+
+Semantic memories are subject/predicate/object triples, yet searching them
+means embedding the query and running a vector search. This index keeps one
+small document per triple, keyed by its normalized subject, predicate and
+object, and is updated from every write to a semantic namespace, so "all
+facts about X" is a single indexed lookup that never touches the embedder or
+the vector index.
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from langgraph.store.base import BaseStore, PutOp
+from pymongo import ASCENDING, DESCENDING, DeleteOne, UpdateOne
+from pymongo.collection import Collection
+
+from config.app_config import get_config, get_mongodb_store_config
+from core.background import BackgroundWriter
+
+SEMANTIC_NAMESPACE = "triples"
+REBUILD_LIMIT = 100000
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def normalize_term(text: str) -> str:
+    """Normalize a subject, predicate or object for exact matching (case and whitespace)."""
+    return " ".join(str(text).casefold().split())
+
+
+def triple_fields(value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Get the triple stored in a semantic memory value.
+
+    Returns:
+        Optional[Dict[str, Any]]: subject, predicate, object and context, or
+        None when the value is not a triple (e.g. a free-text memory)
+    """
+    content = (value or {}).get("content")
+    if not isinstance(content, dict):
+        return None
+    if not all(isinstance(content.get(field), str) and content[field].strip()
+               for field in ("subject", "predicate", "object")):
+        return None
+    return {field: content.get(field) for field in ("subject", "predicate", "object", "context")}
+
+
+def _fact(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: doc.get(field) for field in ("key", "subject", "predicate", "object", "context")}
+
+
+class TripleIndex:
+    """Triple index in a MongoDB collection.
+
+    Documents: {_id: "<user_id>:<memory key>", user_id, key, subject, predicate,
+    object, context, subject_norm, predicate_norm, object_norm, updated_at},
+    indexed on (user_id, subject_norm, predicate_norm) and (user_id, object_norm).
+    """
+
+    def __init__(self, collection: Collection, max_results: int = 50):
+        """Initialize the index.
+
+        Args:
+            collection: Collection of triple documents
+            max_results: Default maximum number of facts per lookup
+        """
+        self.collection = collection
+        self.max_results = max_results
+
+        self._writer = BackgroundWriter("triple-index")
+        self._indexes_ready = False
+
+    @staticmethod
+    def _doc_id(user_id: str, key: str) -> str:
+        return f"{user_id}:{key}"
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def ensure_indexes(self) -> None:
+        """Create the indexes the lookups rely on (idempotent)."""
+        if self._indexes_ready:
+            return
+        self.collection.create_index([("user_id", ASCENDING), ("subject_norm", ASCENDING),
+                                      ("predicate_norm", ASCENDING)], name="user_subject_predicate")
+        self.collection.create_index([("user_id", ASCENDING), ("object_norm", ASCENDING)],
+                                     name="user_object")
+        self._indexes_ready = True
+
+    def _write(self, upserts: List[Dict[str, Any]], deletes: List[str]) -> None:
+        self.ensure_indexes()
+        requests = [UpdateOne({"_id": doc["_id"]}, {"$set": doc}, upsert=True) for doc in upserts]
+        requests += [DeleteOne({"_id": doc_id}) for doc_id in deletes]
+        if requests:
+            self.collection.bulk_write(requests, ordered=True)
+
+    def _find(self, query: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        self.ensure_indexes()
+        return list(self.collection.find(query, {"_id": 0}).sort("updated_at", DESCENDING).limit(limit))
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def index_writes(self, ops: List[PutOp]) -> None:
+        """Write listener for the memory store: index the semantic memories in a write batch.
+
+        Triples are upserted, deleted memories (value None) and memories that
+        no longer hold a triple are removed. Runs in the background; lookups
+        wait for pending writes first.
+
+        Args:
+            ops: PutOps of one store write batch
+        """
+        self._submit(
+            [(op.namespace, op.key, op.value, None) for op in ops if self._is_semantic(op.namespace)]
+        )
+
+    @staticmethod
+    def _is_semantic(namespace) -> bool:
+        return len(namespace) == 3 and namespace[0] == "memories" and namespace[2] == SEMANTIC_NAMESPACE
+
+    def _submit(self, entries: List[Tuple[Tuple[str, ...], str, Optional[Dict[str, Any]], Optional[datetime]]]) -> None:
+        """Queue index updates for (namespace, key, value or None, updated_at or now) entries."""
+        upserts, deletes = [], []
+        now = _now()
+        for namespace, key, value, updated_at in entries:
+            doc_id = self._doc_id(namespace[1], key)
+            triple = triple_fields(value)
+            if triple is None:
+                deletes.append(doc_id)
+                continue
+            upserts.append({
+                "_id": doc_id,
+                "user_id": namespace[1],
+                "key": key,
+                **triple,
+                "subject_norm": normalize_term(triple["subject"]),
+                "predicate_norm": normalize_term(triple["predicate"]),
+                "object_norm": normalize_term(triple["object"]),
+                "updated_at": updated_at or now,
+            })
+        if not upserts and not deletes:
+            return
+
+        self._writer.submit(lambda: self._write(upserts, deletes), "update triple index")
+
+    def flush(self) -> None:
+        """Wait for pending index writes."""
+        self._writer.flush()
+
+    def lookup(self, user_id: str, subject: Optional[str] = None, predicate: Optional[str] = None,
+               object: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Find a user's facts by exact (case- and whitespace-insensitive) terms.
+
+        Args:
+            user_id: The user whose facts are looked up
+            subject: Subject of the facts, e.g. "user"
+            predicate: Optional predicate, e.g. "prefers"
+            object: Object of the facts, e.g. "Paris"; subject or object is required
+            limit: Maximum number of facts; defaults to max_results
+
+        Returns:
+            List[Dict[str, Any]]: Facts (key, subject, predicate, object, context),
+            most recently written first
+
+        Raises:
+            ValueError: If neither subject nor object is given
+        """
+        if not subject and not object:
+            raise ValueError("A subject or an object is required to look up facts.")
+        query: Dict[str, Any] = {"user_id": user_id}
+        if subject:
+            query["subject_norm"] = normalize_term(subject)
+        if predicate:
+            query["predicate_norm"] = normalize_term(predicate)
+        if object:
+            query["object_norm"] = normalize_term(object)
+        self.flush()
+        return [_fact(doc) for doc in self._find(query, limit or self.max_results)]
+
+    def rebuild(self, store: BaseStore, user_id: str) -> int:
+        """Index a user's existing semantic memories, e.g. ones written before the index existed.
+
+        Args:
+            store: The memory store
+            user_id: The user whose semantic namespace is indexed
+
+        Returns:
+            int: Number of memories read
+        """
+        namespace = ("memories", user_id, SEMANTIC_NAMESPACE)
+        items = store.search(namespace, limit=REBUILD_LIMIT)
+        self._submit([(tuple(item.namespace), item.key, item.value, item.updated_at) for item in items])
+        self.flush()
+        return len(items)
+
+
+class InMemoryTripleIndex(TripleIndex):
+    """Triple index kept in process memory, for stores without MongoDB.
+
+    Nothing survives a restart, so a user's facts are loaded from the store
+    on their first lookup.
+    """
+
+    def __init__(self, store: Optional[BaseStore] = None, max_results: int = 50):
+        """Initialize the index.
+
+        Args:
+            store: Memory store to load each user's facts from on first lookup
+            max_results: Default maximum number of facts per lookup
+        """
+        super().__init__(None, max_results=max_results)
+        self.store = store
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._loaded_users = set()
+        self._docs_lock = threading.Lock()
+        self._indexes_ready = True
+
+    def _write(self, upserts: List[Dict[str, Any]], deletes: List[str]) -> None:
+        with self._docs_lock:
+            for doc in upserts:
+                self._docs[doc["_id"]] = dict(doc)
+            for doc_id in deletes:
+                self._docs.pop(doc_id, None)
+
+    def _find(self, query: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        with self._docs_lock:
+            docs = [dict(doc) for doc in self._docs.values()
+                    if all(doc.get(field) == value for field, value in query.items())]
+        docs.sort(key=lambda doc: doc["updated_at"], reverse=True)
+        return docs[:limit]
+
+    def lookup(self, user_id: str, subject: Optional[str] = None, predicate: Optional[str] = None,
+               object: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        if self.store is not None and user_id not in self._loaded_users:
+            self.rebuild(self.store, user_id)
+            self._loaded_users.add(user_id)
+        return super().lookup(user_id, subject=subject, predicate=predicate, object=object, limit=limit)
+
+
+def create_triple_index() -> TripleIndex:
+    """Create the MongoDB triple index on the shared client.
+
+    Returns:
+        TripleIndex: Index using the configured triples collection
+    """
+    from core.database import get_database
+
+    return TripleIndex(
+        get_database()[get_mongodb_store_config()["triples_collection"]],
+        max_results=int(get_config("triple_index", {}).get("max_results", 50)),
+    )
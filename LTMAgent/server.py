@@ -0,0 +1,403 @@
+"""
+HTTP/WebSocket server for the LTM application.
+Serves many users from one shared LTMService and its compiled graph.
+
+Endpoints:
+    POST /users/{user_id}/threads/{thread_id}/messages  - stream one turn as NDJSON events
+    WS   /ws/{user_id}/{thread_id}                      - send {"message": ...}, receive events
+    GET  /users, /users/{user_id}/threads               - paginated listings (limit, cursor)
+    GET  /users/{user_id}/threads/{thread_id}/messages  - history page, newest first (limit, cursor)
+    GET  /health, /stats, /metrics
+
+Turns of the same thread run one at a time; across threads at most
+CONFIG["server"]["max_concurrent_turns"] run at once and a bounded number
+wait in line. When the line is full the server answers 503 with Retry-After
+instead of piling up work.
+
+Usage:
+    python server.py
+    python server.py --fake-model --model-latency-ms 200   # offline, for load tests
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+from config.app_config import get_config, validate_config
+from core.database import close_mongo_client
+from core.instrumentation import metrics, render_metrics
+from core.service import LTMService
+
+metrics.describe("ltm_server_active_turns", "gauge", "Turns currently running")
+metrics.describe("ltm_server_queued_turns", "gauge", "Turns waiting for a slot")
+metrics.describe("ltm_server_rejected_turns_total", "counter", "Turns rejected by backpressure")
+metrics.describe("ltm_server_queue_wait_seconds", "histogram", "Time a turn waited for a slot")
+
+
+class Overloaded(Exception):
+    """Raised when a turn cannot be admitted; carries a Retry-After hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: int = 1):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class TurnLease:
+    """A running turn's hold on its thread and on a concurrency slot."""
+
+    def __init__(self, scheduler: "TurnScheduler", key: Tuple[str, str]):
+        self._scheduler = scheduler
+        self._key = key
+        self._released = False
+
+    def release(self) -> None:
+        """Give the slot and the thread back; safe to call more than once."""
+        if not self._released:
+            self._released = True
+            self._scheduler._release(self._key)
+
+
+class TurnScheduler:
+    """Admission control for conversation turns.
+
+    A per-thread lock keeps turns of one thread in order (they share a
+    checkpoint), a semaphore bounds the turns running at once, and the number
+    of turns waiting for either is capped so overload turns into fast 503s.
+    """
+
+    def __init__(self, max_concurrent_turns: int = 16, max_queued_turns: int = 64,
+                 queue_timeout_s: float = 30.0):
+        """Initialize the scheduler.
+
+        Args:
+            max_concurrent_turns: Maximum number of turns running at once
+            max_queued_turns: Maximum number of turns waiting for a slot
+            queue_timeout_s: Maximum time a turn may wait before it is rejected
+        """
+        self.max_concurrent_turns = max(1, int(max_concurrent_turns))
+        self.max_queued_turns = max(0, int(max_queued_turns))
+        self.queue_timeout_s = queue_timeout_s
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.draining = False
+
+        self._slots = asyncio.Semaphore(self.max_concurrent_turns)
+        self._threads: Dict[Tuple[str, str], list] = {}  # key -> [lock, holders]
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("ltm_server_active_turns", self.active)
+        metrics.set_gauge("ltm_server_queued_turns", self.queued)
+        if self.active == 0 and self.queued == 0:
+            self._idle.set()
+        else:
+            self._idle.clear()
+
+    def _reject(self, reason: str, retry_after: int = 1) -> Overloaded:
+        self.rejected += 1
+        metrics.inc("ltm_server_rejected_turns_total", 1, {"reason": reason})
+        return Overloaded(reason, retry_after)
+
+    async def acquire(self, user_id: str, thread_id: str) -> TurnLease:
+        """Wait for the thread and a free slot.
+
+        Args:
+            user_id: The user ID
+            thread_id: The conversation thread ID
+
+        Returns:
+            TurnLease: Lease to release when the turn has finished
+
+        Raises:
+            Overloaded: If the server is draining, the queue is full or the wait timed out
+        """
+        if self.draining:
+            raise self._reject("draining", retry_after=5)
+        if self.queued >= self.max_queued_turns and self._slots.locked():
+            raise self._reject("queue_full")
+
+        key = (user_id, thread_id)
+        entry = self._threads.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        self.queued += 1
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            deadline = start + self.queue_timeout_s
+            await asyncio.wait_for(entry[0].acquire(), self.queue_timeout_s)
+            try:
+                await asyncio.wait_for(self._slots.acquire(), max(0.0, deadline - time.perf_counter()))
+            except BaseException:
+                entry[0].release()
+                raise
+        except asyncio.TimeoutError:
+            self._drop_thread(key)
+            raise self._reject("queue_timeout") from None
+        except BaseException:
+            self._drop_thread(key)
+            raise
+        finally:
+            self.queued -= 1
+            self._update_gauges()
+
+        metrics.observe("ltm_server_queue_wait_seconds", time.perf_counter() - start)
+        self.active += 1
+        self._update_gauges()
+        return TurnLease(self, key)
+
+    def _drop_thread(self, key: Tuple[str, str]) -> None:
+        entry = self._threads.get(key)
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._threads[key]
+
+    def _release(self, key: Tuple[str, str]) -> None:
+        self._slots.release()
+        self._threads[key][0].release()
+        self._drop_thread(key)
+        self.active -= 1
+        self.completed += 1
+        self._update_gauges()
+
+    async def drain(self, timeout: float) -> bool:
+        """Stop admitting turns and wait for running and queued ones to finish.
+
+        Args:
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            bool: True if all turns finished in time
+        """
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Get scheduler counters.
+
+        Returns:
+            Dict[str, Any]: Limits, running/queued turns and totals
+        """
+        return {
+            "max_concurrent_turns": self.max_concurrent_turns,
+            "max_queued_turns": self.max_queued_turns,
+            "active": self.active,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "draining": self.draining,
+            "threads": len(self._threads),
+        }
+
+
+class MessageRequest(BaseModel):
+    message: str
+
+
+def create_app(service: LTMService, server_config: Optional[Dict[str, Any]] = None) -> FastAPI:
+    """Create the FastAPI app around one shared service.
+
+    Args:
+        service: The service whose graph answers every request
+        server_config: Limits; defaults to CONFIG["server"]
+
+    Returns:
+        FastAPI: The application
+    """
+    server_config = {**get_config("server", {}), **(server_config or {})}
+    state: Dict[str, Any] = {}
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # The semaphore and locks must be created on the serving event loop
+        state["scheduler"] = TurnScheduler(
+            max_concurrent_turns=server_config.get("max_concurrent_turns", 16),
+            max_queued_turns=server_config.get("max_queued_turns", 64),
+            queue_timeout_s=server_config.get("queue_timeout_s", 30.0),
+        )
+        yield
+        print("Draining running turns...")
+        if not await state["scheduler"].drain(server_config.get("drain_timeout_s", 30.0)):
+            print("[WARNING] Shutting down with turns still running")
+        close_mongo_client()
+
+    app = FastAPI(title="LTM Agent", lifespan=lifespan)
+
+    async def admit(user_id: str, thread_id: str) -> TurnLease:
+        try:
+            return await state["scheduler"].acquire(user_id, thread_id)
+        except Overloaded as e:
+            raise HTTPException(status_code=503, detail=str(e),
+                                headers={"Retry-After": str(e.retry_after)}) from None
+
+    @app.get("/health")
+    async def health():
+        scheduler = state["scheduler"]
+        return {"status": "draining" if scheduler.draining else "ok", **service.get_model_info()}
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "scheduler": state["scheduler"].stats(),
+            "pool": service.get_pool_stats(),
+            "caches": service.get_cache_stats(),
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def prometheus_metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/users")
+    async def list_users(limit: Optional[int] = None, cursor: Optional[str] = None):
+        try:
+            return await asyncio.to_thread(service.list_users, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from None
+
+    @app.get("/users/{user_id}/threads")
+    async def list_threads(user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+        try:
+            return await asyncio.to_thread(service.list_threads, user_id, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from None
+
+    @app.get("/users/{user_id}/threads/{thread_id}/messages")
+    async def get_history(user_id: str, thread_id: str, limit: Optional[int] = None, cursor: Optional[int] = None):
+        return await asyncio.to_thread(service.get_history, user_id, thread_id, limit, cursor)
+
+    @app.post("/users/{user_id}/threads/{thread_id}/messages")
+    async def post_message(user_id: str, thread_id: str, request: MessageRequest):
+        lease = await admit(user_id, thread_id)
+
+        async def events():
+            try:
+                async for event in service.astream_response(request.message, user_id, thread_id):
+                    # Each line is pulled by the client, so a slow reader
+                    # slows its own turn instead of buffering in the server
+                    yield json.dumps(event, default=str) + "\n"
+            except Exception as e:
+                yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+            finally:
+                lease.release()
+
+        # The background task covers a client that disconnects before the
+        # body is iterated; release() is idempotent
+        return StreamingResponse(events(), media_type="application/x-ndjson",
+                                 background=BackgroundTask(lease.release))
+
+    @app.websocket("/ws/{user_id}/{thread_id}")
+    async def websocket_chat(websocket: WebSocket, user_id: str, thread_id: str):
+        await websocket.accept()
+        try:
+            while True:
+                payload = await websocket.receive_json()
+                message = payload.get("message", "") if isinstance(payload, dict) else ""
+                if not message.strip():
+                    await websocket.send_json({"type": "error", "error": "Empty message"})
+                    continue
+                try:
+                    lease = await state["scheduler"].acquire(user_id, thread_id)
+                except Overloaded as e:
+                    await websocket.send_json({"type": "error", "error": str(e), "retry_after": e.retry_after})
+                    continue
+                try:
+                    async for event in service.astream_response(message, user_id, thread_id):
+                        await websocket.send_text(json.dumps(event, default=str))
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    await websocket.send_json({"type": "error", "error": str(e)})
+                finally:
+                    lease.release()
+        except WebSocketDisconnect:
+            pass
+
+    return app
+
+
+def create_fake_service(model_latency_ms: float = 0.0, tool_latency_ms: float = 0.0) -> LTMService:
+    """Create a service on the offline fakes (scripted model, in-memory store and checkpointer).
+
+    Args:
+        model_latency_ms: Simulated latency of each model call
+        tool_latency_ms: Simulated latency of each search call
+
+    Returns:
+        LTMService: A service that needs no model provider, Searx or MongoDB
+    """
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.store.memory import InMemoryStore
+
+    from benchmarks.fakes import CONVERSATIONS, ScriptedChatModel, make_embeddings, make_search_tool
+    from core.memory_manager import EMBEDDING_DIMS, configure_memory_store
+    from core.tools import memory_tools
+
+    configure_memory_store(InMemoryStore(index={
+        "dims": EMBEDDING_DIMS,
+        "embed": make_embeddings(EMBEDDING_DIMS),
+        "fields": ["content"],
+    }))
+    return LTMService(
+        model=ScriptedChatModel.from_conversations(CONVERSATIONS, latency_ms=model_latency_ms),
+        tools=[make_search_tool(tool_latency_ms), *memory_tools],
+        checkpointer=InMemorySaver(),
+    )
+
+
+def main():
+    """Main entry point for the server."""
+    server_config = get_config("server", {})
+    parser = argparse.ArgumentParser(description="Serve the LTM agent over HTTP and WebSocket")
+    parser.add_argument("--host", default=server_config.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=server_config.get("port", 8000))
+    parser.add_argument("--fake-model", action="store_true",
+                        help="Use the scripted model and in-memory stores (no Groq/Ollama, Searx or MongoDB)")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Fake model latency")
+    parser.add_argument("--tool-latency-ms", type=float, default=0.0, help="Fake search latency")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+
+        validate_config()
+        print("Initializing LTM Service...")
+        if args.fake_model:
+            service = create_fake_service(args.model_latency_ms, args.tool_latency_ms)
+        else:
+            service = LTMService()
+            if get_config("warm_up", True):
+                service.warm_up(background=True)
+    except ImportError as e:
+        print(f"Missing dependencies: {e}")
+        print("Please ensure all required packages are installed.")
+        return 1
+    except Exception as e:
+        print(f"Failed to initialize LTM Service: {e}")
+        return 1
+
+    uvicorn.run(
+        create_app(service),
+        host=args.host,
+        port=args.port,
+        timeout_graceful_shutdown=int(server_config.get("drain_timeout_s", 30)),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
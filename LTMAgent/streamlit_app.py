@@ -5,24 +5,37 @@ Uses the LTMService to provide a web interface to the core functionality.
 
 import streamlit as st
 from core.service import LTMService
-import time
+from config.app_config import get_config
 
-def handle_response(response_chunks):
-    """Process response chunks from the service."""
+def handle_response(response_events):
+    """Render token stream events from the service and return the final text."""
     # Create a placeholder for the ongoing response
     response_placeholder = st.empty()
+    text = ""
+    final_text = ""
+    
+    for event in response_events:
+        if event["type"] == "token":
+            # Render each delta as it arrives
+            text += event["text"]
+            response_placeholder.markdown(text + "▌")
+        elif event["type"] == "tool_call":
+            # Text preceding a tool call is internal; the answer starts after it
+            text = ""
+            response_placeholder.markdown(f"_Using {event['name']}..._")
+        elif event["type"] == "final":
+            final_text = event["text"] or text
+            if event.get("trace") and st.session_state.get('debug_mode', False):
+                with st.expander(f"Debug: turn trace ({event['trace']['turn_ms']} ms)"):
+                    st.json(event["trace"])
+            
+        # Display tool activity in debug mode
+        if event["type"] in ("tool_call", "tool_result") and st.session_state.get('debug_mode', False):
+            with st.expander(f"Debug: {event['type']} {event['name']}"):
+                st.write(event)
     
-    for chunk in response_chunks:
-        for node, updates in chunk.items():
-            if node == "agent" and "messages" in updates:
-                # Extract and display the assistant's message
-                message = updates["messages"][-1].content
-                response_placeholder.markdown(message)
-                
-            # Display other node updates in debug mode
-            if st.session_state.get('debug_mode', False):
-                with st.expander(f"Debug: Update from {node}"):
-                    st.write(updates)
+    response_placeholder.markdown(final_text)
+    return final_text
 
 def user_management():
     """Handle user management in the sidebar."""
@@ -31,6 +44,8 @@ def user_management():
     # Initialize service if not already done
     if 'service' not in st.session_state:
         st.session_state.service = LTMService()
+        if get_config("warm_up", True):
+            st.session_state.service.warm_up(background=True)
         st.session_state.model_info = st.session_state.service.get_model_info()
     
     # User ID selection
@@ -49,7 +64,7 @@ def user_management():
             st.session_state.user_id = st.session_state.service.create_user_id()
             st.session_state.thread_id = None  # Reset thread when user changes
     else:
-        # This is a placeholder - in a real app, you would fetch actual users
+        # Users known to the thread catalog, in ID order
         available_users = st.session_state.service.get_available_users()
         
         # Add the current user to the list if it's not there
@@ -92,8 +107,9 @@ def thread_management(user_id):
         if st.sidebar.button("Start new conversation"):
             st.session_state.thread_id = st.session_state.service.create_thread_id()
             st.session_state.messages = []  # Reset messages for new thread
+            st.session_state.history_cursor = None
     else:
-        # This is a placeholder - in a real app, you would fetch actual threads
+        # Most recently active threads first
         available_threads = st.session_state.service.get_threads_for_user(user_id)
         
         if st.session_state.thread_id:
@@ -105,18 +121,21 @@ def thread_management(user_id):
                     "title": "Current conversation"
                 })
                 
-        thread_labels = [f"{t['title']} ({t['id']}) - {t['created']}" for t in available_threads]
-        selected_thread_label = st.sidebar.selectbox(
+        thread_labels = {t['id']: f"{t['title']} ({t['id']}) - {t['created'][:16].replace('T', ' ')}"
+                         for t in available_threads}
+        selected_thread_id = st.sidebar.selectbox(
             "Select conversation:",
-            thread_labels
+            list(thread_labels),
+            format_func=thread_labels.get
         ) if available_threads else None
         
-        if selected_thread_label:
-            selected_thread_id = selected_thread_label.split('(')[1].split(')')[0]
+        if selected_thread_id:
             if selected_thread_id != st.session_state.thread_id:
                 st.session_state.thread_id = selected_thread_id
-                # In a real app, you would load previous messages for this thread
-                st.session_state.messages = []  
+                # Show only the latest page; older pages load on demand
+                page = st.session_state.service.get_history(user_id, selected_thread_id)
+                st.session_state.messages = page["items"]
+                st.session_state.history_cursor = page["next_cursor"]
     
     # Display current thread ID
     if st.session_state.thread_id:
@@ -165,6 +184,16 @@ def main():
     
     # Main chat interface
     if user_id and thread_id:
+        # Older messages of a resumed thread are fetched a page at a time
+        if st.session_state.get('history_cursor') is not None:
+            if st.button("Load earlier messages"):
+                page = st.session_state.service.get_history(
+                    user_id, thread_id, cursor=st.session_state.history_cursor
+                )
+                st.session_state.messages = page["items"] + st.session_state.messages
+                st.session_state.history_cursor = page["next_cursor"]
+                st.rerun()
+        
         # Display chat messages
         for message in st.session_state.messages:
             with st.chat_message(message["role"]):
@@ -183,21 +212,15 @@ def main():
             
             # Get response from the service
             with st.chat_message("assistant"):
-                response_chunks = st.session_state.service.process_message(
+                response_events = st.session_state.service.stream_response(
                     user_input, user_id, thread_id
                 )
-                handle_response(response_chunks)
-                
-                # Wait for the final response to be fully displayed
-                time.sleep(0.5)
+                response_text = handle_response(response_events)
                 
-                # Add assistant response to chat history (assuming last chunk contains it)
-                # This is a simplified approach - in a real app, you'd aggregate the entire response
-                # This is just a placeholder - in a real implementation, you would extract the final
-                # message from the response chunks
+                # Add the final assistant answer to chat history
                 st.session_state.messages.append({
                     "role": "assistant", 
-                    "content": "Response from the assistant"  # Placeholder
+                    "content": response_text
                 })
     else:
         # Show instructions if user or thread is not selected
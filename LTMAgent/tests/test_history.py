@@ -0,0 +1,39 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from core.history import InMemoryMessageLog
+
+LEGACY = [
+    HumanMessage("I prefer green tea over coffee."),
+    AIMessage("Noted, sir. Green tea it is."),
+]
+CHECKPOINTS = {"cp-1": LEGACY}
+
+
+def make_log():
+    return InMemoryMessageLog(
+        latest_checkpoint=lambda user_id, thread_id: "cp-1" if thread_id == "old" else None,
+        load_messages=lambda user_id, thread_id, checkpoint_id: CHECKPOINTS[checkpoint_id],
+    )
+
+
+def contents(page):
+    return [item["content"] for item in page["items"]]
+
+
+def test_thread_with_checkpoint_but_no_log_is_imported_on_first_read():
+    log = make_log()
+    assert contents(log.get_page("u1", "old")) == [message.content for message in LEGACY]
+
+
+def test_import_cuts_off_at_the_checkpoint_seen_when_the_thread_was_registered():
+    log = make_log()
+    log.prepare_thread("u1", "old")
+    # A turn in flight: logged, but its checkpoint (not imported) is newer
+    log.append("u1", "old", "user", "What do I like to drink?")
+    assert contents(log.get_page("u1", "old")) == [
+        "I prefer green tea over coffee.", "Noted, sir. Green tea it is.", "What do I like to drink?",
+    ]
+
+
+def test_new_thread_has_no_history():
+    assert make_log().get_page("u1", "new") == {"items": [], "next_cursor": None}
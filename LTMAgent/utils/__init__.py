@@ -1,3 +1,3 @@
-from .utils import get_user_id, get_thread_id, get_token, KnowledgeTriple
+from .utils import get_user_id, get_thread_id, get_message_text, KnowledgeTriple
 
-__all__ = ['get_user_id', 'get_thread_id', 'get_token', 'KnowledgeTriple']
\ No newline at end of file
+__all__ = ['get_user_id', 'get_thread_id', 'get_message_text', 'KnowledgeTriple']
\ No newline at end of file
@@ -36,4 +36,22 @@ def get_thread_id(config: RunnableConfig) -> str:
     Returns:
         str: Thread ID or None if not provided
     """
-    return config["configurable"].get("thread_id", "default")
\ No newline at end of file
+    return config["configurable"].get("thread_id", "default")
+
+
+def get_message_text(message) -> str:
+    """Get the plain text of a message or message chunk.
+    
+    Args:
+        message: A LangChain message whose content is a string or a list of parts
+        
+    Returns:
+        str: The concatenated text parts
+    """
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
\ No newline at end of file